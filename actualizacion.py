@@ -0,0 +1,249 @@
+"""
+Actualización incremental de la volatilidad GARCH con nuevos precios.
+
+Cuando precios.csv trae días nuevos, no se reestima nada: con los parámetros
+y el último estado del filtro guardados en garch_parametros.csv se corre solo
+la recursión de la varianza sobre las filas nuevas, y se extienden
+rendimientos.csv, garch_timeseries.csv, vol_hist_vs_garch.csv y
+resultados_GARCH.csv. El costo es proporcional a los días nuevos.
+
+Todos los archivos de una actualización se escriben primero en temporales y
+se publican juntos al final, bajo el bloqueo exclusivo de datos.bloqueo: si
+algo falla antes, ``data/`` queda como estaba.
+
+Un activo se reestima por completo (garch.py) solo si:
+- acumula ``--reestimar-cada`` observaciones desde su último ajuste, o
+- hay deriva de parámetros: la suma de residuos estandarizados al cuadrado
+  desde el ajuste, que bajo el modelo es chi-cuadrado con m grados de
+  libertad, cae en una cola con probabilidad menor que ``--umbral-deriva``.
+
+Cada activo se filtra y se reestima con la especificación que tenga en
+garch_parametros.csv (columna modelo, ver modelos.py); la selección entre
+especificaciones la hace pipeline.py con ``--modelos``.
+
+Uso:
+    python actualizacion.py [--reestimar-cada 60] [--umbral-deriva 0.01]
+"""
+
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+import datos
+import garch
+import modelos
+
+REESTIMAR_CADA = 60
+UMBRAL_DERIVA = 0.01
+
+
+def rendimientos_nuevos(precios, rend):
+    """Rendimientos log de los precios que aún no están en rendimientos.csv.
+
+    Devuelve dict nombre -> DataFrame con columnas fila, Fecha y r.
+    """
+    nuevos = {}
+    for nombre, serie in precios.items():
+        filas = serie.attrs["filas"]
+        ultima = rend[nombre].last_valid_index() if nombre in rend.columns else None
+        desde = 1 if ultima is None else int(np.searchsorted(filas, ultima, side="right"))
+        pos = np.arange(max(desde, 1), len(filas))
+        if len(pos) == 0:
+            continue
+        valores = serie.to_numpy()
+        nuevos[nombre] = pd.DataFrame({
+            "fila": filas[pos],
+            "Fecha": serie.index[pos],
+            "r": np.log(valores[pos] / valores[pos - 1]),
+        })
+    return nuevos
+
+
+def _prob_deriva(suma_z2, m):
+    """Probabilidad de dos colas de una chi-cuadrado con m grados de libertad."""
+    if m <= 0:
+        return 1.0
+    return float(2 * min(chi2.sf(suma_z2, m), chi2.cdf(suma_z2, m)))
+
+
+def _asimetria(p):
+    """Asimetría de una fila de garch_parametros.csv (0 en archivos anteriores)."""
+    v = p.get("asimetria", 0.0)
+    return 0.0 if pd.isna(v) else v
+
+
+def publicar(directorio, tablas, anexos=None, con_indice=()):
+    """Publica juntos los archivos de una actualización.
+
+    ``tablas`` (nombre -> DataFrame) reemplazan el archivo; ``anexos`` se
+    agregan al final de una copia del actual. Todo se escribe primero en
+    temporales y solo entonces se reemplazan los archivos, uno tras otro bajo
+    el bloqueo exclusivo. ``con_indice`` son los archivos que llevan índice.
+    """
+    temporales = {}
+    try:
+        for nombre, df in tablas.items():
+            destino = os.path.join(directorio, nombre)
+            temporales[destino + ".tmp"] = destino
+            df.to_csv(destino + ".tmp", index=nombre in con_indice)
+        for nombre, df in (anexos or {}).items():
+            destino = os.path.join(directorio, nombre)
+            temporales[destino + ".tmp"] = destino
+            shutil.copyfile(destino, destino + ".tmp")
+            df.to_csv(destino + ".tmp", mode="a", header=False, index=False)
+    except BaseException:
+        for temporal in temporales:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        raise
+    with datos.bloqueo(directorio, exclusivo=True):
+        for temporal, destino in temporales.items():
+            os.replace(temporal, destino)
+
+
+def actualizar(directorio=None, reestimar_cada=REESTIMAR_CADA,
+               umbral_deriva=UMBRAL_DERIVA, procesos=None):
+    """Extiende los archivos con los días nuevos; devuelve los activos reestimados."""
+    directorio = directorio or datos.DATA_DIR
+    path = lambda nombre: os.path.join(directorio, nombre)
+
+    if not os.path.exists(path("garch_parametros.csv")):
+        raise FileNotFoundError("No hay garch_parametros.csv: ejecute garch.py primero")
+
+    precios = datos.leer_precios(path("precios.csv"))
+    rend = pd.read_csv(path("rendimientos.csv"), index_col=0, float_precision="round_trip")
+    params = pd.read_csv(path("garch_parametros.csv"), float_precision="round_trip").set_index("Activo")
+    resultados = pd.read_csv(path("resultados_GARCH.csv"), float_precision="round_trip")
+
+    nuevos = rendimientos_nuevos(precios, rend)
+    if not nuevos:
+        return []
+
+    # rendimientos.csv es ancho y sus columnas no comparten calendario, así
+    # que las filas nuevas de un activo pueden caer en filas ya existentes:
+    # se reescribe completo (es el archivo más pequeño de la cadena).
+    filas = np.unique(np.concatenate([n["fila"].to_numpy() for n in nuevos.values()]))
+    rend = rend.reindex(rend.index.union(filas))
+    for nombre, n in nuevos.items():
+        rend.loc[n["fila"].to_numpy(), nombre] = n["r"].to_numpy()
+
+    reestimar = [nombre for nombre in nuevos if nombre not in params.index]
+    ts, vh = [], []
+    sigma_res = resultados.set_index(resultados["Activo"].map(datos.clean_name))
+    for nombre, n in nuevos.items():
+        if nombre not in params.index:
+            continue
+        p = params.loc[nombre]
+        e = n["r"].to_numpy() - p["mu"]
+        s2 = modelos.extender(p.get("modelo"), e, p["omega"], p["alpha"], p["beta"],
+                              _asimetria(p), p["s2_ultima"], p["e_ultima"])
+        sigma = np.sqrt(s2)
+
+        suma_z2 = p["suma_z2"] + np.sum(e ** 2 / s2)
+        m = p["n"] + len(e) - p["n_ajuste"]
+        clave = datos.clean_name(nombre)
+        if clave in sigma_res.index:
+            sigma_res.loc[clave, "sigma_mean"] = (
+                sigma_res.loc[clave, "sigma_mean"] * p["n"] + sigma.sum()
+            ) / (p["n"] + len(e))
+            sigma_res.loc[clave, "sigma_last"] = sigma[-1]
+        params.loc[nombre, ["s2_ultima", "e_ultima", "n", "suma_z2", "fecha_ultima"]] = [
+            s2[-1], e[-1], p["n"] + len(e), suma_z2, n["Fecha"].iloc[-1].strftime("%Y-%m-%d"),
+        ]
+        if m >= reestimar_cada or _prob_deriva(suma_z2, m) < umbral_deriva:
+            reestimar.append(nombre)
+
+        if clave in datos.SERIES_TASA:
+            continue
+        fechas = n["Fecha"].dt.strftime("%Y-%m-%d").to_numpy()
+        activo = datos.nombre_serie(nombre)
+        ts.append(pd.DataFrame({"Fecha": fechas, "Activo": activo,
+                                "Retorno": n["r"].to_numpy(), "sigma_t": sigma}))
+        cola = rend[nombre].dropna().iloc[-(garch.VENTANA_VOL_HIST - 1 + len(e)):]
+        vh.append(pd.DataFrame({"Fecha": fechas, "Activo": activo,
+                                "vol_hist": cola.rolling(garch.VENTANA_VOL_HIST).std().to_numpy()[-len(e):],
+                                "sigma_t": sigma}))
+
+    if reestimar:
+        panel = datos.rendimientos_de_tabla(rend, precios)
+        tablas = reestimar_parcial(directorio, params, reestimar, procesos, panel=panel)
+        publicar(directorio, {"rendimientos.csv": rend, **tablas}, con_indice=("rendimientos.csv",))
+        return reestimar
+
+    # Si solo llegaron tasas no hay filas que anexar
+    anexos = {}
+    if ts:
+        anexos["garch_timeseries.csv"] = pd.concat(ts, ignore_index=True)
+        anexos["vol_hist_vs_garch.csv"] = pd.concat(vh, ignore_index=True)
+    publicar(directorio, {
+        "rendimientos.csv": rend,
+        "resultados_GARCH.csv": sigma_res.reset_index(drop=True),
+        "garch_parametros.csv": params.reset_index(),
+    }, anexos, con_indice=("rendimientos.csv",))
+    return []
+
+
+def reestimar_parcial(directorio, params, reestimar, procesos=None,
+                      especificaciones=None, criterio=modelos.CRITERIO, panel=None):
+    """Reajusta los activos indicados y devuelve todos los archivos GARCH
+    (nombre -> DataFrame) sin escribirlos; se publican con ``publicar``.
+
+    Los demás activos conservan sus parámetros: su sigma_t se reconstruye
+    filtrando la serie completa, sin optimizar. Los que no están en
+    ``params`` (garch_parametros.csv indexado por Activo) se ajustan de cero.
+    Con ``especificaciones`` los activos reajustados eligen entre ellas por
+    ``criterio``; sin ellas cada uno conserva la especificación que ya tenía.
+    ``panel`` son los rendimientos a usar (por defecto, los de ``directorio``).
+    """
+    if panel is None:
+        panel = datos.leer_rendimientos(
+            os.path.join(directorio, "rendimientos.csv"),
+            datos.leer_precios(os.path.join(directorio, "precios.csv")),
+        )
+    reestimar = list(reestimar) + [n for n in panel if n not in params.index and n not in reestimar]
+    if especificaciones is None:
+        especificaciones = {
+            n: [params.loc[n].get("modelo") if n in params.index else garch.MODELO] for n in reestimar
+        }
+    ajustes, _ = modelos.estimar({n: panel[n] for n in reestimar}, especificaciones, criterio, procesos)
+    for nombre, serie in panel.items():
+        if nombre not in ajustes:
+            ajustes[nombre] = modelos.filtrar(nombre, serie.to_numpy(), params.loc[nombre])
+    ajustes = {nombre: ajustes[nombre] for nombre in panel}
+    tablas = garch.tablas(panel, ajustes, directorio)
+
+    # Los activos no reestimados siguen contando desde su último ajuste
+    nuevos = tablas["garch_parametros.csv"].set_index("Activo")
+    vigentes = nuevos.index.difference(reestimar)
+    nuevos.loc[vigentes, "n_ajuste"] = params.loc[vigentes, "n_ajuste"]
+    for nombre in vigentes:
+        a = ajustes[nombre]
+        z2 = ((panel[nombre].to_numpy() - a.mu) / a.sigma) ** 2
+        nuevos.loc[nombre, "suma_z2"] = z2[int(nuevos.loc[nombre, "n_ajuste"]):].sum()
+    tablas["garch_parametros.csv"] = nuevos.reset_index()
+    return tablas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Actualización diaria de la volatilidad GARCH")
+    parser.add_argument("--reestimar-cada", type=int, default=REESTIMAR_CADA,
+                        help="observaciones nuevas tras las cuales se reestima un activo")
+    parser.add_argument("--umbral-deriva", type=float, default=UMBRAL_DERIVA,
+                        help="probabilidad bajo la cual se considera que hay deriva")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    reestimados = actualizar(args.directorio, args.reestimar_cada, args.umbral_deriva, args.procesos)
+    if reestimados:
+        print("Reestimados:", ", ".join(datos.clean_name(n) for n in reestimados))
+    else:
+        print("Actualización incremental sin reestimación")
+
+
+if __name__ == "__main__":
+    main()
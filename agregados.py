@@ -0,0 +1,100 @@
+"""
+Vista agregada para universos con muchos activos.
+
+Con cientos de activos, una barra, una línea o un trazo por activo deja de
+leerse y el gráfico pesa en proporción al número de activos. La vista
+agregada resume el corte transversal:
+
+    bandas        cuantiles de una serie (sigma_t) entre activos en cada
+                  fecha: mediana, rango intercuartil y 5-95 %
+    distribucion  resumen de los gammas de cada método (cuantiles, extremos
+                  y media) para dibujar cajas con estadísticos ya calculados
+
+El tamaño del resultado depende del número de fechas o de métodos, no del
+de activos. Todo se calcula sobre una matriz fechas x activos, sin bucles
+por activo; los activos individuales se superponen solo si el usuario los
+pide.
+"""
+
+import numpy as np
+import pandas as pd
+
+CUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# A partir de este número de activos la vista agregada es la predeterminada
+UMBRAL_ACTIVOS = 30
+
+
+def _nombre(q):
+    return f"q{round(q * 100):02d}"
+
+
+def matriz(df, columna):
+    """Matriz fechas x activos de ``columna`` (NaN donde un activo no cotiza).
+
+    Devuelve (fechas, activos, M).
+    """
+    fechas, i = np.unique(df["Fecha"].to_numpy(), return_inverse=True)
+    activos, j = np.unique(df["Activo"].astype(str).to_numpy(), return_inverse=True)
+    M = np.full((len(fechas), len(activos)), np.nan)
+    M[i, j] = df[columna].to_numpy(dtype=float)
+    return fechas, activos, M
+
+
+def bandas(df, columna="sigma_t", cuantiles=CUANTILES):
+    """Cuantiles de ``columna`` entre activos para cada fecha.
+
+    ``df`` es un archivo largo (Fecha, Activo, columna). Devuelve un
+    DataFrame con Fecha, n (activos con dato) y una columna por cuantil
+    (q05, q25, q50, ...).
+    """
+    fechas, _, M = matriz(df, columna)
+    n = np.sum(~np.isnan(M), axis=1)
+    res = pd.DataFrame({"Fecha": fechas, "n": n})
+    if M.size == 0:
+        for q in cuantiles:
+            res[_nombre(q)] = np.nan
+        return res
+    with np.errstate(invalid="ignore"):
+        Q = np.nanquantile(np.where(n[:, None] > 0, M, 0.0), cuantiles, axis=1)
+    Q[:, n == 0] = np.nan
+    for q, fila in zip(cuantiles, Q):
+        res[_nombre(q)] = fila
+    return res
+
+
+def distribucion(df, columnas, cuantiles=CUANTILES):
+    """Resumen por columna (método) de los valores entre activos.
+
+    Devuelve un DataFrame indexado por columna con n, min, un campo por
+    cuantil, max y media.
+    """
+    X = df[list(columnas)].to_numpy(dtype=float).T
+    validos = ~np.isnan(X)
+    n = validos.sum(axis=1)
+    vacio = n == 0
+    X0 = np.where(vacio[:, None], 0.0, X)
+    with np.errstate(invalid="ignore"):
+        Q = np.nanquantile(X0, cuantiles, axis=1)
+        res = pd.DataFrame({
+            "n": n,
+            "min": np.nanmin(X0, axis=1),
+            **{_nombre(q): fila for q, fila in zip(cuantiles, Q)},
+            "max": np.nanmax(X0, axis=1),
+            "media": np.nanmean(X0, axis=1),
+        }, index=list(columnas))
+    res.loc[vacio, res.columns != "n"] = np.nan
+    return res
+
+
+def recortar(df, rango):
+    """Filas de ``df`` (ordenado por Fecha) dentro de ``rango`` (desde, hasta)."""
+    fechas = df["Fecha"].to_numpy()
+    desde, hasta = (np.datetime64(f, "ns") for f in rango)
+    i = np.searchsorted(fechas, desde)
+    j = np.searchsorted(fechas, hasta + np.timedelta64(1, "D"))
+    return df.iloc[i:j]
+
+
+def vista_predeterminada(n_activos):
+    return "Agregada" if n_activos >= UMBRAL_ACTIVOS else "Por activo"
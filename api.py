@@ -0,0 +1,471 @@
+"""
+API HTTP local, de solo lectura, con los mismos datos del tablero.
+
+Sirve los archivos de ``data/`` a través de datos.py (la misma caché y los
+mismos nombres limpios que ve app.py), filtrados por activo, fechas y
+columnas:
+
+    GET /                     conjuntos disponibles, columnas y versión
+    GET /gammas               resultados_completos_tablero.csv
+    GET /sigma                garch_timeseries.csv (Fecha, Activo, Retorno, sigma_t)
+    GET /volatilidad          vol_hist_vs_garch.csv
+    GET /diagnosticos         garch_supuestos.csv
+    GET /panel                panel.arrow (precios y rendimientos de todos
+                              los activos, formato largo)
+
+Parámetros (todos opcionales):
+
+    activo=A&activo=B   o activo=A,B    nombre limpio (en /panel también el ticker)
+    desde=2024-01-01&hasta=2024-12-31   solo en los conjuntos con Fecha
+    columnas=gamma_CRRA,gamma_FTP       Activo (Ticker en /panel) y Fecha van siempre
+    formato=json|arrow                  o Accept: application/vnd.apache.arrow.stream
+
+JSON es una lista de registros (NaN como null, fechas YYYY-MM-DD, 15 cifras
+significativas); Arrow conserva los tipos y la precisión completa y es
+un stream IPC que se lee con ``pyarrow.ipc.open_stream`` sin parsear texto.
+Las respuestas se envían por partes (Transfer-Encoding: chunked), de a
+FILAS_POR_BLOQUE filas, sin armar el cuerpo completo en memoria; /panel
+sale del memory-map de panel.arrow sin pasar por pandas.
+
+Cada respuesta lleva un ETag calculado con datos.version del archivo (o
+con los hashes de origen de panel.arrow) y con la consulta; una petición
+con If-None-Match igual recibe 304 sin cuerpo. Las conexiones son
+persistentes (HTTP/1.1): ``Cliente`` abajo mantiene un pool de conexiones y
+guarda las respuestas con su ETag para revalidarlas.
+
+Uso:
+    python api.py [--host 127.0.0.1] [--puerto 8766] [--directorio data]
+"""
+
+import argparse
+import hashlib
+import http.client
+import io
+import json
+import os
+import queue
+import threading
+import urllib.parse
+from collections import OrderedDict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import datos
+
+HOST = "127.0.0.1"
+PUERTO = 8766
+
+FILAS_POR_BLOQUE = 50_000
+
+ARROW = "application/vnd.apache.arrow.stream"
+JSON = "application/json"
+
+
+@dataclass(frozen=True)
+class Conjunto:
+    archivo: str
+    descripcion: str = ""
+
+
+CONJUNTOS = {
+    "gammas": Conjunto("resultados_completos_tablero.csv", "gammas, estados e intervalos por activo"),
+    "sigma": Conjunto("garch_timeseries.csv", "rendimiento y volatilidad condicional diaria"),
+    "volatilidad": Conjunto("vol_hist_vs_garch.csv", "volatilidad histórica de 252 días y sigma_t"),
+    "diagnosticos": Conjunto("garch_supuestos.csv", "pruebas de los supuestos del GARCH"),
+}
+PANEL = "panel"
+
+
+class ErrorConsulta(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def _lista(consulta, clave):
+    """Valores de un parámetro repetido o separado por comas."""
+    return [v for valor in consulta.get(clave, []) for v in valor.split(",") if v]
+
+
+def _fecha(consulta, clave):
+    valores = consulta.get(clave)
+    if not valores:
+        return None
+    import numpy as np
+
+    try:
+        return np.datetime64(valores[-1], "D")
+    except ValueError:
+        raise ErrorConsulta(400, f"Fecha inválida en {clave}: {valores[-1]}") from None
+
+
+def _columnas(disponibles, pedidas, fijas):
+    desconocidas = [c for c in pedidas if c not in disponibles]
+    if desconocidas:
+        raise ErrorConsulta(400, f"Columnas desconocidas: {', '.join(desconocidas)}")
+    return [c for c in disponibles if c in fijas or not pedidas or c in pedidas]
+
+
+def _activos_desconocidos(pedidos, disponibles):
+    faltan = [a for a in pedidos if a not in disponibles]
+    if faltan:
+        raise ErrorConsulta(404, f"Activos desconocidos: {', '.join(faltan)}")
+
+
+def filtrar(conjunto, consulta):
+    """(DataFrame filtrado, versión del archivo) de un conjunto CSV del tablero."""
+    archivo = CONJUNTOS[conjunto].archivo
+    activos = _lista(consulta, "activo")
+    desde, hasta = _fecha(consulta, "desde"), _fecha(consulta, "hasta")
+    with datos.bloqueo():
+        version = datos.version(archivo)
+        if archivo in datos.ARCHIVOS_CON_FECHA:
+            ts = datos.por_activo(archivo)
+            df = None if ts is None else ts.frame
+        else:
+            df = datos.cargar(archivo)
+    if df is None:
+        raise ErrorConsulta(404, f"No se encontró el archivo {archivo}")
+
+    if archivo in datos.ARCHIVOS_CON_FECHA:
+        _activos_desconocidos(activos, ts.tramos)
+        rango = None
+        if desde is not None or hasta is not None:
+            rango = (desde if desde is not None else df["Fecha"].min(),
+                     hasta if hasta is not None else df["Fecha"].max())
+        if activos or rango is not None:
+            df = ts.seleccion(activos or ts.activos, rango)
+    else:
+        if desde is not None or hasta is not None:
+            raise ErrorConsulta(400, f"{conjunto} no tiene fechas")
+        if activos:
+            _activos_desconocidos(activos, set(df["Activo"]))
+            df = df[df["Activo"].isin(activos)]
+
+    return df[_columnas(list(df.columns), _lista(consulta, "columnas"), ("Fecha", "Activo"))], version
+
+
+def filtrar_panel(consulta):
+    """(tabla Arrow filtrada, versión) de panel.arrow, sin pasar por pandas.
+
+    Las filas de cada ticker son contiguas (ingesta.py), así que filtrar por
+    activo y por fechas son cortes sin copia de la tabla en memory-map.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    with datos.bloqueo():
+        tabla = datos.leer_panel()
+    if tabla is None:
+        raise ErrorConsulta(404, "No hay un panel.arrow vigente (ejecute ingesta.py)")
+    version = hashlib.sha1(json.dumps(
+        {k.decode(): v.decode() for k, v in tabla.schema.metadata.items()}, sort_keys=True
+    ).encode()).hexdigest()
+
+    nombres = json.loads(tabla.schema.metadata[b"activos"])
+    activos = _lista(consulta, "activo")
+    desde, hasta = _fecha(consulta, "desde"), _fecha(consulta, "hasta")
+    if activos or desde is not None or hasta is not None:
+        ticker = tabla.column("Ticker").combine_chunks()
+        diccionario = ticker.dictionary.to_pylist()
+        alias = {}
+        for k, t in enumerate(diccionario):
+            alias[t] = alias[datos.clean_name(nombres[t])] = k
+        _activos_desconocidos(activos, alias)
+        codigos = ticker.indices.to_numpy()
+        bordes = np.searchsorted(codigos, np.arange(len(diccionario) + 1))
+        fechas = tabla.column("Fecha").to_numpy()
+        elegidos = sorted({alias[a] for a in activos}) if activos else range(len(diccionario))
+        partes = []
+        for k in elegidos:
+            inicio, fin = int(bordes[k]), int(bordes[k + 1])
+            if desde is not None:
+                inicio += int(np.searchsorted(fechas[inicio:fin], desde, side="left"))
+            if hasta is not None:
+                fin = inicio + int(np.searchsorted(fechas[inicio:fin], hasta + np.timedelta64(1, "D"),
+                                                   side="left"))
+            if fin > inicio:
+                partes.append(tabla.slice(inicio, fin - inicio))
+        tabla = pa.concat_tables(partes) if partes else tabla.slice(0, 0)
+
+    columnas = _columnas(tabla.column_names, _lista(consulta, "columnas"), ("Fecha", "Ticker"))
+    return tabla.select(columnas), version
+
+
+def etag(version, ruta, consulta, formato):
+    """ETag de la respuesta: versión de los datos y consulta normalizada."""
+    normalizada = sorted((k, v) for k, valores in consulta.items() for v in valores if k != "formato")
+    texto = json.dumps([version, ruta, normalizada, formato])
+    return '"' + hashlib.sha1(texto.encode()).hexdigest() + '"'
+
+
+def _coincide(cabecera, valor):
+    if not cabecera:
+        return False
+    etiquetas = [e.strip().removeprefix("W/") for e in cabecera.split(",")]
+    return "*" in etiquetas or valor in etiquetas
+
+
+# ============================================================
+# CUERPOS POR PARTES
+# ============================================================
+
+class PorPartes(io.RawIOBase):
+    """Escritura con Transfer-Encoding: chunked sobre el socket de la respuesta."""
+
+    def __init__(self, destino):
+        self.destino = destino
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if b:
+            self.destino.write(b"%x\r\n" % len(b))
+            self.destino.write(b)
+            self.destino.write(b"\r\n")
+        return len(b)
+
+    def cerrar(self):
+        self.destino.write(b"0\r\n\r\n")
+        self.destino.flush()
+
+
+def bloques_json(partes):
+    """Lista JSON de registros a partir de DataFrames de hasta FILAS_POR_BLOQUE filas."""
+    import pandas as pd
+
+    yield b"["
+    primero = True
+    for parte in partes:
+        if not len(parte):
+            continue
+        if "Fecha" in parte.columns:
+            parte = parte.assign(Fecha=parte["Fecha"].dt.strftime("%Y-%m-%d"))
+        categoricas = [c for c in parte.columns if isinstance(parte[c].dtype, pd.CategoricalDtype)]
+        if categoricas:
+            parte = parte.astype({c: str for c in categoricas})
+        texto = parte.to_json(orient="records", double_precision=15)
+        yield (b"" if primero else b",") + texto[1:-1].encode()
+        primero = False
+    yield b"]"
+
+
+def escribir_arrow(tabla, salida):
+    """Stream IPC de ``tabla`` en lotes de FILAS_POR_BLOQUE filas."""
+    import pyarrow as pa
+
+    with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+        for lote in tabla.to_batches(max_chunksize=FILAS_POR_BLOQUE):
+            escritor.write_batch(lote)
+
+
+def _partes(df):
+    return (df.iloc[i:i + FILAS_POR_BLOQUE] for i in range(0, len(df), FILAS_POR_BLOQUE))
+
+
+def _partes_arrow(tabla):
+    return (lote.to_pandas() for lote in tabla.to_batches(max_chunksize=FILAS_POR_BLOQUE))
+
+
+# ============================================================
+# SERVIDOR
+# ============================================================
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TableroAPI/1.0"
+
+    def log_message(self, formato, *args):
+        if self.server.registrar:
+            super().log_message(formato, *args)
+
+    def _enviar(self, estado, cuerpo, tipo=JSON, cabeceras=()):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in cabeceras:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _error(self, estado, mensaje):
+        self._enviar(estado, json.dumps({"error": mensaje}, ensure_ascii=False).encode())
+
+    def _formato(self, consulta):
+        pedido = consulta.get("formato", [None])[-1]
+        if pedido is None:
+            return "arrow" if ARROW in self.headers.get("Accept", "") else "json"
+        if pedido not in ("json", "arrow"):
+            raise ErrorConsulta(400, f"Formato desconocido: {pedido}")
+        return pedido
+
+    def _indice(self):
+        conjuntos = {}
+        for nombre, c in CONJUNTOS.items():
+            conjuntos[nombre] = {"archivo": c.archivo, "descripcion": c.descripcion,
+                                 "version": datos.version(c.archivo)}
+        tabla = datos.leer_panel()
+        conjuntos[PANEL] = {"archivo": datos.PANEL, "descripcion": "precios y rendimientos (Arrow)",
+                            "columnas": None if tabla is None else tabla.column_names}
+        self._enviar(200, json.dumps(conjuntos, ensure_ascii=False, indent=1).encode())
+
+    def do_GET(self):
+        partes = urllib.parse.urlsplit(self.path)
+        ruta = partes.path.rstrip("/") or "/"
+        consulta = urllib.parse.parse_qs(partes.query)
+        try:
+            if ruta == "/":
+                return self._indice()
+            nombre = ruta.lstrip("/")
+            if nombre != PANEL and nombre not in CONJUNTOS:
+                raise ErrorConsulta(404, f"Conjunto desconocido: {nombre}")
+            formato = self._formato(consulta)
+            if nombre == PANEL:
+                datos_, version = filtrar_panel(consulta)
+            else:
+                datos_, version = filtrar(nombre, consulta)
+        except ErrorConsulta as exc:
+            return self._error(exc.estado, str(exc))
+
+        valor = etag(version, ruta, consulta, formato)
+        cabeceras = [("ETag", valor), ("Cache-Control", "no-cache"), ("Vary", "Accept")]
+        if _coincide(self.headers.get("If-None-Match"), valor):
+            self.send_response(304)
+            for k, v in cabeceras:
+                self.send_header(k, v)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", ARROW if formato == "arrow" else JSON)
+        self.send_header("Transfer-Encoding", "chunked")
+        for k, v in cabeceras:
+            self.send_header(k, v)
+        self.end_headers()
+        salida = PorPartes(self.wfile)
+        if formato == "arrow":
+            import pyarrow as pa
+
+            tabla = datos_ if nombre == PANEL else pa.Table.from_pandas(datos_, preserve_index=False)
+            escribir_arrow(tabla, salida)
+        else:
+            for bloque in bloques_json(_partes_arrow(datos_) if nombre == PANEL else _partes(datos_)):
+                salida.write(bloque)
+        salida.cerrar()
+
+
+def servidor(host=HOST, puerto=PUERTO, registrar=False):
+    srv = ThreadingHTTPServer((host, puerto), Manejador)
+    srv.daemon_threads = True
+    srv.registrar = registrar
+    return srv
+
+
+# ============================================================
+# CLIENTE
+# ============================================================
+
+class Cliente:
+    """Cliente para procesos internos: pool de conexiones y caché por ETag.
+
+    Hasta ``conexiones`` conexiones persistentes se reutilizan entre
+    peticiones (y entre hilos); las respuestas se guardan con su ETag y se
+    revalidan con If-None-Match, así una consulta que no cambió no vuelve a
+    transferir datos. Las tablas llegan en Arrow.
+    """
+
+    def __init__(self, host=HOST, puerto=PUERTO, conexiones=4, cache=32, timeout=60):
+        self.host, self.puerto, self.timeout = host, puerto, timeout
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(conexiones)
+        self._cache = OrderedDict()
+        self._max_cache = cache
+        self._lock = threading.Lock()
+
+    def _conexion(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+
+    def _pedir(self, url, cabeceras):
+        self._cupos.acquire()
+        try:
+            for intento in range(2):
+                conexion = self._conexion()
+                try:
+                    conexion.request("GET", url, headers=cabeceras)
+                    respuesta = conexion.getresponse()
+                    cuerpo = respuesta.read()
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    # El servidor cerró una conexión inactiva: se abre otra
+                    conexion.close()
+                    if intento:
+                        raise
+                    continue
+                self._libres.put(conexion)
+                return respuesta, cuerpo
+        finally:
+            self._cupos.release()
+
+    def obtener(self, conjunto, formato="arrow", **filtros):
+        """Cuerpo de ``/conjunto`` con los filtros (listas se unen por comas)."""
+        consulta = {k: ",".join(v) if isinstance(v, (list, tuple)) else str(v)
+                    for k, v in filtros.items() if v is not None}
+        url = f"/{conjunto}?" + urllib.parse.urlencode({**consulta, "formato": formato})
+        with self._lock:
+            previa = self._cache.get(url)
+        cabeceras = {"If-None-Match": previa[0]} if previa else {}
+        respuesta, cuerpo = self._pedir(url, cabeceras)
+        if respuesta.status == 304 and previa:
+            return previa[1]
+        if respuesta.status != 200:
+            raise ErrorConsulta(respuesta.status, json.loads(cuerpo or b"{}").get("error", respuesta.reason))
+        with self._lock:
+            self._cache[url] = (respuesta.getheader("ETag"), cuerpo)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self._max_cache:
+                self._cache.popitem(last=False)
+        return cuerpo
+
+    def tabla(self, conjunto, **filtros):
+        """pyarrow.Table de ``conjunto`` (p. ej. tabla("sigma", activo=["Celsia"]))."""
+        import pyarrow as pa
+
+        return pa.ipc.open_stream(self.obtener(conjunto, "arrow", **filtros)).read_all()
+
+    def cerrar(self):
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API local de solo lectura con los datos del tablero")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    parser.add_argument("--registrar", action="store_true", help="imprime cada petición")
+    args = parser.parse_args(argv)
+
+    # datos.py resuelve los archivos con DATA_DIR al leerlos
+    datos.DATA_DIR = os.path.abspath(args.directorio)
+    srv = servidor(args.host, args.puerto, args.registrar)
+    print(f"API en http://{args.host}:{args.puerto}/ sobre {datos.DATA_DIR}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import os
+
+import datos
+import en_vivo
+import figuras
+import instrumentacion
+import paginas
+
+# pandas y plotly se importan dentro de cada página (ver paginas.py), así la
+# barra lateral se dibuja antes de pagar el costo de esas librerías.
 
 # ============================================================
 # CONFIGURACIÓN GENERAL DEL TABLERO
@@ -76,39 +83,96 @@ plotly_template = "simple_white"
 # FUNCIÓN PARA CARGAR DATOS
 # ============================================================
 
+# La lectura y la limpieza de nombres (clean_name) se hacen una sola vez en
+# datos.py y se comparten entre sesiones; aquí solo se piden los frames.
+# Las series de tiempo llegan como índice por activo (datos.PorActivo), ya
+# sin las series macro: cada activo es un corte contiguo del archivo.
+
 def load_csv(path):
-    full = os.path.join("data", path)
-    if os.path.exists(full):
-        return pd.read_csv(full)
-    st.warning(f"No se encontró el archivo {path}")
-    return None
-
-# Archivos principales
-df_crra  = load_csv("resultados_CRRA.csv")
-df_ftp   = load_csv("resultados_FTP.csv")
-df_garch = load_csv("resultados_GARCH.csv")
-df_full  = load_csv("resultados_completos_tablero.csv")
-
-# Otros archivos opcionales
-df_tests        = load_csv("garch_supuestos.csv")
-df_timeseries   = load_csv("garch_timeseries.csv")
-df_hist_vs_dyn  = load_csv("vol_hist_vs_garch.csv")
+    if path in datos.ARCHIVOS_CON_FECHA:
+        df = datos.por_activo(path)
+    else:
+        df = datos.cargar(path)
+    if df is None:
+        st.warning(f"No se encontró el archivo {path}")
+    return df
+
+def preparar(pagina):
+    """Importa las librerías y carga los archivos que declara la página."""
+    decl = paginas.PAGINAS[pagina]
+    with instrumentacion.etapa("preparar"):
+        with instrumentacion.etapa("importar"):
+            librerias = paginas.importar(decl.librerias)
+        # Todos los archivos de la página salen de la misma corrida de pipeline.py
+        frames = []
+        with datos.bloqueo():
+            for nombre in decl.datos:
+                if nombre in datos.ARCHIVOS_CRUDOS:
+                    # precios.csv y rendimientos.csv los lee la página (datos.memo)
+                    continue
+                with instrumentacion.etapa(f"cargar {nombre}"):
+                    frames.append(load_csv(nombre))
+    return librerias, frames
+
+# Eliminar TRM de todos los análisis
+excluir_macro = datos.EXCLUIR_MACRO
 
 # ============================================================
-# LIMPIEZA DE NOMBRES
+# VISTA AGREGADA (UNIVERSOS GRANDES)
 # ============================================================
 
-def clean_name(x):
-    if isinstance(x, str):
-        return x.replace("Datos históricos de ", "").split("(")[0].strip()
-    return x
-
-for df in [df_crra, df_ftp, df_garch, df_full, df_tests, df_timeseries, df_hist_vs_dyn]:
-    if df is not None and "Activo" in df.columns:
-        df["Activo"] = df["Activo"].apply(clean_name)
+COLUMNAS_GAMMA = ["gamma_CRRA", "gamma_FTP", "gamma_GARCH"]
+
+def selector_vista(agregados, n_activos, clave):
+    """Radio Por activo / Agregada; la agregada es la predeterminada con muchos activos."""
+    opciones = ["Por activo", "Agregada"]
+    return st.radio(
+        "Vista:",
+        opciones,
+        index=opciones.index(agregados.vista_predeterminada(n_activos)),
+        horizontal=True,
+        key=clave,
+        help="La vista agregada resume la distribución entre activos: su tamaño no depende del número de activos"
+    )
 
-# Eliminar TRM de todos los análisis
-excluir_macro = ["TRM", "TPM", "IBR", "DTB3"]
+def figura_distribucion(go, agregados, df, destacados=()):
+    """Cajas con la distribución de γ entre activos (5–95 %, IQR, mediana y
+    media) y, encima, los activos destacados."""
+    resumen = agregados.distribucion(df, COLUMNAS_GAMMA)
+    metodos = [c.replace("gamma_", "") for c in COLUMNAS_GAMMA]
+    fig = go.Figure()
+    for i, (metodo, (_, r)) in enumerate(zip(metodos, resumen.iterrows())):
+        fig.add_trace(go.Box(
+            x=[metodo],
+            lowerfence=[r["q05"]],
+            q1=[r["q25"]],
+            median=[r["q50"]],
+            q3=[r["q75"]],
+            upperfence=[r["q95"]],
+            mean=[r["media"]],
+            name=f"{metodo} (n={int(r['n'])})",
+            marker_color=color_palette[i],
+            showlegend=False
+        ))
+    por_activo = df.set_index("Activo")
+    for j, activo in enumerate(destacados):
+        fig.add_trace(go.Scatter(
+            x=metodos,
+            y=por_activo.loc[activo, COLUMNAS_GAMMA].to_numpy(dtype=float),
+            mode="markers",
+            name=activo,
+            marker=dict(size=11, symbol="diamond", color=color_palette[(j + 5) % len(color_palette)],
+                        line=dict(color="#1F2937", width=1))
+        ))
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        xaxis=dict(showgrid=False, title='Método'),
+        yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Coeficiente γ'),
+        height=500,
+        showlegend=bool(destacados)
+    )
+    return fig
 
 # ============================================================
 # SIDEBAR - LOGO Y NAVEGACIÓN
@@ -126,16 +190,42 @@ with st.sidebar:
     # Menú de navegación
     page = st.radio(
         "**Navegación**",
-        [
-            "Contexto",
-            "Aversión al riesgo",
-            "Volatilidad dinámica",
-            "Volatilidad histórica vs dinámica",
-            "Diagnósticos GARCH"
-        ]
+        list(paginas.PAGINAS),
+        key="pagina",
     )
     
     st.markdown("---")
+
+# Modo en vivo opcional (TABLERO_EN_VIVO, ver en_vivo.py): un solo flujo por
+# proceso; las partes que dependen de él se dibujan en fragmentos que se
+# vuelven a ejecutar cada en_vivo.REFRESCO segundos sin recargar la página
+flujo = en_vivo.flujo()
+
+def fragmento(funcion):
+    """Ejecuta ``funcion``; en modo en vivo, como fragmento que se repite solo."""
+    if flujo is None:
+        return funcion()
+    return st.fragment(run_every=en_vivo.REFRESCO)(funcion)()
+
+def instantanea():
+    """Instantánea vigente del modo en vivo, o None."""
+    return None if flujo is None else flujo.instantanea()
+
+with st.sidebar:
+    if flujo is not None:
+        def estado_en_vivo():
+            vivo = instantanea()
+            if flujo.error is not None:
+                st.caption(f"🔴 En vivo detenido: {flujo.error}")
+            elif vivo is None:
+                st.caption("⏳ En vivo: cargando la historia…")
+            else:
+                hora = "sin datos nuevos" if vivo.actualizado is None else time.strftime(
+                    "%H:%M:%S", time.localtime(vivo.actualizado))
+                st.caption(f"🟢 En vivo · {vivo.registros} registros · {hora}")
+        fragmento(estado_en_vivo)
+        st.markdown("---")
+
     st.markdown("**Responsables:**")
     st.markdown("Paula Ximena Guevara G.")
     st.markdown("Natalia Zárate Yara")
@@ -144,12 +234,18 @@ with st.sidebar:
     st.caption("Facultad de Estadística")
     st.caption("2025")
 
+# Instrumentación opcional: ?instrumentar=1 o TABLERO_INSTRUMENTAR=1 (ver
+# instrumentacion.py); desactivada no mide nada
+instrumentacion.iniciar(page, st.query_params.get(instrumentacion.PARAMETRO))
+
 # ============================================================
 # 1. CONTEXTO
 # ============================================================
 
 if page == "Contexto":
 
+    (px, go, agregados), (df_full,) = preparar(page)
+
     st.title("Aversión al Riesgo en el Mercado Colombiano (2020–2025)")
 
     st.markdown("""
@@ -200,18 +296,30 @@ if page == "Contexto":
 
     st.subheader("Indicadores Principales")
 
-    c1, c2, c3 = st.columns(3)
-
     if df_full is not None:
         df_filtered = df_full[~df_full["Activo"].isin(excluir_macro)]
 
-        gamma_crra_mean  = df_filtered["gamma_CRRA"].mean()
-        gamma_ftp_mean   = df_filtered["gamma_FTP"].mean()
-        gamma_garch_mean = df_filtered["gamma_GARCH"].mean()
-
-        c1.metric("γ CRRA Promedio", f"{gamma_crra_mean:.4f}", help="Coeficiente promedio bajo CRRA")
-        c2.metric("γ FTP Promedio", f"{gamma_ftp_mean:.4f}", help="Coeficiente promedio bajo FTP")
-        c3.metric("γ GARCH Promedio", f"{gamma_garch_mean:.4f}", help="Coeficiente promedio bajo GARCH")
+    def indicadores():
+        c1, c2, c3 = st.columns(3)
+        if df_full is None:
+            return
+        vivo = instantanea()
+        for col, metodo in zip((c1, c2, c3), ("CRRA", "FTP", "GARCH")):
+            promedio = df_filtered[f"gamma_{metodo}"].mean()
+            if vivo is None or not vivo.registros:
+                col.metric(f"γ {metodo} Promedio", f"{promedio:.4f}",
+                           help=f"Coeficiente promedio bajo {metodo}")
+                continue
+            # En vivo se muestra la estimación de aversion.estimar junto a su
+            # propia base (la misma estimación sobre la historia cargada); el
+            # archivo puede venir de otros parámetros y no se mezcla con ella
+            base = vivo.gammas_base[metodo]
+            col.metric(f"γ {metodo} Promedio (en vivo)", f"{vivo.gammas[metodo]:.4f}",
+                       delta=f"{vivo.gammas[metodo] - base:+.4f}",
+                       help=f"Coeficiente promedio bajo {metodo}: {base:.4f} con la historia cargada, "
+                            f"{promedio:.4f} en el archivo publicado")
+
+    fragmento(indicadores)
 
     st.markdown("##")
     
@@ -221,42 +329,61 @@ if page == "Contexto":
 
     st.subheader("Comparación General de γ por Método")
 
-    df_long = df_filtered.melt(
-        id_vars="Activo",
-        value_vars=["gamma_CRRA", "gamma_FTP", "gamma_GARCH"],
-        var_name="Método",
-        value_name="Gamma"
-    )
-    
-    # Renombrar métodos
-    df_long["Método"] = df_long["Método"].replace({
-        "gamma_CRRA": "CRRA",
-        "gamma_FTP": "FTP",
-        "gamma_GARCH": "GARCH"
-    })
+    modo = selector_vista(agregados, len(df_filtered), "vista_contexto")
+    destacados = ()
+    if modo == "Agregada":
+        destacados = tuple(st.multiselect(
+            "Destacar activos:",
+            sorted(df_filtered["Activo"]),
+            help="Se dibujan sobre la distribución de γ"
+        ))
 
-    fig = px.bar(
-        df_long,
-        x="Activo",
-        y="Gamma",
-        color="Método",
-        color_discrete_sequence=color_palette,
-        barmode="group",
-        template=plotly_template,
-        height=500
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(showgrid=False, title='Activo'),
-        yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Coeficiente γ'),
-        showlegend=True
-    )
+    # La figura solo depende del archivo y de la vista: se construye una vez
+    # por versión y se comparte entre sesiones (figuras.py)
+    def construir():
+        if modo == "Agregada":
+            return figura_distribucion(go, agregados, df_filtered, destacados)
+        with instrumentacion.etapa("melt"):
+            df_long = df_filtered.melt(
+                id_vars="Activo",
+                value_vars=["gamma_CRRA", "gamma_FTP", "gamma_GARCH"],
+                var_name="Método",
+                value_name="Gamma"
+            )
+
+            # Renombrar métodos
+            df_long["Método"] = df_long["Método"].replace({
+                "gamma_CRRA": "CRRA",
+                "gamma_FTP": "FTP",
+                "gamma_GARCH": "GARCH"
+            })
+
+        fig = px.bar(
+            df_long,
+            x="Activo",
+            y="Gamma",
+            color="Método",
+            color_discrete_sequence=color_palette,
+            barmode="group",
+            template=plotly_template,
+            height=500
+        )
+
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Activo'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Coeficiente γ'),
+            showlegend=True
+        )
+        return fig
 
-    st.plotly_chart(fig, use_container_width=True)
+    fig = figuras.figura(page, (modo, destacados), ["resultados_completos_tablero.csv"], construir)
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
     
-    st.caption("**Interpretación:** Este gráfico muestra los coeficientes de aversión al riesgo estimados para cada activo bajo las tres metodologías. FTP tiende a generar valores más altos que CRRA, indicando mayor sensibilidad a riesgos extremos.")
+    st.caption("**Interpretación:** Este gráfico muestra los coeficientes de aversión al riesgo estimados para cada activo bajo las tres metodologías. CRRA y FTP comparten la aversión relativa en la riqueza inicial, así que solo difieren por la asimetría y las colas de los rendimientos; GARCH usa la volatilidad condicional media en lugar de la histórica.")
 
 # ============================================================
 # 2. AVERSIÓN AL RIESGO COMPLETA
@@ -264,71 +391,110 @@ if page == "Contexto":
 
 elif page == "Aversión al riesgo":
 
+    (go, agregados), (df_full,) = preparar(page)
+
     st.title("Aversión al Riesgo – CRRA, FTP y GARCH")
 
     if df_full is None:
         st.error("No se encontró resultados_completos_tablero.csv")
         st.stop()
 
-    df = df_full[~df_full["Activo"].isin(excluir_macro)].copy()
+    df = df_full[~df_full["Activo"].isin(excluir_macro)]
 
     st.subheader("Tabla de Resultados")
     
     # Tabla sin estilos de color
-    st.dataframe(df.round(4), use_container_width=True)
+    with instrumentacion.etapa("tabla"):
+        st.dataframe(df.round(4), use_container_width=True)
     
-    st.caption("**Tabla:** Coeficientes γ estimados bajo las metodologías CRRA, FTP y GARCH para cada activo financiero colombiano.")
+    st.caption("**Tabla:** Coeficientes γ estimados bajo las metodologías CRRA, FTP y GARCH para cada activo financiero colombiano. Las columnas _lo y _hi son el intervalo bootstrap de las réplicas con raíz interior; _en_cota es la fracción de réplicas descartadas por quedar en una cota de búsqueda.")
 
     st.markdown("##")
     
     st.subheader("Comparación Visual")
 
-    df_long = df.melt(
-        id_vars="Activo",
-        value_vars=["gamma_CRRA","gamma_FTP","gamma_GARCH"],
-        var_name="Método", 
-        value_name="Gamma"
-    )
-    
-    # Renombrar métodos
-    df_long["Método"] = df_long["Método"].replace({
-        "gamma_CRRA": "CRRA",
-        "gamma_FTP": "FTP",
-        "gamma_GARCH": "GARCH"
-    })
-
-    # Gráfico de líneas
-    fig = go.Figure()
-    
-    metodos = df_long["Método"].unique()
-    colores_metodo = {
-        "CRRA": color_palette[0],
-        "FTP": color_palette[1],
-        "GARCH": color_palette[2]
-    }
-    
-    for metodo in metodos:
-        df_metodo = df_long[df_long["Método"] == metodo]
-        fig.add_trace(go.Scatter(
-            x=df_metodo["Activo"],
-            y=df_metodo["Gamma"],
-            mode='lines+markers',
-            name=metodo,
-            line=dict(color=colores_metodo[metodo], width=3),
-            marker=dict(size=8)
+    modo = selector_vista(agregados, len(df), "vista_aversion")
+    destacados = ()
+    if modo == "Agregada":
+        destacados = tuple(st.multiselect(
+            "Destacar activos:",
+            sorted(df["Activo"]),
+            help="Se dibujan sobre la distribución de γ"
         ))
-    
-    fig.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(showgrid=False, title='Activo'),
-        yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Coeficiente γ'),
-        height=600,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+
+    # La figura solo depende del archivo y de la vista: se construye una vez
+    # por versión y se comparte entre sesiones (figuras.py)
+    def construir():
+        if modo == "Agregada":
+            return figura_distribucion(go, agregados, df, destacados)
+        with instrumentacion.etapa("melt"):
+            df_long = df.melt(
+                id_vars="Activo",
+                value_vars=["gamma_CRRA","gamma_FTP","gamma_GARCH"],
+                var_name="Método", 
+                value_name="Gamma"
+            )
+
+            # Renombrar métodos
+            df_long["Método"] = df_long["Método"].replace({
+                "gamma_CRRA": "CRRA",
+                "gamma_FTP": "FTP",
+                "gamma_GARCH": "GARCH"
+            })
+
+        # Gráfico de líneas
+        fig = go.Figure()
+
+        metodos = df_long["Método"].unique()
+        colores_metodo = {
+            "CRRA": color_palette[0],
+            "FTP": color_palette[1],
+            "GARCH": color_palette[2]
+        }
+
+        with instrumentacion.etapa("trazos"):
+            for metodo in metodos:
+                df_metodo = df_long[df_long["Método"] == metodo]
+
+                # Intervalos bootstrap (bootstrap.py), si ya se calcularon
+                error_y = None
+                if f"gamma_{metodo}_lo" in df.columns:
+                    gamma = df[f"gamma_{metodo}"].to_numpy()
+                    error_y = dict(
+                        type='data',
+                        symmetric=False,
+                        array=df[f"gamma_{metodo}_hi"].to_numpy() - gamma,
+                        arrayminus=gamma - df[f"gamma_{metodo}_lo"].to_numpy(),
+                        color=colores_metodo[metodo],
+                        thickness=1.5
+                    )
+
+                fig.add_trace(go.Scatter(
+                    x=df_metodo["Activo"],
+                    y=df_metodo["Gamma"],
+                    mode='lines+markers',
+                    name=metodo,
+                    line=dict(color=colores_metodo[metodo], width=3),
+                    marker=dict(size=8),
+                    error_y=error_y
+                ))
+
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Activo'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Coeficiente γ'),
+            height=600,
+            hovermode='x unified',
+            showlegend=True
+        )
+
+        return fig
+
+    fig = figuras.figura(page, (modo, destacados), ["resultados_completos_tablero.csv"], construir)
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
     
     st.caption("**Análisis:** Las líneas permiten comparar directamente los tres métodos. GARCH suele producir valores intermedios al considerar la volatilidad dinámica del mercado.")
 
@@ -338,18 +504,17 @@ elif page == "Aversión al riesgo":
 
 elif page == "Volatilidad dinámica":
 
+    (go, graficos, agregados), (ts,) = preparar(page)
+
     st.title("Volatilidad Dinámica – Modelo GARCH(1,1)")
 
-    if df_timeseries is None:
+    if ts is None:
         st.error("No se encontró garch_timeseries.csv")
         st.stop()
 
-    df = df_timeseries.copy()
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    df = ts.frame
 
-    df = df[~df["Activo"].isin(excluir_macro)]
-
-    activos = sorted(df["Activo"].unique())
+    activos = ts.activos
 
     st.markdown("""
     <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
@@ -360,75 +525,265 @@ elif page == "Volatilidad dinámica":
     </div>
     """, unsafe_allow_html=True)
 
+    modo = selector_vista(agregados, len(activos), "vista_volatilidad")
+
+    if modo == "Agregada":
+        # Bandas de cuantiles entre acciones; las acciones se dibujan solo
+        # si se piden
+        activos_sel = st.multiselect(
+            "Destacar acciones:",
+            activos,
+            help="Se dibujan sobre las bandas de cuantiles"
+        )
+    else:
+        activos_sel = st.multiselect(
+            "Seleccione acciones para comparar:",
+            activos,
+            default=activos,  # Todas las acciones por defecto
+            help="Puede seleccionar múltiples acciones para comparar su volatilidad"
+        )
+
+        if len(activos_sel) == 0:
+            st.warning("Por favor seleccione al menos una acción.")
+            st.stop()
+
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        rango = st.slider(
+            "Rango de fechas:",
+            min_value=df["Fecha"].min().date(),
+            max_value=df["Fecha"].max().date(),
+            value=(df["Fecha"].min().date(), df["Fecha"].max().date()),
+            format="YYYY-MM-DD",
+            help="Al acotar el rango, el gráfico se vuelve a submuestrear con todo el detalle del periodo"
+        )
+
+    with col2:
+        optimizado = st.toggle(
+            "WebGL + submuestreo",
+            value=True,
+            help=f"Dibuja con WebGL y envía a lo sumo {graficos.PRESUPUESTO} puntos por acción (LTTB)"
+        )
+
+    # Figura compartida entre sesiones por selección y versión del archivo
+    # (figuras.py); las selecciones comunes no se vuelven a construir
+    def construir(vivo=None):
+        vista = ts
+        if optimizado:
+            # Todas las acciones a la vez; se reutiliza entre sesiones mientras
+            # no cambien el archivo ni el rango
+            with instrumentacion.etapa("submuestreo"):
+                vista = datos.memo(
+                    ["garch_timeseries.csv"],
+                    ("lttb", page, rango, graficos.PRESUPUESTO),
+                    lambda: datos.indexar(graficos.submuestrear(ts.seleccion(ts.activos, rango), ["sigma_t"]))
+                )
+        Trazo = graficos.trazo(go, optimizado)
+
+        # Gráfico de líneas con colores distintos
+        fig = go.Figure()
+
+        if modo == "Agregada":
+            with instrumentacion.etapa("bandas"):
+                bandas = datos.memo(
+                    ["garch_timeseries.csv"],
+                    ("bandas", "sigma_t", agregados.CUANTILES),
+                    lambda: agregados.bandas(ts.frame, "sigma_t")
+                )
+                bandas = agregados.recortar(bandas, rango)
+                if optimizado:
+                    bandas = graficos.submuestrear(
+                        bandas.assign(Activo="σₜ"), ["q05", "q25", "q50", "q75", "q95"]
+                    )
+            # Cada banda se rellena hasta el trazo anterior (el límite inferior)
+            for inferior, superior, nombre, relleno in [
+                ("q05", "q95", "5–95 %", "rgba(96, 165, 250, 0.25)"),
+                ("q25", "q75", "Rango intercuartil", "rgba(30, 58, 138, 0.35)"),
+            ]:
+                fig.add_trace(Trazo(
+                    x=bandas["Fecha"], y=bandas[inferior], mode='lines',
+                    line=dict(width=0), showlegend=False, hoverinfo='skip'
+                ))
+                fig.add_trace(Trazo(
+                    x=bandas["Fecha"], y=bandas[superior], mode='lines', name=nombre,
+                    line=dict(width=0), fill='tonexty', fillcolor=relleno
+                ))
+            fig.add_trace(Trazo(
+                x=bandas["Fecha"], y=bandas["q50"], mode='lines', name='Mediana',
+                line=dict(color=color_palette[0], width=2.5)
+            ))
+
+        # Asignar colores a cada activo
+        colores_activos = {}
+        palette_extended = color_palette * ((len(activos_sel) // len(color_palette)) + 1)
+
+        with instrumentacion.etapa("trazos"):
+            for i, activo in enumerate(sorted(activos_sel)):
+                colores_activos[activo] = palette_extended[i]
+                df_activo = vista.activo(activo, rango)
+                if vivo is not None:
+                    df_activo = vivo.anexar(df_activo, activo)
+
+                fig.add_trace(Trazo(
+                    x=df_activo["Fecha"],
+                    y=df_activo["sigma_t"],
+                    mode='lines',
+                    name=activo,
+                    line=dict(color=palette_extended[i], width=2.5)
+                ))
+
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Fecha'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Volatilidad Condicional (σₜ)'),
+            height=600,
+            hovermode='x unified',
+            showlegend=True,
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="right",
+                x=0.99,
+                bgcolor="rgba(255,255,255,0.8)"
+            )
+        )
+
+        return fig
+
+    # En vivo, los σₜ nuevos se agregan al final cuando el rango llega a la
+    # última fecha del archivo; la figura cambia de llave con cada versión
+    def grafico():
+        vivo = instantanea()
+        if vivo is None or vivo.cola is None or rango[1] < df["Fecha"].max().date():
+            vivo = None
+        fig = figuras.figura(
+            page, (modo, tuple(sorted(activos_sel)), rango, optimizado, vivo and vivo.version),
+            ["garch_timeseries.csv"], lambda: construir(vivo)
+        )
+
+        with instrumentacion.etapa("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+    fragmento(grafico)
+    
+    st.caption("**Interpretación:** Los picos en la volatilidad condicional reflejan momentos de incertidumbre en el mercado (crisis, anuncios económicos, etc.). GARCH permite capturar estos cambios de manera más precisa que la volatilidad histórica.")
+
+# ============================================================
+# 4. AVERSIÓN DINÁMICA (VENTANAS MÓVILES)
+# ============================================================
+
+elif page == "Aversión dinámica":
+
+    (go, gamma_movil), (ts,) = preparar(page)
+
+    st.title("Aversión al Riesgo Dinámica – Ventanas Móviles")
+
+    if ts is None:
+        st.error("No se encontró garch_timeseries.csv")
+        st.stop()
+
+    st.markdown("""
+    <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
+    <p style='color: #4B5563; margin: 0;'>
+    El coeficiente <b>γ</b> se estima en <b>ventanas móviles</b> de rendimientos diarios, usando la
+    volatilidad histórica de la ventana (CRRA) o la varianza condicional GARCH promedio (GARCH).
+    </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Se calcula una vez por versión de garch_timeseries.csv, para todas las
+    # ventanas y activos a la vez, y se comparte entre sesiones (un índice
+    # por activo para cada ventana)
+    with instrumentacion.etapa("gamma_movil"):
+        gamma_por_ventana = datos.memo(
+            ["garch_timeseries.csv"],
+            ("gamma_movil", gamma_movil.VENTANAS),
+            lambda: {
+                w: datos.indexar(g)
+                for w, g in gamma_movil.gamma_movil(ts.frame, gamma_movil.VENTANAS).groupby("ventana")
+            }
+        )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        ventana = st.selectbox(
+            "Ventana (días hábiles):",
+            gamma_movil.VENTANAS,
+            index=len(gamma_movil.VENTANAS) - 1
+        )
+
+    with col2:
+        metodo = st.radio("Método:", ["CRRA", "GARCH"], horizontal=True)
+
+    g_ventana = gamma_por_ventana[ventana]
+    activos = g_ventana.activos
     activos_sel = st.multiselect(
         "Seleccione acciones para comparar:",
         activos,
-        default=activos,  # Todas las acciones por defecto
-        help="Puede seleccionar múltiples acciones para comparar su volatilidad"
+        default=activos,
+        help="Puede seleccionar múltiples acciones para comparar su aversión al riesgo"
     )
 
     if len(activos_sel) == 0:
         st.warning("Por favor seleccione al menos una acción.")
         st.stop()
 
-    df_plot = df[df["Activo"].isin(activos_sel)]
-
-    # Gráfico de líneas con colores distintos
-    fig = go.Figure()
-    
-    # Asignar colores a cada activo
-    colores_activos = {}
-    palette_extended = color_palette * ((len(activos_sel) // len(color_palette)) + 1)
-    
-    for i, activo in enumerate(sorted(activos_sel)):
-        colores_activos[activo] = palette_extended[i]
-        df_activo = df_plot[df_plot["Activo"] == activo]
-        
-        fig.add_trace(go.Scatter(
-            x=df_activo["Fecha"],
-            y=df_activo["sigma_t"],
-            mode='lines',
-            name=activo,
-            line=dict(color=palette_extended[i], width=2.5)
-        ))
-    
-    fig.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(showgrid=False, title='Fecha'),
-        yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Volatilidad Condicional (σₜ)'),
-        height=600,
-        hovermode='x unified',
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="right",
-            x=0.99,
-            bgcolor="rgba(255,255,255,0.8)"
+    # Figura compartida entre sesiones por selección y versión del archivo
+    # (figuras.py); las selecciones comunes no se vuelven a construir
+    def construir():
+        fig = go.Figure()
+
+        palette_extended = color_palette * ((len(activos_sel) // len(color_palette)) + 1)
+
+        with instrumentacion.etapa("trazos"):
+            for i, activo in enumerate(sorted(activos_sel)):
+                df_activo = g_ventana.activo(activo)
+
+                fig.add_trace(go.Scatter(
+                    x=df_activo["Fecha"],
+                    y=df_activo[f"gamma_{metodo}"],
+                    mode='lines',
+                    name=activo,
+                    line=dict(color=palette_extended[i], width=2)
+                ))
+
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Fecha'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title=f'Coeficiente γ {metodo} ({ventana} días)'),
+            height=600,
+            hovermode='x unified',
+            showlegend=True
         )
+        return fig
+
+    fig = figuras.figura(
+        page, (ventana, metodo, tuple(sorted(activos_sel))), ["garch_timeseries.csv"], construir
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
-    st.caption("**Interpretación:** Los picos en la volatilidad condicional reflejan momentos de incertidumbre en el mercado (crisis, anuncios económicos, etc.). GARCH permite capturar estos cambios de manera más precisa que la volatilidad histórica.")
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.caption("**Interpretación:** γ se obtiene en forma cerrada, γ = 1 + 2(μ − r_f)/σ², con la media y la varianza de cada ventana; los valores se acotan al rango de búsqueda del estimador principal. Ventanas cortas reaccionan más rápido a los cambios del mercado, pero son más ruidosas.")
 
 # ============================================================
-# 4. VOLATILIDAD HISTÓRICA VS GARCH
+# 5. VOLATILIDAD HISTÓRICA VS GARCH
 # ============================================================
 
 elif page == "Volatilidad histórica vs dinámica":
 
+    (go, graficos, volatilidad), (ts, vol) = preparar(page)
+
     st.title("Volatilidad Histórica vs Volatilidad GARCH")
 
-    if df_hist_vs_dyn is None:
+    if ts is None:
         st.error("Archivo vol_hist_vs_garch.csv no encontrado.")
         st.stop()
 
-    df = df_hist_vs_dyn.copy()
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df = df[~df["Activo"].isin(excluir_macro)]
-
     st.markdown("""
     <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
     <p style='color: #4B5563; margin: 0;'>
@@ -438,68 +793,169 @@ elif page == "Volatilidad histórica vs dinámica":
     </div>
     """, unsafe_allow_html=True)
 
-    activos = sorted(df["Activo"].unique())
+    activos = ts.activos
     activo_sel = st.selectbox(
         "Seleccione una acción:",
         activos,
         help="Elija un activo para visualizar la comparación"
     )
 
-    df_sel = df[df["Activo"] == activo_sel]
+    df_sel = ts.activo(activo_sel)
+
+    # Ventanas y EWMA salen de las sumas acumuladas de volatilidad.arrow; sin
+    # ese archivo solo queda la ventana fija de vol_hist_vs_garch.csv
+    if vol is not None and activo_sel in vol.tramos:
+        opciones = volatilidad.disponibles(vol.frame)
+        predeterminada = volatilidad.columna_ventana(volatilidad.VENTANAS[-1])
+    else:
+        opciones, predeterminada = ["vol_hist"], "vol_hist"
+    medidas_sel = st.multiselect(
+        "Volatilidad histórica:",
+        opciones,
+        default=[predeterminada],
+        format_func=lambda c: "Histórica 252 días" if c == "vol_hist" else volatilidad.etiqueta(c),
+        help="Desviación estándar móvil de los rendimientos en la ventana elegida, o volatilidad EWMA"
+    )
 
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=df_sel["Fecha"], 
-        y=df_sel["vol_hist"],
-        mode="lines", 
-        name="Volatilidad Histórica",
-        line=dict(color=color_palette[0], width=2.5)
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=df_sel["Fecha"], 
-        y=df_sel["sigma_t"],
-        mode="lines", 
-        name="Volatilidad GARCH (σₜ)",
-        line=dict(color=color_palette[1], width=2.5)
-    ))
-    
-    fig.update_layout(
-        height=600,
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        xaxis=dict(showgrid=False, title='Fecha'),
-        yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Volatilidad'),
-        hovermode='x unified',
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01,
-            bgcolor="rgba(255,255,255,0.8)"
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        rango = st.slider(
+            "Rango de fechas:",
+            min_value=df_sel["Fecha"].min().date(),
+            max_value=df_sel["Fecha"].max().date(),
+            value=(df_sel["Fecha"].min().date(), df_sel["Fecha"].max().date()),
+            format="YYYY-MM-DD",
+            help="Al acotar el rango, el gráfico se vuelve a submuestrear con todo el detalle del periodo"
         )
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        optimizado = st.toggle(
+            "WebGL + submuestreo",
+            value=True,
+            help=f"Dibuja con WebGL y envía a lo sumo {graficos.PRESUPUESTO} puntos por serie (LTTB)"
+        )
+
+    # Figura compartida entre sesiones por selección y versión del archivo
+    # (figuras.py); las selecciones comunes no se vuelven a construir
+    fuentes = ["vol_hist_vs_garch.csv"] + (["volatilidad.arrow"] if vol is not None else [])
+
+    def construir(vivo=None):
+        df_sel = ts.activo(activo_sel, rango)
+        ventanas = [c for c in medidas_sel if c != "vol_hist"]
+        if ventanas:
+            # Las ventanas se calculan sobre toda la historia del activo (las
+            # primeras fechas del rango necesitan las anteriores) y se pegan
+            # por fecha a las filas del rango
+            with instrumentacion.etapa("ventanas"):
+                df_sel = df_sel.merge(
+                    volatilidad.medidas(vol.activo(activo_sel), ventanas), on="Fecha", how="left"
+                )
+        columnas = [*medidas_sel, "sigma_t"]
+        if optimizado:
+            with instrumentacion.etapa("submuestreo"):
+                df_sel = datos.memo(
+                    fuentes,
+                    ("lttb", page, activo_sel, rango, tuple(medidas_sel), graficos.PRESUPUESTO),
+                    lambda: graficos.submuestrear(df_sel, columnas)
+                )
+        if vivo is not None:
+            # Las filas en vivo traen solo σₜ y van después del submuestreo
+            df_sel = vivo.anexar(df_sel, activo_sel)
+        Trazo = graficos.trazo(go, optimizado)
+
+        fig = go.Figure()
+
+        with instrumentacion.etapa("trazos"):
+            for k, medida in enumerate(medidas_sel):
+                fig.add_trace(Trazo(
+                    x=df_sel["Fecha"],
+                    y=df_sel[medida],
+                    mode="lines",
+                    name="Volatilidad Histórica" if medida == "vol_hist" else volatilidad.etiqueta(medida),
+                    line=dict(color=color_palette[(0, 5, 2, 6)[k % 4]], width=2.5 if k == 0 else 1.5,
+                              dash=("solid", "dash", "dot", "dashdot")[k % 4])
+                ))
+
+            fig.add_trace(Trazo(
+                x=df_sel["Fecha"], 
+                y=df_sel["sigma_t"],
+                mode="lines", 
+                name="Volatilidad GARCH (σₜ)",
+                line=dict(color=color_palette[1], width=2.5)
+            ))
+
+        fig.update_layout(
+            height=600,
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Fecha'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Volatilidad'),
+            hovermode='x unified',
+            showlegend=True,
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="left",
+                x=0.01,
+                bgcolor="rgba(255,255,255,0.8)"
+            )
+        )
+
+        return fig
+
+    def grafico():
+        vivo = instantanea()
+        if vivo is None or vivo.cola is None or rango[1] < df_sel["Fecha"].max().date():
+            vivo = None
+        fig = figuras.figura(page, (activo_sel, rango, optimizado, tuple(medidas_sel), vivo and vivo.version),
+                             fuentes, lambda: construir(vivo))
+
+        with instrumentacion.etapa("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+    fragmento(grafico)
 
     st.caption("**Análisis:** La volatilidad GARCH reacciona más rápidamente a los cambios del mercado, mientras que la histórica es más suavizada. Los momentos donde GARCH supera significativamente a la histórica indican periodos de turbulencia no anticipada.")
 
 # ============================================================
-# 5. DIAGNÓSTICOS GARCH
+# 6. DIAGNÓSTICOS GARCH
 # ============================================================
 
 elif page == "Diagnósticos GARCH":
 
+    (diagnosticos,), (df_tests, parametros) = preparar(page)
+
     st.title("Diagnósticos del Modelo GARCH(1,1)")
 
+    rezagos = st.slider(
+        "Rezagos de ARCH-LM y Ljung-Box:",
+        min_value=1,
+        max_value=40,
+        value=diagnosticos.REZAGOS,
+        help="Las pruebas se recalculan sobre los residuos estandarizados del modelo vigente"
+    )
+
+    # Las pruebas se recalculan desde los rendimientos y los parámetros
+    # vigentes (garch_parametros.csv, o un ajuste nuevo si no existe); cada
+    # activo queda memorizado por hash de datos, parámetros y rezagos
+    with instrumentacion.etapa("rendimientos"):
+        panel = datos.memo(["precios.csv", "rendimientos.csv"], "rendimientos", datos.leer_rendimientos)
+    if panel is not None:
+        with st.spinner("Calculando diagnósticos..."), instrumentacion.etapa("diagnosticos"):
+            df_tests = diagnosticos.diagnosticar(
+                panel,
+                diagnosticos.parametros_de_tabla(parametros),
+                rezagos
+            )
+    elif df_tests is not None:
+        st.warning("No se encontraron los rendimientos; se muestran los diagnósticos guardados en garch_supuestos.csv")
+
     if df_tests is None:
         st.error("No se encontró garch_supuestos.csv")
         st.stop()
 
-    df = df_tests.copy()
-    df = df.round(4)
+    df = df_tests.round(4)
 
     st.markdown("""
     <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
@@ -513,7 +969,8 @@ elif page == "Diagnósticos GARCH":
     st.subheader("Resultados de Pruebas Estadísticas")
     
     # Tabla sin colores
-    st.dataframe(df, use_container_width=True)
+    with instrumentacion.etapa("tabla"):
+        st.dataframe(df, use_container_width=True)
     
     st.caption("**Tabla:** Resultados de las pruebas estadísticas para validar los supuestos del modelo GARCH.")
 
@@ -615,4 +1072,409 @@ elif page == "Diagnósticos GARCH":
     
     La aversión al riesgo implícita en el mercado financiero colombiano entre 2020 y 2025 fue estimada mediante funciones de utilidad CRRA y FTP junto con medidas de volatilidad histórica y condicional GARCH(1,1). Los resultados muestran que la aversión al riesgo bajo CRRA es baja y estable, mientras que la función FTP genera valores más altos debido a su sensibilidad a colas pesadas. Aunque los modelos GARCH capturan adecuadamente la dinámica de la volatilidad, la volatilidad condicional no altera de manera significativa el coeficiente de aversión al riesgo estimado. En conjunto, el análisis evidencia que, pese a la alta persistencia de la volatilidad en Colombia, la aversión al riesgo basada en CRRA se mantiene rígida frente a los cambios en la incertidumbre, lo que resalta la importancia de explorar funciones de utilidad o metodologías más flexibles en estudios futuros.
     
+    *Nota:* esta conclusión resume el estudio original. Las tablas del tablero se recalculan con aversion.py (γ que iguala el equivalente cierto a la tasa libre de riesgo) y están en otra escala: γ CRRA ya no queda en la cota inferior de 0.01 y γ FTP difiere de γ CRRA solo por la asimetría y las colas.
     """)
+
+# ============================================================
+# 7. PRONÓSTICO DE VOLATILIDAD
+# ============================================================
+
+elif page == "Pronóstico de volatilidad":
+
+    (go, pronostico), (parametros,) = preparar(page)
+
+    st.title("Pronóstico de Volatilidad – Estructura Temporal, VaR y ES")
+
+    if parametros is None:
+        st.error("No se encontró garch_parametros.csv (lo genera pipeline.py)")
+        st.stop()
+
+    st.markdown("""
+    <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
+    <p style='color: #4B5563; margin: 0;'>
+    Volatilidad condicional esperada de <b>1 a 250 días</b> hacia adelante desde el último dato, con el modelo
+    elegido para cada activo, y el <b>VaR</b> y el <b>ES</b> paramétricos del rendimiento acumulado a cada horizonte.
+    </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    medidas_pronostico = {
+        "Volatilidad diaria": "sigma",
+        "Volatilidad acumulada": "sigma_acum",
+        "VaR": "VaR",
+        "ES": "ES",
+    }
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        nivel = st.select_slider(
+            "Nivel de confianza:",
+            options=[0.95, 0.975, 0.99],
+            value=pronostico.NIVEL,
+            format_func=lambda x: f"{x:.1%}"
+        )
+
+    with col2:
+        medida = st.radio("Medida:", list(medidas_pronostico), horizontal=True)
+
+    # Forma cerrada sobre la matriz activos x horizontes (los EGARCH se
+    # simulan); se calcula una vez por nivel y versión de los parámetros
+    with instrumentacion.etapa("pronostico"):
+        tabla = datos.memo(
+            ["garch_parametros.csv"],
+            ("pronostico", nivel),
+            lambda: pronostico.calcular(parametros[~parametros["Activo"].isin(excluir_macro)], nivel=nivel)
+        )
+
+    activos = list(dict.fromkeys(tabla["Activo"]))
+    activos_sel = st.multiselect(
+        "Seleccione acciones:",
+        activos,
+        default=activos[:10],
+        help="El pronóstico se calcula para todos los activos; aquí solo se elige qué dibujar"
+    )
+
+    if len(activos_sel) == 0:
+        st.warning("Por favor seleccione al menos una acción.")
+        st.stop()
+
+    columna = medidas_pronostico[medida]
+
+    def construir():
+        fig = go.Figure()
+
+        palette_extended = color_palette * ((len(activos_sel) // len(color_palette)) + 1)
+
+        with instrumentacion.etapa("trazos"):
+            for i, activo in enumerate(sorted(activos_sel)):
+                df_activo = tabla[tabla["Activo"] == activo]
+                fig.add_trace(go.Scatter(
+                    x=df_activo["h"],
+                    y=df_activo[columna],
+                    mode='lines',
+                    name=activo,
+                    line=dict(color=palette_extended[i], width=2),
+                    hovertemplate='%{y:.2%}'
+                ))
+
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Horizonte (días hábiles)'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title=medida, tickformat='.1%'),
+            height=550,
+            hovermode='x unified',
+            showlegend=True
+        )
+        return fig
+
+    fig = figuras.figura(
+        page, (nivel, columna, tuple(sorted(activos_sel))), ["garch_parametros.csv"], construir
+    )
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Pronóstico por activo")
+
+    horizontes = [h for h in (1, 5, 10, 20, 60, 120, 250) if h <= tabla["h"].max()]
+    h_sel = st.select_slider("Horizonte (días):", options=horizontes, value=10 if 10 in horizontes else horizontes[0])
+
+    resumen = tabla[tabla["h"] == h_sel].drop(columns="h").rename(columns={
+        "sigma": "σ diaria", "sigma_acum": "σ acumulada", "metodo": "Método"
+    })
+    st.dataframe(
+        resumen.style.format({c: "{:.2%}" for c in ["σ diaria", "σ acumulada", "VaR", "ES"]}),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    st.download_button(
+        "Descargar pronóstico completo (CSV)",
+        datos.memo(["garch_parametros.csv"], ("pronostico_csv", nivel),
+                   lambda: tabla.to_csv(index=False).encode("utf-8")),
+        file_name=f"pronostico_GARCH_{nivel:.3f}.csv",
+        mime="text/csv"
+    )
+
+    st.caption("**Interpretación:** La volatilidad diaria converge a su nivel de largo plazo a una velocidad que fija la persistencia del modelo. El VaR es la pérdida (rendimiento log acumulado) que solo se supera con probabilidad 1 − nivel; el ES es la pérdida promedio cuando se supera. Con innovaciones t la cola es más pesada que con la normal.")
+
+# ============================================================
+# 8. CORRELACIONES
+# ============================================================
+
+elif page == "Correlaciones":
+
+    (np, go, correlacion), (corr,) = preparar(page)
+
+    st.title("Correlaciones entre Activos – Incondicional, Móvil y Dinámica")
+
+    if corr is None:
+        st.error("No se encontró correlacion.npz (lo genera pipeline.py)")
+        st.stop()
+
+    st.markdown("""
+    <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
+    <p style='color: #4B5563; margin: 0;'>
+    La <b>correlación móvil</b> usa los rendimientos de una ventana que termina en la fecha elegida; la
+    <b>dinámica (DCC)</b> usa los residuos estandarizados del GARCH, de modo que no confunde correlación con
+    cambios de volatilidad.
+    </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    fechas = corr["fechas"]
+    activos = [str(a) for a in corr["activos"]]
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+
+    with col1:
+        medida = st.radio("Medida:", ["Incondicional", "Móvil", "Dinámica (DCC)"], horizontal=True)
+
+    with col2:
+        ventana = st.select_slider(
+            "Ventana (días):", options=list(correlacion.VENTANAS), value=correlacion.VENTANAS[-1],
+            disabled=medida != "Móvil"
+        )
+
+    with col3:
+        ultima = fechas[-1].astype("datetime64[D]").item()
+        fecha = st.date_input(
+            "Fecha:", value=ultima, min_value=fechas[0].astype("datetime64[D]").item(), max_value=ultima,
+            disabled=medida == "Incondicional"
+        )
+
+    # Índice de la última fecha del archivo que no pasa de la elegida
+    t = max(int(np.searchsorted(fechas, np.datetime64(fecha, "ns"), side="right")) - 1, 0)
+    clave = (medida,) if medida == "Incondicional" else (medida, t, ventana if medida == "Móvil" else None)
+
+    def calcular_matriz():
+        if medida == "Incondicional":
+            return correlacion.correlacion({k: corr[k] for k in ("n", "s", "q", "p")})
+        if medida == "Móvil":
+            return correlacion.movil(corr["R"], t, ventana)
+        return correlacion.dcc(corr, t)
+
+    with instrumentacion.etapa("matriz"):
+        matriz = datos.memo(["correlacion.npz"], ("correlacion",) + clave, calcular_matriz)
+
+    activos_sel = st.multiselect(
+        "Seleccione activos:",
+        activos,
+        default=[a for a in activos if a not in excluir_macro]
+    )
+
+    if len(activos_sel) < 2:
+        st.warning("Por favor seleccione al menos dos activos.")
+        st.stop()
+
+    idx = [activos.index(a) for a in activos_sel]
+
+    def construir():
+        sub = matriz[np.ix_(idx, idx)]
+        fig = go.Figure(go.Heatmap(
+            z=sub,
+            x=activos_sel,
+            y=activos_sel,
+            zmin=-1,
+            zmax=1,
+            colorscale="RdBu_r",
+            text=np.round(sub, 2) if len(idx) <= 25 else None,
+            texttemplate="%{text}" if len(idx) <= 25 else None,
+            hovertemplate='%{y} – %{x}: %{z:.3f}<extra></extra>'
+        ))
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            height=max(450, 28 * len(idx) + 150),
+            yaxis=dict(autorange="reversed")
+        )
+        return fig
+
+    fig = figuras.figura(page, clave + (tuple(activos_sel),), ["correlacion.npz"], construir)
+
+    if medida != "Incondicional":
+        st.caption(f"Matriz al {np.datetime_as_string(fechas[t], unit='D')}")
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Correlación de un par en el tiempo")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        activo_a = st.selectbox("Activo 1:", activos_sel, index=0)
+    with col2:
+        activo_b = st.selectbox("Activo 2:", [a for a in activos_sel if a != activo_a], index=0)
+
+    i, j = activos.index(activo_a), activos.index(activo_b)
+
+    def calcular_incondicional():
+        return datos.memo(
+            ["correlacion.npz"], ("correlacion", "Incondicional"),
+            lambda: correlacion.correlacion({k: corr[k] for k in ("n", "s", "q", "p")})
+        )
+
+    def construir_par():
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=fechas,
+            y=correlacion.serie_dcc(corr, i, j),
+            mode='lines',
+            name='DCC',
+            line=dict(color=color_palette[0], width=2)
+        ))
+        fig.add_trace(go.Scatter(
+            x=fechas,
+            y=correlacion.serie_movil(corr, i, j, ventana),
+            mode='lines',
+            name=f'Móvil {ventana} días',
+            line=dict(color=color_palette[2], width=2)
+        ))
+        fig.add_hline(
+            y=float(calcular_incondicional()[i, j]),
+            line_dash="dash", line_color="#6B7280", annotation_text="Incondicional"
+        )
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Fecha'),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title='Correlación', range=[-1, 1]),
+            height=450,
+            hovermode='x unified'
+        )
+        return fig
+
+    fig_par = figuras.figura(page, ("par", activo_a, activo_b, ventana), ["correlacion.npz"], construir_par)
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig_par, use_container_width=True)
+
+    st.caption("**Interpretación:** Correlaciones altas reducen el beneficio de diversificar. Si la correlación dinámica sube en los periodos de estrés, la diversificación falla justo cuando más se necesita.")
+
+# ============================================================
+# 9. SENSIBILIDAD DE GAMMA
+# ============================================================
+
+elif page == "Sensibilidad de gamma":
+
+    (np, go, sensibilidad), (sup,) = preparar(page)
+
+    st.title("Sensibilidad de la Aversión al Riesgo a los Supuestos")
+
+    if sup is None:
+        st.error("No se encontró sensibilidad_gamma.npz (lo genera pipeline.py)")
+        st.stop()
+
+    st.markdown("""
+    <div style='background-color: white; padding: 15px; border-radius: 8px; margin-bottom: 20px;'>
+    <p style='color: #4B5563; margin: 0;'>
+    Los gammas se calcularon de antemano para una grilla de <b>tasas libres de riesgo</b>, <b>ventanas de
+    muestra</b> y <b>horizontes</b>; cada cambio aquí solo lee esa grilla e interpola entre sus puntos.
+    </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    ventanas = [int(v) for v in sup["ventanas"]]
+    horizontes = [int(h) for h in sup["horizontes"]]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        metodo = st.selectbox("Método:", list(sup["metodos"]))
+        tasa = st.selectbox(
+            "Tasa libre de riesgo:", list(sup["tasas"]),
+            help="Promedio de la tasa en las fechas de la ventana de cada activo"
+        )
+
+    with col2:
+        ventana = st.slider("Ventana (observaciones):", ventanas[0], ventanas[-1], ventanas[-1], step=10)
+        horizonte = st.slider("Horizonte (días):", horizontes[0], horizontes[-1], horizontes[0])
+
+    activos = [str(a) for a in sup["activos"]]
+    visibles = [i for i, a in enumerate(activos) if a not in excluir_macro]
+    # NaN si algún punto vecino de la grilla quedó en una cota o sin datos
+    gammas = sensibilidad.consultar(sup, metodo, tasa, ventana, horizonte)
+    validos = [i for i in visibles if np.isfinite(gammas[i])]
+
+    def construir():
+        orden = sorted(validos, key=lambda i: -gammas[i])
+        fig = go.Figure(go.Bar(
+            x=[activos[i] for i in orden],
+            y=[gammas[i] for i in orden],
+            marker_color=color_palette[0],
+            hovertemplate='%{x}: %{y:.3f}<extra></extra>'
+        ))
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(showgrid=False, title='Activo', tickangle=-45),
+            yaxis=dict(showgrid=True, gridcolor='#E5E7EB', title=f'gamma_{metodo}'),
+            height=500
+        )
+        return fig
+
+    fig = figuras.figura(
+        page, (metodo, tasa, ventana, horizonte), ["sensibilidad_gamma.npz"], construir
+    )
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    sin_valor = [activos[i] for i in visibles if i not in validos]
+    if sin_valor:
+        st.caption(
+            "Sin valor (algún punto vecino de la grilla quedó en una cota de búsqueda o sin datos): "
+            + ", ".join(sin_valor)
+        )
+
+    st.subheader("Superficie por activo")
+
+    activo_sel = st.selectbox("Activo:", [activos[i] for i in visibles])
+
+    def construir_superficie():
+        Z = sensibilidad.superficie(sup, metodo, tasa, activo_sel)
+        fig = go.Figure(go.Heatmap(
+            z=Z,
+            x=[str(h) for h in horizontes],
+            y=[str(w) for w in ventanas],
+            colorscale="Blues",
+            text=np.round(Z.astype(float), 2),
+            texttemplate="%{text}",
+            hovertemplate='Ventana %{y} – h %{x}: %{z:.3f}<extra></extra>'
+        ))
+        fig.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            xaxis=dict(title='Horizonte (días)', type='category'),
+            yaxis=dict(title='Ventana (observaciones)', type='category'),
+            height=420
+        )
+        return fig
+
+    fig_sup = figuras.figura(
+        page, ("superficie", metodo, tasa, activo_sel), ["sensibilidad_gamma.npz"], construir_superficie
+    )
+
+    with instrumentacion.etapa("plotly_chart"):
+        st.plotly_chart(fig_sup, use_container_width=True)
+
+    st.caption(f"**Interpretación:** Si el gamma cambia mucho entre filas o columnas, la conclusión depende del supuesto y no solo de los datos. FTP usa kappa = {float(sup['kappa']):g}.")
+
+# ============================================================
+# INSTRUMENTACIÓN
+# ============================================================
+
+ejecucion = instrumentacion.terminar(cache_figuras=figuras.estadisticas())
+if ejecucion is not None:
+    with st.sidebar.expander(f"Tiempos de esta ejecución: {ejecucion['total_ms']:.0f} ms"):
+        st.dataframe(instrumentacion.tabla(ejecucion), hide_index=True, use_container_width=True)
+        cache = ejecucion["cache_figuras"]
+        if cache["tasa_aciertos"] is not None:
+            st.caption(
+                f"Caché de figuras: {cache['tasa_aciertos']:.0%} de aciertos "
+                f"({cache['aciertos']} de {cache['aciertos'] + cache['fallos']}), "
+                f"{cache['entradas']} figuras, {cache['ocupado_mb']:.1f} de "
+                f"{cache['presupuesto_mb']:.0f} MB, {cache['desalojos']} desalojos"
+            )
@@ -0,0 +1,318 @@
+"""
+Coeficientes de aversión al riesgo implícitos (CRRA y FTP) para todo el panel.
+
+Siguiendo a Chávez, Milanesi y Pesce (2021), el coeficiente implícito es el
+que iguala el equivalente cierto de la riqueza al final del periodo,
+W = exp(r), con el rendimiento libre de riesgo:
+
+    CE_gamma(W) = exp(rf)
+
+- CRRA: u(W) = (W^(1-g) - 1) / (1-g), de modo que
+  log CE = log E[exp((1-g) r)] / (1-g).
+- FTP (tres parámetros: g, kappa y la riqueza de referencia W = 1):
+  u(W) = -exp(-kappa * u_CRRA(W)) / kappa. Su aversión relativa en W = 1 es
+  a = g + kappa; se busca directamente a (con g = a - kappa) en las mismas
+  cotas que CRRA y eso es lo que se reporta como gamma_FTP.
+- GARCH: el mismo CRRA, con la dispersión de los rendimientos reescalada a
+  la volatilidad condicional media (sigma_mean) en lugar de la histórica.
+
+Hasta segundo orden (log CE ~ media - a * varianza / 2) toda utilidad con la
+misma aversión relativa en W = 1 da el mismo equivalente cierto: gamma_FTP
+coincide con gamma_CRRA salvo por la asimetría y las colas de los
+rendimientos, y la diferencia entre ambos es justamente esa contribución.
+
+Los archivos de resultados publicados originalmente venían de cuadernos que
+no están en el repositorio y no se pueden reproducir: gamma_CRRA quedaba en
+la cota 0.01 para todas las acciones y gamma_FTP cerca de 1. Desde este
+módulo todos los resultados (resultados_*.csv, tablero_final_completo.csv,
+sensibilidad_gamma.npz) se recalculan con la raíz de CE = rf descrita aquí,
+y sus valores están en otra escala que los originales.
+
+El equivalente cierto decrece en g, así que la raíz se obtiene con un método
+acotado (falsa posición de Illinois) simultáneo para todos los activos: cada
+paso es una operación sobre la matriz de rendimientos (activos x
+observaciones, NaN donde no hay dato) y las dimensiones iniciales adicionales
+(p. ej. una grilla de parámetros) se difunden sin bucles. Cada activo queda
+con un estado que explica su valor.
+
+Uso:
+    python aversion.py [--rf 0.0] [--kappa 1.0] [--horizonte 1] [--directorio data]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+
+# Cotas de búsqueda del coeficiente (la inferior es la que ya usaban los
+# archivos de resultados)
+COTAS = (0.01, 20.0)
+
+KAPPA = 1.0
+
+# Mínimo de observaciones para estimar
+MIN_OBS = 30
+
+# Estados por activo
+OK = 0
+COTA_INFERIOR = 1
+COTA_SUPERIOR = 2
+SERIE_TASA = 3
+DATOS_INSUFICIENTES = 4
+SIN_VOLATILIDAD = 5
+SIN_TASA = 6
+
+ESTADOS = {
+    OK: "ok",
+    COTA_INFERIOR: "cota inferior: la raíz está por debajo del mínimo buscado",
+    COTA_SUPERIOR: "cota superior: la raíz está por encima del máximo buscado",
+    SERIE_TASA: "serie de tasas: no es un precio negociable",
+    DATOS_INSUFICIENTES: f"menos de {MIN_OBS} observaciones",
+    SIN_VOLATILIDAD: "sin volatilidad GARCH para el activo",
+    SIN_TASA: "sin datos de la tasa libre de riesgo en la muestra",
+}
+
+
+# ============================================================
+# EQUIVALENTES CIERTOS
+# ============================================================
+
+def _log_media_exp(A):
+    """log(mean(exp(A))) por fila ignorando NaN, estable numéricamente."""
+    validos = ~np.isnan(A)
+    n = A.shape[-1]
+    if not validos.all():
+        A = np.where(validos, A, -np.inf)
+        n = validos.sum(axis=-1)
+    m = np.max(A, axis=-1, keepdims=True)
+    m = np.where(np.isfinite(m), m, 0.0)
+    with np.errstate(divide="ignore"):
+        s = np.log(np.sum(np.exp(A - m), axis=-1))
+    return s + m[..., 0] - np.log(n)
+
+
+def _utilidad_crra(X, g):
+    """(W^(1-g) - 1) / (1-g) con W = exp(X); en g = 1 es log W = X."""
+    c = (1 - g)[..., None]
+    uno = np.abs(c) < 1e-10
+    with np.errstate(over="ignore", invalid="ignore"):
+        u = np.expm1(c * X) / np.where(uno, 1.0, c)
+    return np.where(uno, X, u)
+
+
+def _log_desde_utilidad(u, g):
+    """Inversa de la utilidad CRRA: log W a partir de u."""
+    c = 1 - g
+    uno = np.abs(c) < 1e-10
+    c_seguro = np.where(uno, 1.0, c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base = 1 + c_seguro * u
+        logw = np.where(base > 0, np.log(np.where(base > 0, base, 1.0)) / c_seguro, -np.inf)
+    return np.where(uno, u, logw)
+
+
+def log_ce_crra(X, g):
+    c = 1 - g
+    uno = np.abs(c) < 1e-10
+    with np.errstate(invalid="ignore", over="ignore"):
+        lme = _log_media_exp(c[..., None] * X) / np.where(uno, 1.0, c)
+    if uno.any():
+        lme = np.where(uno, np.nanmean(X, axis=-1), lme)
+    return lme
+
+
+def log_ce_ftp(X, g, kappa=KAPPA):
+    # u_CE = -log E[exp(-kappa u_CRRA(W))] / kappa
+    u_ce = -_log_media_exp(-kappa * _utilidad_crra(X, g)) / kappa
+    return _log_desde_utilidad(u_ce, g)
+
+
+# ============================================================
+# COEFICIENTE IMPLÍCITO
+# ============================================================
+
+def gamma_implicito(X, log_ce, rf=0.0, cotas=COTAS, iteraciones=100, tol=1e-10):
+    """Resuelve log_ce(X, g) = rf, vectorizado sobre X[..., :].
+
+    Usa falsa posición con la corrección de Illinois dentro del intervalo
+    [cotas]: conserva la garantía de la bisección pero converge en pocas
+    iteraciones, y se detiene cuando todas las raíces convergieron.
+    Devuelve (gamma, estado). Fuera de las cotas gamma queda en la cota y el
+    estado lo indica.
+    """
+    forma = X.shape[:-1]
+    rf = np.broadcast_to(np.asarray(rf, dtype=float), forma)
+    lo = np.full(forma, cotas[0])
+    hi = np.full(forma, cotas[1])
+
+    # log_ce decrece en g: f(lo) >= 0 >= f(hi) cuando la raíz está adentro
+    f_lo = log_ce(X, lo) - rf
+    f_hi = log_ce(X, hi) - rf
+    bajo = f_lo < 0
+    alto = f_hi > 0
+    pendiente = ~(bajo | alto)
+    raiz = (lo + hi) / 2
+    lado = np.zeros(forma)
+
+    for _ in range(iteraciones):
+        if not pendiente.any():
+            break
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            x = hi - f_hi * (hi - lo) / (f_hi - f_lo)
+        x = np.where(np.isfinite(x) & (x > lo) & (x < hi), x, (lo + hi) / 2)
+        f = log_ce(X, x) - rf
+
+        arriba = pendiente & (f > 0)
+        abajo = pendiente & ~(f > 0)
+        f_hi = np.where(arriba & (lado == 1), f_hi / 2, f_hi)
+        f_lo = np.where(abajo & (lado == -1), f_lo / 2, f_lo)
+        lo, f_lo = np.where(arriba, x, lo), np.where(arriba, f, f_lo)
+        hi, f_hi = np.where(abajo, x, hi), np.where(abajo, f, f_hi)
+        lado = np.where(arriba, 1, np.where(abajo, -1, lado))
+        raiz = np.where(pendiente, x, raiz)
+        pendiente &= (np.abs(f) > tol) & (hi - lo > tol)
+
+    gamma = np.where(bajo, cotas[0], np.where(alto, cotas[1], raiz))
+    estado = np.where(bajo, COTA_INFERIOR, np.where(alto, COTA_SUPERIOR, OK))
+    return gamma, estado
+
+
+def horizonte_rendimientos(X, horizonte=1):
+    """Rendimientos a ``horizonte`` días bajo independencia: media por h y
+    desviaciones por raíz de h.
+
+    ``horizonte`` puede ser un arreglo que se difunde contra X.shape[:-1].
+    """
+    if np.ndim(horizonte) == 0 and horizonte == 1:
+        return X
+    h = np.asarray(horizonte, dtype=float)[..., None]
+    mu = np.nanmean(X, axis=-1, keepdims=True)
+    return mu * h + (X - mu) * np.sqrt(h)
+
+
+def reescalar_volatilidad(X, sigma):
+    """Misma forma de la distribución con desviación estándar ``sigma``."""
+    mu = np.nanmean(X, axis=-1, keepdims=True)
+    sd = np.nanstd(X, axis=-1, ddof=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return mu + (X - mu) * (np.asarray(sigma)[..., None] / sd)
+
+
+def _enmascarar(gamma, estado, invalidos, codigo):
+    return np.where(invalidos, np.nan, gamma), np.where(invalidos, codigo, estado)
+
+
+def gammas(X, sigma_garch=None, rf=0.0, horizonte=1, kappa=KAPPA, cotas=COTAS):
+    """(gamma, estado) CRRA, FTP y GARCH para cada fila de X, sin máscaras.
+
+    ``sigma_garch`` debe difundirse contra X.shape[:-1]; si es None no se
+    calcula GARCH.
+    """
+    Xh = horizonte_rendimientos(X, horizonte)
+    rf_h = np.asarray(rf) * horizonte
+    res = {
+        "CRRA": gamma_implicito(Xh, log_ce_crra, rf_h, cotas),
+        # Se busca la aversión relativa a = g + kappa
+        "FTP": gamma_implicito(Xh, lambda X, a: log_ce_ftp(X, a - kappa, kappa), rf_h, cotas),
+    }
+    if sigma_garch is not None:
+        sigma_h = np.asarray(sigma_garch, dtype=float) * np.sqrt(horizonte)
+        res["GARCH"] = gamma_implicito(reescalar_volatilidad(Xh, sigma_h), log_ce_crra, rf_h, cotas)
+    return res
+
+
+def estimar(nombres, X, sigma_garch=None, rf=0.0, horizonte=1, kappa=KAPPA, cotas=COTAS):
+    """gamma_CRRA, gamma_FTP y gamma_GARCH con su estado para cada fila de X.
+
+    ``sigma_garch`` es la volatilidad condicional media por activo (NaN si no
+    hay ajuste); si es None no se calcula gamma_GARCH.
+    """
+    tasa = np.array([datos.clean_name(n) in datos.SERIES_TASA for n in nombres])
+    corta = (~np.isnan(X)).sum(axis=-1) < MIN_OBS
+
+    res = {}
+    for metodo, (g, e) in gammas(X, sigma_garch, rf, horizonte, kappa, cotas).items():
+        if metodo == "GARCH":
+            g, e = _enmascarar(g, e, np.isnan(sigma_garch), SIN_VOLATILIDAD)
+        g, e = _enmascarar(g, e, corta, DATOS_INSUFICIENTES)
+        res[f"gamma_{metodo}"], res[f"estado_{metodo}"] = _enmascarar(g, e, tasa, SERIE_TASA)
+    return res
+
+
+# ============================================================
+# ARCHIVOS DE SALIDA
+# ============================================================
+
+def tablas(panel, precios, garch=None, **parametros):
+    """DataFrames de resultados_CRRA, resultados_FTP y resultados_completos_tablero.
+
+    ``garch`` es resultados_GARCH.csv (si existe); su gamma_GARCH se
+    recalcula con sigma_mean.
+    """
+    nombres, X = datos.apilar(panel)
+    sigma = None
+    if garch is not None:
+        sigma = pd.Series(garch["sigma_mean"].to_numpy(), index=garch["Activo"].map(datos.clean_name))
+        sigma = sigma.reindex([datos.clean_name(n) for n in nombres]).to_numpy()
+    res = estimar(nombres, X, sigma, **parametros)
+
+    crra = pd.DataFrame({
+        "Activo": nombres,
+        "gamma_CRRA": res["gamma_CRRA"],
+        "vol_hist": np.nanstd(X, axis=1, ddof=1),
+        "precio_promedio": [precios[n].mean() for n in nombres],
+    })
+    ftp = pd.DataFrame({"Activo": nombres, "gamma_FTP": res["gamma_FTP"]})
+
+    completo = crra.assign(gamma_FTP=res["gamma_FTP"])
+    if garch is not None:
+        completo = completo.assign(
+            gamma_GARCH=res["gamma_GARCH"],
+            sigma_last=pd.Series(garch["sigma_last"].to_numpy(), index=garch["Activo"].map(datos.clean_name))
+            .reindex(completo["Activo"].map(datos.clean_name)).to_numpy(),
+            sigma_mean=sigma,
+        )
+    for metodo in ("CRRA", "FTP", "GARCH"):
+        if f"estado_{metodo}" in res:
+            completo[f"estado_{metodo}"] = [ESTADOS[c] for c in res[f"estado_{metodo}"]]
+    return crra, ftp, completo, res
+
+
+def escribir(panel, precios, directorio=None, **parametros):
+    directorio = directorio or datos.DATA_DIR
+    path_garch = os.path.join(directorio, "resultados_GARCH.csv")
+    garch = pd.read_csv(path_garch, float_precision="round_trip") if os.path.exists(path_garch) else None
+
+    crra, ftp, completo, res = tablas(panel, precios, garch, **parametros)
+    datos.escribir_csv(crra, "resultados_CRRA.csv", directorio)
+    datos.escribir_csv(ftp, "resultados_FTP.csv", directorio)
+    if garch is not None:
+        gamma = dict(zip(completo["Activo"].map(datos.clean_name), completo["gamma_GARCH"]))
+        garch["gamma_GARCH"] = garch["Activo"].map(datos.clean_name).map(gamma)
+        datos.escribir_csv(garch, "resultados_GARCH.csv", directorio)
+    datos.escribir_csv(completo, "resultados_completos_tablero.csv", directorio)
+    return completo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aversión al riesgo implícita CRRA/FTP/GARCH")
+    parser.add_argument("--rf", type=float, default=0.0, help="tasa libre de riesgo diaria (log)")
+    parser.add_argument("--kappa", type=float, default=KAPPA, help="parámetro de forma FTP")
+    parser.add_argument("--horizonte", type=int, default=1, help="horizonte en días")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    precios = datos.leer_precios(os.path.join(args.directorio, "precios.csv"))
+    panel = datos.leer_rendimientos(os.path.join(args.directorio, "rendimientos.csv"), precios)
+    completo = escribir(
+        panel, precios, args.directorio, rf=args.rf, horizonte=args.horizonte, kappa=args.kappa
+    )
+    columnas = ["Activo", "gamma_CRRA", "gamma_FTP", "gamma_GARCH", "estado_CRRA"]
+    print(completo[[c for c in columnas if c in completo.columns]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Intervalos de confianza bootstrap para gamma_CRRA, gamma_FTP y gamma_GARCH.
+
+Los rendimientos son dependientes, así que se remuestrean por bloques:
+bootstrap estacionario (Politis y Romano, 1994; bloques de largo geométrico
+con media ``bloque``) o bloques circulares de largo fijo. Todas las réplicas
+de un activo se generan de una vez como una matriz de índices, y los gammas
+de todas las réplicas se calculan con las mismas operaciones matriciales de
+aversion.py (cada réplica es una fila). Los activos se reparten en un pool
+de procesos; cada uno recibe su propia semilla derivada de ``--semilla``, de
+modo que el resultado no depende del número de procesos.
+
+Los gammas de cada réplica usan el mismo horizonte que los puntuales
+(``--horizonte``). Para GARCH se remuestrea también sigma_t
+(garch_timeseries.csv) con los mismos índices, y cada réplica se reescala a
+su propia volatilidad condicional media.
+
+Las réplicas cuyo gamma quedó en una cota de búsqueda no entran en los
+percentiles: el intervalo es el de las réplicas con raíz interior, y la
+columna gamma_<método>_en_cota dice qué fracción de las réplicas se
+descartó por eso (si es alta, el intervalo no es confiable).
+
+Agrega a resultados_completos_tablero.csv las columnas gamma_<método>_lo,
+gamma_<método>_hi y gamma_<método>_en_cota; la página "Aversión al riesgo"
+muestra las dos primeras como barras de error.
+
+Uso:
+    python bootstrap.py [--replicas 1000] [--bloque 20] [--esquema estacionario]
+                        [--nivel 0.95] [--horizonte 1] [--semilla 12345] [--procesos N]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import aversion
+import datos
+
+REPLICAS = 1000
+BLOQUE = 20
+NIVEL = 0.95
+SEMILLA = 12345
+ESQUEMAS = ("estacionario", "circular")
+
+# Réplicas por lote: acota la memoria a LOTE x observaciones por método
+LOTE = 1000
+
+METODOS = ("CRRA", "FTP", "GARCH")
+
+
+def indices(n, replicas, bloque, rng, esquema="estacionario"):
+    """Matriz (replicas x n) de índices remuestreados por bloques.
+
+    Cada posición pertenece a un bloque que empieza en un punto aleatorio de
+    la serie y avanza de a uno (circularmente); el inicio de cada bloque se
+    propaga con un máximo acumulado, sin bucles por observación.
+    """
+    t = np.arange(n)
+    if esquema == "estacionario":
+        nuevo = rng.random((replicas, n)) < 1 / bloque
+    elif esquema == "circular":
+        nuevo = np.broadcast_to(t % bloque == 0, (replicas, n)).copy()
+    else:
+        raise ValueError(f"Esquema desconocido: {esquema}")
+    nuevo[:, 0] = True
+    inicio = np.maximum.accumulate(np.where(nuevo, t, 0), axis=1)
+    origen = rng.integers(0, n, size=(replicas, n))
+    return (np.take_along_axis(origen, inicio, axis=1) + t - inicio) % n
+
+
+def intervalos_activo(x, sigma_t, semilla, replicas=REPLICAS, bloque=BLOQUE,
+                      esquema="estacionario", nivel=NIVEL, horizonte=1, **parametros):
+    """(lo, hi, fracción en cota) de cada método para una serie de rendimientos.
+
+    ``sigma_t`` es la volatilidad condicional alineada con ``x`` (None sin
+    ajuste GARCH); se remuestrea con los mismos índices que ``x``.
+    """
+    rng = np.random.default_rng(semilla)
+    replicas_metodo = {m: [] for m in METODOS}
+    for inicio in range(0, replicas, LOTE):
+        idx = indices(len(x), min(LOTE, replicas - inicio), bloque, rng, esquema)
+        sigma = None
+        if sigma_t is not None:
+            with np.errstate(invalid="ignore"):
+                sigma = np.nanmean(sigma_t[idx], axis=1)
+        for metodo, (g, e) in aversion.gammas(x[idx], sigma, horizonte=horizonte, **parametros).items():
+            replicas_metodo[metodo].append(np.where(e == aversion.OK, g, np.nan))
+
+    cola = (1 - nivel) / 2
+    res = {}
+    for metodo, partes in replicas_metodo.items():
+        if not partes:
+            res[metodo] = (np.nan, np.nan, np.nan)
+            continue
+        g = np.concatenate(partes)
+        en_cota = np.isnan(g).mean()
+        if en_cota == 1:
+            res[metodo] = (np.nan, np.nan, en_cota)
+        else:
+            res[metodo] = (*np.nanquantile(g, [cola, 1 - cola]), en_cota)
+    return res
+
+
+def _intervalos_activo(item):
+    x, sigma, semilla, opciones = item
+    return intervalos_activo(x, sigma, semilla, **opciones)
+
+
+def intervalos(panel, sigma_garch=None, semilla=SEMILLA, procesos=None, **opciones):
+    """DataFrame con Activo y las columnas gamma_<método>_lo/_hi/_en_cota.
+
+    ``sigma_garch`` es un dict nombre -> arreglo de sigma_t alineado con los
+    rendimientos del activo. Las series de tasas y las demasiado cortas
+    quedan sin intervalo (NaN), igual que su gamma.
+    """
+    sigma_garch = sigma_garch or {}
+    nombres = [
+        n for n, s in panel.items()
+        if datos.clean_name(n) not in datos.SERIES_TASA and len(s) >= aversion.MIN_OBS
+    ]
+    semillas = np.random.SeedSequence(semilla).spawn(len(nombres))
+    items = [
+        (panel[n].to_numpy(), sigma_garch.get(n), s, opciones)
+        for n, s in zip(nombres, semillas)
+    ]
+    if procesos == 1:
+        resultados = list(map(_intervalos_activo, items))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_intervalos_activo, items))
+
+    filas = []
+    for nombre in panel:
+        fila = {"Activo": nombre}
+        res = resultados[nombres.index(nombre)] if nombre in nombres else {}
+        for metodo in METODOS:
+            (fila[f"gamma_{metodo}_lo"], fila[f"gamma_{metodo}_hi"],
+             fila[f"gamma_{metodo}_en_cota"]) = res.get(metodo, (np.nan, np.nan, np.nan))
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def escribir(tabla, directorio=None):
+    """Agrega (o reemplaza) las columnas de intervalos en el tablero completo."""
+    directorio = directorio or datos.DATA_DIR
+    path = os.path.join(directorio, "resultados_completos_tablero.csv")
+    completo = pd.read_csv(path, float_precision="round_trip")
+    columnas = [c for c in tabla.columns if c != "Activo"]
+    clave = completo["Activo"].map(datos.clean_name)
+    tabla = tabla.set_index(tabla["Activo"].map(datos.clean_name))
+    for columna in columnas:
+        completo[columna] = clave.map(tabla[columna]).to_numpy()
+    datos.escribir_csv(completo, "resultados_completos_tablero.csv", directorio)
+    return completo
+
+
+def calcular(directorio=None, semilla=SEMILLA, procesos=None, **opciones):
+    """Lee los archivos de ``directorio``, calcula los intervalos y los escribe."""
+    directorio = directorio or datos.DATA_DIR
+    panel = datos.leer_rendimientos(
+        os.path.join(directorio, "rendimientos.csv"),
+        datos.leer_precios(os.path.join(directorio, "precios.csv")),
+    )
+    sigma_garch = {}
+    path_ts = os.path.join(directorio, "garch_timeseries.csv")
+    if os.path.exists(path_ts):
+        ts = pd.read_csv(path_ts, usecols=["Fecha", "Activo", "sigma_t"])
+        ts["Fecha"] = pd.to_datetime(ts["Fecha"], format="%Y-%m-%d")
+        por_nombre = {
+            datos.clean_name(a): g.set_index("Fecha")["sigma_t"] for a, g in ts.groupby("Activo", sort=False)
+        }
+        sigma_garch = {
+            n: por_nombre[datos.clean_name(n)].reindex(panel[n].index).to_numpy()
+            for n in panel if datos.clean_name(n) in por_nombre
+        }
+
+    tabla = intervalos(panel, sigma_garch, semilla=semilla, procesos=procesos, **opciones)
+    escribir(tabla, directorio)
+    return tabla
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Intervalos bootstrap de los coeficientes gamma")
+    parser.add_argument("--replicas", type=int, default=REPLICAS)
+    parser.add_argument("--bloque", type=float, default=BLOQUE, help="largo (medio) de bloque")
+    parser.add_argument("--esquema", choices=ESQUEMAS, default="estacionario")
+    parser.add_argument("--nivel", type=float, default=NIVEL)
+    parser.add_argument("--horizonte", type=int, default=1, help="horizonte en días")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--rf", type=float, default=0.0)
+    parser.add_argument("--kappa", type=float, default=aversion.KAPPA)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    tabla = calcular(
+        args.directorio, semilla=args.semilla, procesos=args.procesos,
+        replicas=args.replicas, bloque=args.bloque, esquema=args.esquema,
+        nivel=args.nivel, horizonte=args.horizonte, rf=args.rf, kappa=args.kappa,
+    )
+    print(tabla.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Correlaciones entre activos: incondicional, móvil y dinámica (DCC).
+
+Parte de garch_timeseries.csv (Retorno y sigma_t por activo) alineado por
+fecha en una matriz fechas x activos, con NaN donde un activo no cotiza.
+Cada correlación usa los pares de observaciones que existen para los dos
+activos (pairwise), y todas salen de cuatro productos matriciales sobre la
+matriz completa (BLAS), sin recorrer pares de activos:
+
+    n = V'V    s = X'V    q = (X*X)'V    p = X'X
+
+con V la máscara de observaciones y X los rendimientos con ceros donde
+faltan. Son sumas: al llegar días nuevos basta sumar las de las filas
+nuevas.
+
+    incondicional  toda la muestra, desde las sumas guardadas
+    movil          ventana de w días que termina en la fecha pedida; se
+                   calcula al pedirla, O(w N^2), con las filas de la ventana
+    dcc            correlación condicional de los residuos estandarizados
+                   z_t = r_t / sigma_t (escalados a varianza 1):
+
+        Q_t = (1 - a - b) Qbar + a z_{t-1} z_{t-1}' + b Q_{t-1}
+        R_t = Q_t / sqrt(diag(Q_t) diag(Q_t)')
+
+                   con Qbar la correlación incondicional de z y a, b fijos
+                   (no se estiman). Si a un par le falta el dato de t - 1 su
+                   Q_ij no cambia. Se guarda Q cada PASO fechas y el Q
+                   posterior a la última fecha: la matriz de cualquier fecha
+                   sale del punto de control anterior con menos de PASO
+                   pasos, y extender el archivo con días nuevos sigue la
+                   recursión desde el último Q.
+
+Si el archivo previo tiene los mismos activos y parámetros y su historia
+sigue igual (mismos Retorno y sigma_t), solo se procesan las fechas nuevas;
+Qbar y la escala de z se conservan, como los parámetros GARCH en
+actualizacion.py. Si no, se reconstruye.
+
+El resultado (``data/correlacion.npz``) lo construye pipeline.py; app.py lo
+carga por datos.py y la página "Correlaciones" envía al navegador solo la
+matriz de la fecha pedida.
+
+Uso:
+    python correlacion.py [--a 0.03] [--b 0.95] [--completo] [--directorio data]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import datos
+
+ARCHIVO = "correlacion.npz"
+
+# Ventanas (días) de la correlación móvil que ofrece el tablero
+VENTANAS = (60, 120, 250)
+
+DCC_A = 0.03
+DCC_B = 0.95
+
+# Cada cuántas fechas se guarda Q_t
+PASO = 20
+
+# Pares con menos observaciones comunes quedan en NaN
+MIN_OBS = 10
+
+
+# ============================================================
+# CORRELACIÓN POR PARES
+# ============================================================
+
+def estadisticos(X):
+    """Sumas (n, s, q, p) de las filas de X (fechas x activos, con NaN)."""
+    V = (~np.isnan(X)).astype(float)
+    X0 = np.where(V > 0, X, 0.0)
+    return {"n": V.T @ V, "s": X0.T @ V, "q": (X0 * X0).T @ V, "p": X0.T @ X0}
+
+
+def sumar(a, b):
+    return {k: a[k] + b[k] for k in a}
+
+
+def correlacion(e, min_obs=MIN_OBS):
+    """Matriz de correlación (pairwise) a partir de las sumas de ``estadisticos``.
+
+    s[i, j] es la suma de x_i en las fechas en que también hay x_j, así que
+    las medias y varianzas de cada par usan solo sus fechas comunes.
+    """
+    n, s, q, p = e["n"], e["s"], e["q"], e["p"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = p - s * s.T / n
+        var_i = q - s * s / n
+        var_j = var_i.T
+        R = cov / np.sqrt(var_i * var_j)
+    R[(n < min_obs) | ~(var_i > 0) | ~(var_j > 0)] = np.nan
+    R = np.clip(R, -1.0, 1.0)
+    validos = np.diag(n) >= min_obs
+    np.fill_diagonal(R, np.where(validos, 1.0, np.nan))
+    return R
+
+
+def movil(R, fin, ventana, min_obs=MIN_OBS):
+    """Correlación de las ``ventana`` filas de R que terminan en ``fin`` (incluida)."""
+    return correlacion(estadisticos(R[max(0, fin - ventana + 1):fin + 1]), min_obs)
+
+
+# ============================================================
+# DCC
+# ============================================================
+
+def _paso(Q, z, Qbar, a, b):
+    """Q_{t+1} desde Q_t y z_t (los pares sin dato conservan su valor)."""
+    valido = ~np.isnan(z)
+    z0 = np.where(valido, z, 0.0)
+    nuevo = (1 - a - b) * Qbar + a * np.outer(z0, z0) + b * Q
+    return np.where(np.outer(valido, valido), nuevo, Q)
+
+
+def recorrer(Z, Qbar, a, b, Q, desde=0):
+    """Avanza la recursión desde la fila ``desde`` (Q es Q_desde).
+
+    Devuelve (puntos de control {k: Q_{k PASO}} encontrados en el camino, Q
+    posterior a la última fila).
+    """
+    controles = {}
+    for t in range(desde, len(Z)):
+        if t % PASO == 0:
+            controles[t // PASO] = Q.astype(np.float32)
+        Q = _paso(Q, Z[t], Qbar, a, b)
+    return controles, Q
+
+
+def a_correlacion(Q):
+    d = np.sqrt(np.diag(Q))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = Q / np.outer(d, d)
+    return np.clip(R, -1.0, 1.0)
+
+
+def _z(c):
+    return c["Zc"] / c["escala"]
+
+
+def dcc(c, t):
+    """Matriz DCC de la fecha de índice ``t`` desde el punto de control anterior."""
+    k = t // PASO
+    Q = c["controles"][k].astype(float)
+    Z, Qbar, a, b = _z(c), c["Qbar"], float(c["a"]), float(c["b"])
+    for s in range(k * PASO, t):
+        Q = _paso(Q, Z[s], Qbar, a, b)
+    return a_correlacion(Q)
+
+
+def serie_dcc(c, i, j):
+    """Correlación DCC del par (i, j) en todas las fechas.
+
+    En el DCC escalar cada elemento de Q sigue su propia recursión, así que
+    el par solo necesita Q_ii, Q_jj y Q_ij.
+    """
+    Z = _z(c)[:, [i, j]]
+    Qbar = c["Qbar"][np.ix_([i, j], [i, j])]
+    Q = Qbar.copy()
+    a, b = float(c["a"]), float(c["b"])
+    salida = np.empty(len(Z))
+    for t in range(len(Z)):
+        salida[t] = Q[0, 1] / np.sqrt(Q[0, 0] * Q[1, 1])
+        Q = _paso(Q, Z[t], Qbar, a, b)
+    return salida
+
+
+def serie_movil(c, i, j, ventana, min_obs=MIN_OBS):
+    """Correlación móvil del par (i, j) en todas las fechas (fechas comunes)."""
+    x, y = c["R"][:, i], c["R"][:, j]
+    comun = ~np.isnan(x) & ~np.isnan(y)
+    par = pd.DataFrame({"x": np.where(comun, x, np.nan), "y": np.where(comun, y, np.nan)})
+    return par["x"].rolling(ventana, min_periods=min_obs).corr(par["y"]).to_numpy()
+
+
+# ============================================================
+# CONSTRUCCIÓN
+# ============================================================
+
+def _matrices(ts):
+    """(fechas, activos, R, Zc) alineados por fecha desde garch_timeseries."""
+    sigma = ts["sigma_t"].where(ts["sigma_t"] > 0)
+    ts = ts.assign(Activo=datos.limpiar_activos(ts["Activo"]), z=ts["Retorno"] / sigma)
+    fechas, activos, R = agregados.matriz(ts, "Retorno")
+    _, _, Zc = agregados.matriz(ts, "z")
+    return fechas.astype("datetime64[ns]"), activos.astype(str), R, Zc
+
+
+def _misma_historia(previo, fechas, activos, R, Zc, a, b):
+    T = len(previo["fechas"])
+    return (
+        list(previo["activos"]) == list(activos)
+        and float(previo["a"]) == a and float(previo["b"]) == b
+        and T <= len(fechas) and np.array_equal(previo["fechas"], fechas[:T])
+        and np.array_equal(previo["R"], R[:T], equal_nan=True)
+        and np.array_equal(previo["Zc"], Zc[:T], equal_nan=True)
+    )
+
+
+def calcular(ts, a=DCC_A, b=DCC_B, previo=None):
+    """dict de arreglos de correlacion.npz; extiende ``previo`` si se puede."""
+    fechas, activos, R, Zc = _matrices(ts)
+    if previo is not None and not _misma_historia(previo, fechas, activos, R, Zc, a, b):
+        previo = None
+
+    if previo is None:
+        T = 0
+        with np.errstate(invalid="ignore"):
+            escala = np.nanstd(Zc, axis=0)
+        escala = np.where(escala > 0, escala, 1.0)
+        Qbar = np.nan_to_num(correlacion(estadisticos(Zc / escala)))
+        np.fill_diagonal(Qbar, 1.0)
+        suma = estadisticos(R)
+        controles, Q = recorrer(Zc / escala, Qbar, a, b, Qbar.copy())
+        controles = [controles[k] for k in sorted(controles)]
+    else:
+        T = len(previo["fechas"])
+        escala, Qbar = previo["escala"], previo["Qbar"]
+        suma = sumar({k: previo[k] for k in ("n", "s", "q", "p")}, estadisticos(R[T:]))
+        nuevos, Q = recorrer(Zc / escala, Qbar, a, b, previo["Q"].astype(float), desde=T)
+        controles = list(previo["controles"]) + [nuevos[k] for k in sorted(nuevos)]
+
+    N = len(activos)
+    return {
+        "fechas": fechas, "activos": activos, "R": R, "Zc": Zc, "escala": escala,
+        "Qbar": Qbar, "Q": Q, "a": np.float64(a), "b": np.float64(b),
+        "controles": np.array(controles, dtype=np.float32).reshape(-1, N, N),
+        **suma, "extendido": np.int64(T),
+    }
+
+
+def leer(directorio=None):
+    path = os.path.join(directorio or datos.DATA_DIR, ARCHIVO)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
+
+
+def escribir(c, directorio=None):
+    """Escribe el archivo de forma atómica."""
+    destino = os.path.join(directorio or datos.DATA_DIR, ARCHIVO)
+    temporal = destino + ".tmp"
+    with open(temporal, "wb") as f:
+        np.savez(f, **c)
+    os.replace(temporal, destino)
+    return destino
+
+
+def construir(directorio=None, a=DCC_A, b=DCC_B, completo=False):
+    directorio = directorio or datos.DATA_DIR
+    ts = pd.read_csv(os.path.join(directorio, "garch_timeseries.csv"), parse_dates=["Fecha"])
+    c = calcular(ts, a, b, None if completo else leer(directorio))
+    escribir(c, directorio)
+    return c
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Correlaciones incondicional, móvil y DCC entre activos")
+    parser.add_argument("--a", type=float, default=DCC_A, help="peso del último z z' en el DCC")
+    parser.add_argument("--b", type=float, default=DCC_B, help="persistencia del DCC")
+    parser.add_argument("--completo", action="store_true", help="reconstruye aunque la historia no cambie")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    c = construir(args.directorio, args.a, args.b, args.completo)
+    T = int(c["extendido"])
+    modo = f"extendido desde la fecha {T}" if T else "reconstruido"
+    print(f"{len(c['activos'])} activos, {len(c['fechas'])} fechas ({modo})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+"""
+Capa de acceso a datos del tablero.
+
+Cada archivo de ``data/`` se lee y se limpia una sola vez por proceso y el
+resultado se comparte entre todas las sesiones de Streamlit. La entrada se
+invalida cuando cambia la huella del archivo (mtime + tamaño); en ese caso se
+compara el hash del contenido y solo se vuelve a parsear si realmente cambió.
+
+Los DataFrames entregados son copias superficiales bajo copy-on-write: no se
+copia ningún dato y cualquier modificación que haga la página queda en su
+propia copia, sin tocar la versión en caché.
+
+pandas se importa recién al parsear el primer archivo, para que importar este
+módulo no retrase el primer dibujo de la página.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import instrumentacion
+
+# TABLERO_DATOS apunta el tablero y los comandos a otro directorio (por
+# ejemplo, los datos sintéticos de perfil_paginas.py)
+DATA_DIR = os.environ.get("TABLERO_DATOS") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data"
+)
+
+# Series macro que no son activos negociables
+EXCLUIR_MACRO = ["TRM", "TPM", "IBR", "DTB3"]
+
+# Series que son tasas de interés y no precios
+SERIES_TASA = ["TPM", "IBR", "DTB3"]
+
+# Archivos cuya columna Fecha se convierte a datetime al cargar
+ARCHIVOS_CON_FECHA = {"garch_timeseries.csv", "vol_hist_vs_garch.csv", "volatilidad.arrow"}
+
+# Panel largo de precios y rendimientos que escribe ingesta.py
+PANEL = "panel.arrow"
+
+# Archivo de bloqueo con el que pipeline.py publica una corrida completa
+BLOQUEO = ".bloqueo"
+
+# Archivos crudos anchos: la caché solo lleva su versión (para memo); se
+# leen con leer_precios / leer_rendimientos
+ARCHIVOS_CRUDOS = {"precios.csv", "rendimientos.csv"}
+
+
+# ============================================================
+# LIMPIEZA DE NOMBRES
+# ============================================================
+
+def clean_name(x):
+    if isinstance(x, str):
+        # Algunos CSV vienen en Unicode NFD ("o" + tilde combinada)
+        x = unicodedata.normalize("NFC", x)
+        return x.replace("Datos históricos de ", "").split("(")[0].strip()
+    return x
+
+
+def limpiar_activos(serie):
+    """Aplica clean_name una vez por nombre distinto, no por fila."""
+    return serie.map({u: clean_name(u) for u in serie.dropna().unique()})
+
+
+# ============================================================
+# CACHÉ COMPARTIDA
+# ============================================================
+
+@dataclass
+class Entrada:
+    huella: tuple
+    version: str
+    frame: object
+    indice: object = None
+
+
+_cache = {}
+_locks = {}
+_lock_global = threading.Lock()
+
+
+def _lock(nombre):
+    with _lock_global:
+        return _locks.setdefault(nombre, threading.Lock())
+
+
+def ruta(nombre):
+    return os.path.join(DATA_DIR, nombre)
+
+
+def _pandas():
+    import pandas as pd
+
+    # Copy-on-write es el comportamiento por defecto desde pandas 3
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+    return pd
+
+
+def _parsear(nombre, contenido):
+    if nombre in ARCHIVOS_CRUDOS:
+        return None
+    if nombre.endswith(".npz"):
+        # Matrices (correlacion.py): dict nombre -> arreglo de solo lectura
+        import numpy as np
+
+        with instrumentacion.etapa("read_npz"), np.load(io.BytesIO(contenido)) as f:
+            matrices = {k: f[k] for k in f.files}
+        for arreglo in matrices.values():
+            arreglo.flags.writeable = False
+        return matrices
+    pd = _pandas()
+    if nombre.endswith(".arrow"):
+        # Arrow IPC (volatilidad.py): tipos y fechas ya vienen en el archivo
+        import pyarrow as pa
+
+        with instrumentacion.etapa("read_arrow"):
+            df = pa.ipc.open_file(pa.BufferReader(contenido)).read_pandas()
+    else:
+        with instrumentacion.etapa("read_csv"):
+            df = pd.read_csv(io.BytesIO(contenido))
+    if "Activo" in df.columns:
+        with instrumentacion.etapa("clean_name"):
+            df["Activo"] = limpiar_activos(df["Activo"])
+    if nombre in ARCHIVOS_CON_FECHA and "Fecha" in df.columns:
+        if not pd.api.types.is_datetime64_any_dtype(df["Fecha"]):
+            with instrumentacion.etapa("fechas"):
+                df["Fecha"] = pd.to_datetime(df["Fecha"], format="%Y-%m-%d")
+        # Las series de tiempo se usan solo para activos negociables: las
+        # series macro se descartan aquí, una vez, y no en cada página
+        with instrumentacion.etapa("indexar"):
+            return indexar(df[~df["Activo"].isin(EXCLUIR_MACRO)])
+    return df
+
+
+def _entrada(nombre):
+    """Devuelve la entrada vigente de la caché, o None si el archivo no existe."""
+    try:
+        st = os.stat(ruta(nombre))
+    except FileNotFoundError:
+        _cache.pop(nombre, None)
+        return None
+    huella = (st.st_mtime_ns, st.st_size)
+
+    entrada = _cache.get(nombre)
+    if entrada is not None and entrada.huella == huella:
+        return entrada
+
+    with _lock(nombre):
+        entrada = _cache.get(nombre)
+        if entrada is not None and entrada.huella == huella:
+            return entrada
+        with instrumentacion.etapa("leer"):
+            with open(ruta(nombre), "rb") as f:
+                contenido = f.read()
+            version = hashlib.sha1(contenido).hexdigest()
+        if entrada is not None and entrada.version == version:
+            # Solo cambió el mtime (p. ej. un touch o una copia idéntica)
+            entrada = Entrada(huella, version, entrada.frame, entrada.indice)
+        else:
+            parseado = _parsear(nombre, contenido)
+            if isinstance(parseado, PorActivo):
+                entrada = Entrada(huella, version, parseado.frame, parseado)
+            else:
+                entrada = Entrada(huella, version, parseado)
+        _cache[nombre] = entrada
+        return entrada
+
+
+def cargar(nombre):
+    """DataFrame limpio del archivo ``data/<nombre>``, o None si no existe.
+
+    Los .npz llegan como dict de arreglos de solo lectura. Los archivos
+    crudos (ARCHIVOS_CRUDOS) no se cargan por aquí.
+    """
+    entrada = _entrada(nombre)
+    if entrada is None or entrada.frame is None:
+        return None
+    if isinstance(entrada.frame, dict):
+        return dict(entrada.frame)
+    return entrada.frame.copy(deep=False)
+
+
+def por_activo(nombre):
+    """Índice por activo (PorActivo) de un archivo de series de tiempo.
+
+    Solo existe para los archivos de ARCHIVOS_CON_FECHA; devuelve None si el
+    archivo no existe.
+    """
+    entrada = _entrada(nombre)
+    return None if entrada is None else entrada.indice
+
+
+def version(nombre):
+    """Hash SHA-1 del contenido vigente del archivo, o None si no existe."""
+    entrada = _entrada(nombre)
+    return None if entrada is None else entrada.version
+
+
+def limpiar_cache():
+    with _lock_global:
+        _cache.clear()
+        _derivados.clear()
+
+
+@contextmanager
+def bloqueo(directorio=None, exclusivo=False):
+    """Bloqueo compartido (lectura) o exclusivo (publicación) de ``data/``.
+
+    pipeline.py reemplaza los archivos de una corrida con el bloqueo
+    exclusivo; app.py carga los archivos de cada página con el compartido,
+    así una página nunca mezcla archivos de dos corridas. Donde no hay
+    fcntl o no se puede crear el archivo de bloqueo, no bloquea.
+    """
+    try:
+        import fcntl
+        f = open(os.path.join(directorio or DATA_DIR, BLOQUEO), "a+")
+    except (ImportError, OSError):
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ============================================================
+# ÍNDICE POR ACTIVO
+# ============================================================
+
+class PorActivo:
+    """Archivo largo ordenado por (Activo, Fecha), con el tramo de cada activo.
+
+    Las filas de un activo son contiguas, así que pedir un activo es un corte
+    por posición y acotar un rango de fechas es una búsqueda binaria dentro
+    del corte: ninguna consulta recorre el archivo completo con una máscara.
+    """
+
+    def __init__(self, frame, tramos):
+        self.frame = frame
+        self.tramos = tramos
+        self._fechas = frame["Fecha"].to_numpy()
+
+    @property
+    def activos(self):
+        return list(self.tramos)
+
+    def _limites(self, activo, rango=None):
+        inicio, fin = self.tramos[activo]
+        if rango is not None:
+            import numpy as np
+
+            fechas = self._fechas[inicio:fin]
+            desde, hasta = (np.datetime64(f, "ns") for f in rango)
+            inicio, fin = (
+                inicio + int(np.searchsorted(fechas, desde, side="left")),
+                inicio + int(np.searchsorted(fechas, hasta, side="right")),
+            )
+        return inicio, fin
+
+    def activo(self, activo, rango=None):
+        """Filas de un activo, opcionalmente acotadas a ``rango`` (fechas)."""
+        if activo not in self.tramos:
+            return self.frame.iloc[:0]
+        inicio, fin = self._limites(activo, rango)
+        return self.frame.iloc[inicio:fin]
+
+    def seleccion(self, activos, rango=None):
+        """Filas de varios activos (en el orden del índice) como un DataFrame."""
+        pd = _pandas()
+
+        activos = set(activos)
+        partes = [self.activo(a, rango) for a in self.tramos if a in activos]
+        if not partes:
+            return self.frame.iloc[:0]
+        return pd.concat(partes, ignore_index=True)
+
+
+def indexar(df):
+    """Ordena un archivo largo por (Activo, Fecha) y arma su PorActivo.
+
+    La columna Activo queda como categórica; el orden es estable, así que un
+    archivo ya ordenado (el caso normal) solo se recorre una vez.
+    """
+    import numpy as np
+    pd = _pandas()
+
+    codigos, activos = pd.factorize(df["Activo"], sort=True)
+    orden = np.lexsort((df["Fecha"].to_numpy(), codigos))
+    if not np.array_equal(orden, np.arange(len(orden))):
+        df, codigos = df.iloc[orden], codigos[orden]
+    df = df.reset_index(drop=True)
+    df["Activo"] = pd.Categorical.from_codes(codigos, categories=activos)
+
+    bordes = np.searchsorted(codigos, np.arange(len(activos) + 1))
+    tramos = {
+        activo: (int(bordes[k]), int(bordes[k + 1]))
+        for k, activo in enumerate(activos)
+        if bordes[k + 1] > bordes[k]
+    }
+    return PorActivo(df, tramos)
+
+
+# ============================================================
+# RESULTADOS DERIVADOS
+# ============================================================
+
+# Resultados calculados a partir de los archivos (p. ej. gammas móviles),
+# guardados por versión de sus fuentes; se descartan los más antiguos.
+MAX_DERIVADOS = 64
+
+_derivados = OrderedDict()
+
+
+def memo(fuentes, clave, calcular):
+    """Resultado de ``calcular()`` memorizado por (versión de fuentes, clave).
+
+    Si alguna fuente cambia en disco la clave cambia y se recalcula; si no
+    existe, devuelve None sin calcular.
+    """
+    versiones = tuple(version(f) for f in fuentes)
+    if None in versiones:
+        return None
+    llave = (tuple(fuentes), versiones, clave)
+    with _lock_global:
+        if llave in _derivados:
+            _derivados.move_to_end(llave)
+            return _derivados[llave]
+    resultado = calcular()
+    with _lock_global:
+        _derivados[llave] = resultado
+        while len(_derivados) > MAX_DERIVADOS:
+            _derivados.popitem(last=False)
+    return resultado
+
+
+# ============================================================
+# PANEL ARROW (ingesta.py)
+# ============================================================
+
+_paneles = {}
+_hashes = {}
+
+
+def _sha1(path):
+    """SHA-1 del archivo, recalculado solo si cambió su huella (mtime, tamaño).
+
+    Es la misma huella con la que _entrada decide si relee un archivo; evita
+    leer y hashear los CSV de origen en cada llamada a leer_panel.
+    """
+    st = os.stat(path)
+    huella = (st.st_mtime_ns, st.st_size)
+    previo = _hashes.get(path)
+    if previo is not None and previo[0] == huella:
+        return previo[1]
+    with open(path, "rb") as f:
+        valor = hashlib.sha1(f.read()).hexdigest()
+    _hashes[path] = (huella, valor)
+    return valor
+
+
+def leer_panel(directorio=None):
+    """Tabla Arrow de ``panel.arrow`` abierta con memory-map.
+
+    Devuelve None si el panel no existe o si alguno de los CSV de origen
+    cambió desde la ingesta (se compara el hash guardado en los metadatos;
+    cada origen se vuelve a hashear solo cuando cambia su mtime o tamaño).
+    """
+    directorio = directorio or DATA_DIR
+    path = os.path.join(directorio, PANEL)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    huella = (st.st_mtime_ns, st.st_size)
+    previo = _paneles.get(path)
+    if previo is not None and previo[0] == huella:
+        tabla = previo[1]
+    else:
+        import pyarrow as pa
+
+        tabla = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        _paneles[path] = (huella, tabla)
+
+    fuentes = json.loads(tabla.schema.metadata[b"fuentes"])
+    for archivo, hash_origen in fuentes.items():
+        try:
+            if _sha1(os.path.join(directorio, archivo)) != hash_origen:
+                return None
+        except FileNotFoundError:
+            continue
+    return tabla
+
+
+def _series_panel(tabla, columna, solo_validos):
+    """dict nombre original -> Serie de ``columna`` a partir del panel."""
+    import numpy as np
+    pd = _pandas()
+
+    nombres = json.loads(tabla.schema.metadata[b"activos"])
+    ticker = tabla.column("Ticker").combine_chunks()
+    codigos = ticker.indices.to_numpy()
+    fechas = tabla.column("Fecha").to_numpy()
+    filas = tabla.column("fila").to_numpy()
+    observado = tabla.column("observado").to_numpy(zero_copy_only=False)
+    valores = tabla.column(columna).to_numpy()
+
+    bordes = np.searchsorted(codigos, np.arange(len(ticker.dictionary) + 1))
+    series = {}
+    for k, t in enumerate(ticker.dictionary.to_pylist()):
+        tramo = slice(bordes[k], bordes[k + 1])
+        mascara = observado[tramo]
+        if solo_validos:
+            mascara = mascara & ~np.isnan(valores[tramo])
+        serie = pd.Series(
+            valores[tramo][mascara].astype(float),
+            index=pd.DatetimeIndex(fechas[tramo][mascara], name="Fecha"),
+            name=nombres[t],
+        )
+        serie.attrs["filas"] = filas[tramo][mascara].astype(np.int64)
+        series[nombres[t]] = serie
+    return series
+
+
+# ============================================================
+# ARCHIVOS CRUDOS (ANCHOS)
+# ============================================================
+
+def _panel_para(path, archivo):
+    """Panel vigente del directorio de ``path`` si ``path`` es su CSV de origen."""
+    if path is not None and os.path.basename(path) != archivo:
+        return None
+    return leer_panel(os.path.dirname(os.path.abspath(path)) if path else None)
+
+
+def leer_precios(path=None, usar_panel=True):
+    """Precios por activo desde precios.csv (pares Fecha/Valor por columna).
+
+    Devuelve un dict nombre original -> Serie de precios indexada por fecha;
+    el índice de filas del archivo se conserva en ``serie.attrs["filas"]``
+    porque rendimientos.csv se alinea por fila, no por fecha. Si hay un
+    panel.arrow vigente en el mismo directorio se lee de ahí, sin parsear
+    el CSV.
+    """
+    tabla = _panel_para(path, "precios.csv") if usar_panel else None
+    if tabla is not None:
+        return _series_panel(tabla, "precio", solo_validos=False)
+
+    pd = _pandas()
+    crudo = pd.read_csv(
+        path or ruta("precios.csv"), header=[0, 1], index_col=0, float_precision="round_trip"
+    )
+    precios = {}
+    for nombre in dict.fromkeys(crudo.columns.get_level_values(0)):
+        par = crudo[nombre].dropna(subset=["Fecha"])
+        serie = pd.Series(
+            par["Valor"].to_numpy(dtype=float),
+            index=pd.to_datetime(par["Fecha"], format="%Y-%m-%d"),
+            name=nombre,
+        )
+        serie.attrs["filas"] = par.index.to_numpy()
+        precios[nombre] = serie
+    return precios
+
+
+def leer_rendimientos(path=None, precios=None, usar_panel=True):
+    """Rendimientos por activo, fechados con la fecha de su precio final.
+
+    Devuelve un dict nombre original -> Serie sin NaN indexada por fecha
+    (desde panel.arrow si está vigente, como leer_precios).
+    """
+    tabla = _panel_para(path, "rendimientos.csv") if usar_panel else None
+    if tabla is not None:
+        return _series_panel(tabla, "rendimiento", solo_validos=True)
+
+    crudo = _pandas().read_csv(
+        path or ruta("rendimientos.csv"), index_col=0, float_precision="round_trip"
+    )
+    return rendimientos_de_tabla(crudo, precios if precios is not None else leer_precios())
+
+
+def rendimientos_de_tabla(crudo, precios):
+    """Como leer_rendimientos, a partir de rendimientos.csv ya leído (ancho,
+    indexado por fila de precios.csv)."""
+    pd = _pandas()
+    panel = {}
+    for nombre in crudo.columns:
+        col = crudo[nombre].dropna()
+        fechas = pd.Series(precios[nombre].index, index=precios[nombre].attrs["filas"])
+        panel[nombre] = pd.Series(
+            col.to_numpy(dtype=float),
+            index=pd.DatetimeIndex(fechas.reindex(col.index).to_numpy(), name="Fecha"),
+            name=nombre,
+        )
+    return panel
+
+
+def nombre_serie(nombre):
+    """Nombre de activo tal como lo escriben los archivos de resultados."""
+    return nombre.split("(")[0].strip()
+
+
+def ticker(nombre):
+    """Ticker entre paréntesis al final del nombre, o el nombre limpio."""
+    m = re.search(r"\(([^()]+)\)\s*$", nombre)
+    return m.group(1).strip() if m else clean_name(nombre)
+
+
+def escribir_csv(df, nombre, directorio=None, **kwargs):
+    """Escribe ``df`` de forma atómica: el tablero nunca ve un archivo a medias."""
+    destino = os.path.join(directorio or DATA_DIR, nombre)
+    temporal = destino + ".tmp"
+    kwargs.setdefault("index", False)
+    df.to_csv(temporal, **kwargs)
+    os.replace(temporal, destino)
+
+
+def apilar(panel):
+    """Matriz activos x observaciones, rellenada con NaN al final.
+
+    Cada fila conserva el calendario propio del activo (no se alinean
+    fechas); sirve para estadísticas por activo sobre todo el panel.
+    """
+    import numpy as np
+
+    nombres = list(panel)
+    largo = max((len(s) for s in panel.values()), default=0)
+    X = np.full((len(nombres), largo), np.nan)
+    for i, serie in enumerate(panel.values()):
+        X[i, :len(serie)] = serie.to_numpy()
+    return nombres, X
+
+
+def apilar_largo(df, columnas):
+    """Pasa un archivo largo (Fecha, Activo, ...) a matrices activos x obs.
+
+    Cada fila usa el calendario propio del activo, alineado a la izquierda y
+    rellenado con NaN. Devuelve (activos, fechas, {columna: matriz}).
+    """
+    import numpy as np
+    pd = _pandas()
+
+    codigos, activos = pd.factorize(df["Activo"])
+    fechas_col = df["Fecha"].to_numpy()
+    orden = np.lexsort((fechas_col, codigos))
+    codigos = codigos[orden]
+    pos = np.arange(len(codigos)) - np.searchsorted(codigos, codigos)
+
+    forma = (len(activos), int(pos.max()) + 1 if len(pos) else 0)
+    fechas = np.full(forma, np.datetime64("NaT"), dtype=fechas_col.dtype)
+    fechas[codigos, pos] = fechas_col[orden]
+    matrices = {}
+    for col in columnas:
+        M = np.full(forma, np.nan)
+        M[codigos, pos] = df[col].to_numpy(dtype=float)[orden]
+        matrices[col] = M
+    return list(activos), fechas, matrices
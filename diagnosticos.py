@@ -0,0 +1,230 @@
+"""
+Diagnósticos del modelo GARCH sobre los residuos estandarizados.
+
+Para cada activo se reconstruye z_t = (r_t - mu) / sigma_t con los parámetros
+vigentes (garch_parametros.csv, o un ajuste nuevo si no existe) y se corren
+las pruebas de la página "Diagnósticos GARCH" con statsmodels:
+
+    ADF_p           raíz unitaria de los rendimientos r_t (Dickey-Fuller
+                    aumentada, rezagos por AIC), como en el archivo original
+    ARCH_LM_p       efectos ARCH remanentes (Engle, ``rezagos`` rezagos)
+    Ljung_resid_p   autocorrelación de z_t (Ljung-Box hasta ``rezagos``)
+    Ljung_resid2_p  autocorrelación de z_t^2
+    JarqueBera_p    normalidad
+    alpha+beta      persistencia de la varianza (alpha+beta en GARCH(1,1);
+                    ver modelos.persistencia para las demás especificaciones)
+
+Los activos se reparten en un pool de procesos. Cada resultado se memoriza
+por (hash de la serie, parámetros, rezagos): cambiar los rezagos en la
+página solo recalcula las pruebas, y al reestimar un activo solo se
+recalcula ese activo.
+
+garch.py escribe garch_supuestos.csv con este módulo, así el archivo queda
+siempre en línea con los parámetros estimados.
+
+Uso:
+    python diagnosticos.py [--rezagos 10] [--procesos N] [--directorio data]
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from statsmodels.stats.diagnostic import acorr_ljungbox, het_arch
+from statsmodels.stats.stattools import jarque_bera
+from statsmodels.tsa.stattools import adfuller
+
+import datos
+import garch
+import modelos
+
+REZAGOS = 10
+
+COLUMNAS = ["ADF_p", "ARCH_LM_p", "Ljung_resid_p", "Ljung_resid2_p", "JarqueBera_p", "alpha+beta"]
+
+PARAMETROS = ("mu", "omega", "alpha", "beta", "s2_0", "modelo", "asimetria")
+
+# Valores de los parámetros que no existen en archivos de GARCH(1,1) anteriores
+_OMISION = {"modelo": garch.MODELO, "asimetria": 0.0}
+
+# Con pocos activos pendientes no compensa levantar procesos
+MIN_PARALELO = 16
+
+MAX_MEMO = 4096
+
+_memo = OrderedDict()
+_lock = threading.Lock()
+_pools = {}
+
+
+# ============================================================
+# PRUEBAS
+# ============================================================
+
+def residuos(r, mu, omega, alpha, beta, s2_0, modelo=garch.MODELO, asimetria=0.0):
+    """Residuos estandarizados z_t de la serie ``r`` bajo los parámetros dados."""
+    e = np.asarray(r, dtype=float) - mu
+    return e / np.sqrt(modelos.varianza(modelo, e, omega, alpha, beta, asimetria, s2_0))
+
+
+def _p(prueba):
+    try:
+        return float(prueba())
+    except (ValueError, np.linalg.LinAlgError):
+        return np.nan
+
+
+def pruebas(z, r, rezagos=REZAGOS):
+    """p-valores de las cinco pruebas: ADF sobre los rendimientos ``r``, las
+    demás sobre los residuos estandarizados ``z``."""
+    z, r = z[np.isfinite(z)], r[np.isfinite(r)]
+    if len(z) <= 2 * rezagos + 2 or not z.std() > 0:
+        return dict.fromkeys(COLUMNAS[:-1], np.nan)
+    with warnings.catch_warnings():
+        # Avisos de statsmodels sobre el tipo de retorno futuro de las pruebas
+        warnings.simplefilter("ignore", FutureWarning)
+        return {
+            "ADF_p": _p(lambda: adfuller(r, autolag="AIC")[1]),
+            "ARCH_LM_p": _p(lambda: het_arch(z, nlags=rezagos)[1]),
+            "Ljung_resid_p": _p(lambda: acorr_ljungbox(z, lags=[rezagos])["lb_pvalue"].iloc[0]),
+            "Ljung_resid2_p": _p(lambda: acorr_ljungbox(z ** 2, lags=[rezagos])["lb_pvalue"].iloc[0]),
+            "JarqueBera_p": _p(lambda: jarque_bera(z)[1]),
+        }
+
+
+def _diagnosticar(item):
+    """Devuelve (parámetros usados, fila de pruebas) de un activo."""
+    nombre, r, p, rezagos = item
+    if p is None:
+        a = garch.ajustar(nombre, r)
+        p = {k: getattr(a, k) for k in PARAMETROS}
+    fila = pruebas(residuos(r, **p), r, rezagos)
+    fila["alpha+beta"] = modelos.persistencia(p["modelo"], p["alpha"], p["beta"], p["asimetria"])
+    return p, fila
+
+
+# ============================================================
+# PANEL
+# ============================================================
+
+def _huella(r):
+    return hashlib.sha1(np.ascontiguousarray(r, dtype=float).tobytes()).hexdigest()
+
+
+def _clave(p):
+    """Parámetros como parte de la llave del memo: NaN != NaN, así que los
+    NaN (asimetria, nu en GARCH simple) se guardan como None."""
+    return tuple(None if isinstance(v, float) and np.isnan(v) else v for v in (p[k] for k in PARAMETROS))
+
+
+def parametros_de_ajustes(ajustes):
+    """dict nombre -> parámetros a partir de los Ajuste de garch.estimar."""
+    return {n: {k: getattr(a, k) for k in PARAMETROS} for n, a in ajustes.items()}
+
+
+def _valor(fila, k):
+    v = fila.get(k)
+    return _OMISION[k] if k in _OMISION and (v is None or pd.isna(v)) else v
+
+
+def parametros_de_tabla(df):
+    """dict nombre -> parámetros a partir de garch_parametros.csv."""
+    if df is None:
+        return {}
+    return {fila["Activo"]: {k: _valor(fila, k) for k in PARAMETROS} for _, fila in df.iterrows()}
+
+
+def _pool(n, procesos):
+    """Pool de procesos reutilizado entre llamadas (None si no conviene)."""
+    if procesos == 1 or (procesos is None and n < MIN_PARALELO):
+        return None
+    with _lock:
+        if procesos not in _pools:
+            # spawn: el servidor de Streamlit tiene hilos y no es seguro hacer
+            # fork; como arrancar los procesos es caro, el pool se conserva
+            _pools[procesos] = ProcessPoolExecutor(
+                max_workers=procesos, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pools[procesos]
+
+
+def diagnosticar(panel, parametros=None, rezagos=REZAGOS, procesos=None):
+    """Tabla con el formato de garch_supuestos.csv para los activos del panel.
+
+    ``parametros`` es un dict nombre -> {mu, omega, alpha, beta, s2_0, modelo,
+    asimetria} (modelo y asimetria pueden faltar en GARCH(1,1)); los
+    activos que no aparezcan se ajustan con garch.ajustar (el ajuste también
+    queda memorizado, así otros rezagos no lo repiten). Las series de tasas
+    quedan fuera, igual que en garch.py.
+    """
+    parametros = parametros or {}
+    nombres = [n for n in panel if datos.clean_name(n) not in datos.SERIES_TASA]
+
+    resultados, pendientes = {}, []
+    for nombre in nombres:
+        r = panel[nombre].to_numpy(dtype=float)
+        huella = _huella(r)
+        with _lock:
+            p = parametros.get(nombre) or _memo.get((huella, "ajuste"))
+            if p is not None:
+                p = {**_OMISION, **p}
+            clave = (huella, None if p is None else _clave(p), rezagos)
+            if clave in _memo:
+                _memo.move_to_end(clave)
+                resultados[nombre] = _memo[clave]
+                continue
+        pendientes.append((clave, (nombre, r, p, rezagos)))
+
+    pool = _pool(len(pendientes), procesos)
+    items = [item for _, item in pendientes]
+    if pool is None:
+        calculados = list(map(_diagnosticar, items))
+    else:
+        calculados = list(pool.map(_diagnosticar, items))
+
+    with _lock:
+        for (clave, (nombre, r, p, _)), (usados, fila) in zip(pendientes, calculados):
+            resultados[nombre] = fila
+            if p is None:
+                _memo[(clave[0], "ajuste")] = usados
+                clave = (clave[0], _clave(usados), rezagos)
+            _memo[clave] = fila
+        while len(_memo) > MAX_MEMO:
+            _memo.popitem(last=False)
+
+    df = pd.DataFrame([resultados[n] for n in nombres], columns=COLUMNAS)
+    df.insert(0, "Activo", [datos.nombre_serie(n) for n in nombres])
+    df["Modelo"] = [(parametros.get(n) or {}).get("modelo") or garch.MODELO for n in nombres]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnósticos de los residuos GARCH")
+    parser.add_argument("--rezagos", type=int, default=REZAGOS)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    panel = datos.leer_rendimientos(
+        os.path.join(args.directorio, "rendimientos.csv"),
+        datos.leer_precios(os.path.join(args.directorio, "precios.csv")),
+    )
+    path_param = os.path.join(args.directorio, "garch_parametros.csv")
+    parametros = {}
+    if os.path.exists(path_param):
+        parametros = parametros_de_tabla(pd.read_csv(path_param, float_precision="round_trip"))
+
+    tabla = diagnosticar(panel, parametros, args.rezagos, args.procesos)
+    datos.escribir_csv(tabla, "garch_supuestos.csv", args.directorio)
+    print(tabla.round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
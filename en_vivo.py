@@ -0,0 +1,508 @@
+"""
+Modo en vivo: precios nuevos desde un directorio de entrega o un feed HTTP local.
+
+Se activa con la variable de entorno TABLERO_EN_VIVO, que apunta a la
+fuente:
+
+    un directorio   cada archivo nuevo (.csv con columnas Fecha, Activo,
+                    Precio, o .json / .jsonl con esos campos) se lee y se mueve
+                    a ``procesados/`` (a ``rechazados/`` si no se puede leer,
+                    y cuenta como descartado); los archivos deben aparecer
+                    completos (escribir con otro nombre y renombrar)
+    http://...      se pide ``?desde=<cursor>`` y el feed responde
+                    {"registros": [...], "cursor": n} (``feed`` abajo es un
+                    feed de prueba que reproduce un CSV a un ritmo dado)
+
+Un solo hilo por proceso, compartido por todas las sesiones, corre un bucle
+asyncio con dos tareas unidas por una cola acotada: el lector de la fuente
+y el consumidor. Si la cola se llena (MAX_COLA), el lector espera antes de
+leer el siguiente archivo o pedir la siguiente página: es la contrapresión.
+El consumidor agrupa las ráfagas (toma lo que llegue en ESPERA_LOTE, hasta
+MAX_LOTE registros) y aplica cada lote de una vez:
+
+    r_t = log(P_t / P_{t-1})        desde el último precio conocido
+    s2_t                            modelos.extender con los parámetros y el
+                                    último estado de garch_parametros.csv
+    gammas                          aversion.estimar sobre la historia más
+                                    lo nuevo (matriz en memoria)
+
+La historia se lee una sola vez al iniciar (y de nuevo solo si pipeline.py
+publica otros precios.csv o garch_parametros.csv). Cada lote publica una
+Instantanea inmutable con un número de versión; app.py dibuja las partes
+que cambian (los KPIs de "Contexto" y los gráficos de σₜ) dentro de
+fragmentos con ``run_every``, que se vuelven a ejecutar solos sin recargar
+la página, y las figuras se reconstruyen solo cuando cambia la versión.
+
+Los registros en vivo quedan solo en memoria: este módulo no escribe
+precios.csv. Cuando pipeline.py publica otra historia, los precios en vivo
+posteriores a su último precio se vuelven a aplicar encima; los demás ya
+están en la historia y se olvidan. Los archivos de la entrega quedan en
+``procesados/`` tal como llegaron.
+
+Uso:
+    python en_vivo.py escuchar FUENTE [--directorio data]
+    python en_vivo.py feed ARCHIVO.csv [--puerto 8765] [--ritmo 50]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+
+import datos
+
+ENTORNO = "TABLERO_EN_VIVO"
+
+# Sondeo de la fuente cuando no hay nada nuevo (s)
+INTERVALO = 0.25
+
+# Ventana para agrupar una ráfaga en un solo lote (s) y tamaño máximo del lote
+ESPERA_LOTE = 0.1
+MAX_LOTE = 5000
+
+# Registros en espera a partir de los cuales el lector se detiene
+MAX_COLA = 20000
+
+# Cada cuánto se vuelven a ejecutar los fragmentos del tablero (s)
+REFRESCO = 0.5
+
+PROCESADOS = "procesados"
+RECHAZADOS = "rechazados"
+EXTENSIONES = (".csv", ".json", ".jsonl")
+METODOS = ("CRRA", "FTP", "GARCH")
+
+
+# ============================================================
+# ESTADO
+# ============================================================
+
+@dataclass(frozen=True)
+class Instantanea:
+    """Lo que ven las páginas: se reemplaza completa en cada lote."""
+    version: int = 0
+    cola: object = None
+    gammas: dict = field(default_factory=dict)
+    gammas_base: dict = field(default_factory=dict)
+    registros: int = 0
+    descartados: int = 0
+    actualizado: float = None
+
+    def anexar(self, df, activo):
+        """``df`` (filas de un activo) con sus filas en vivo al final."""
+        if self.cola is None or not len(self.cola):
+            return df
+        nuevas = self.cola[self.cola["Activo"] == activo]
+        if not len(nuevas):
+            return df
+        import pandas as pd
+
+        return pd.concat([df, nuevas[[c for c in nuevas.columns if c in df.columns]]], ignore_index=True)
+
+
+def _huella(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Estado:
+    """Historia cargada una vez y los registros en vivo encima."""
+
+    ARCHIVOS = ("precios.csv", "rendimientos.csv", "garch_parametros.csv", "resultados_GARCH.csv")
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or datos.DATA_DIR
+        self.instantanea = Instantanea()
+        # clave -> {fecha: precio} de lo aplicado en vivo, para reaplicarlo
+        # si pipeline.py publica una historia que todavía no lo trae
+        self.vivos = {}
+        self._cargar()
+
+    def _path(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def _cargar(self):
+        import numpy as np
+        import pandas as pd
+
+        self.huellas = {f: _huella(self._path(f)) for f in self.ARCHIVOS}
+        precios = datos.leer_precios(self._path("precios.csv"))
+        panel = datos.leer_rendimientos(self._path("rendimientos.csv"), precios)
+        self.nombres = list(panel)
+        self.claves = [datos.clean_name(n) for n in self.nombres]
+        # Un registro puede traer el nombre limpio, el original o el ticker
+        self.indice = {}
+        for i, n in enumerate(self.nombres):
+            for alias in (n, self.claves[i], datos.ticker(n)):
+                self.indice.setdefault(alias, i)
+        self.tasa = np.array([c in datos.SERIES_TASA for c in self.claves])
+        self.ultimo = [(precios[n].index[-1].to_datetime64(), float(precios[n].iloc[-1])) for n in self.nombres]
+
+        # Matriz activos x observaciones con espacio para crecer
+        _, X = datos.apilar(panel)
+        self.largos = np.array([len(panel[n]) for n in self.nombres])
+        self.X = np.full((len(self.nombres), max(X.shape[1] * 2, 16)), np.nan)
+        self.X[:, :X.shape[1]] = X
+
+        self.params = {}
+        if os.path.exists(self._path("garch_parametros.csv")):
+            p = pd.read_csv(self._path("garch_parametros.csv"), float_precision="round_trip")
+            self.params = {datos.clean_name(f["Activo"]): dict(f) for _, f in p.iterrows()}
+        self.sigma_media = np.full(len(self.nombres), np.nan)
+        if os.path.exists(self._path("resultados_GARCH.csv")):
+            res = pd.read_csv(self._path("resultados_GARCH.csv"), float_precision="round_trip")
+            media = dict(zip(res["Activo"].map(datos.clean_name), res["sigma_mean"]))
+            self.sigma_media = np.array([media.get(c, np.nan) for c in self.claves], dtype=float)
+
+        self.filas = []
+        base = self._gammas()
+        vivos, self.vivos = self.vivos, {}
+        for clave, nuevos in vivos.items():
+            i = self.indice.get(clave)
+            if i is not None:
+                self._extender(i, {f: p for f, p in nuevos.items() if f > self.ultimo[i][0]})
+        previa = self.instantanea
+        self.instantanea = Instantanea(
+            version=previa.version + 1,
+            cola=pd.concat(self.filas, ignore_index=True) if self.filas else None,
+            gammas=self._gammas() if self.filas else base,
+            gammas_base=base,
+            registros=previa.registros,
+            descartados=previa.descartados,
+            actualizado=previa.actualizado,
+        )
+
+    def _gammas(self):
+        """Promedio de cada gamma entre los activos negociables."""
+        import numpy as np
+
+        import aversion
+
+        res = aversion.estimar(self.nombres, self.X[:, :self.largos.max()], self.sigma_media)
+        visibles = np.array([c not in datos.EXCLUIR_MACRO for c in self.claves])
+        with np.errstate(invalid="ignore"):
+            return {m: float(np.nanmean(res[f"gamma_{m}"][visibles])) for m in METODOS}
+
+    def _anexar(self, i, r):
+        import numpy as np
+
+        fin = self.largos[i] + len(r)
+        if fin > self.X.shape[1]:
+            X = np.full((self.X.shape[0], max(fin, self.X.shape[1] * 2)), np.nan)
+            X[:, :self.X.shape[1]] = self.X
+            self.X = X
+        self.X[i, self.largos[i]:fin] = r
+        self.largos[i] = fin
+
+    def _sigma(self, i, r):
+        """sigma_t de los rendimientos nuevos (NaN sin parámetros GARCH)."""
+        import numpy as np
+
+        import modelos
+
+        p = self.params.get(self.claves[i])
+        if p is None:
+            return np.full(len(r), np.nan)
+        e = r - p["mu"]
+        asimetria = p.get("asimetria", 0.0)
+        s2 = modelos.extender(p.get("modelo"), e, p["omega"], p["alpha"], p["beta"],
+                              0.0 if np.isnan(asimetria) else asimetria, p["s2_ultima"], p["e_ultima"])
+        p["s2_ultima"], p["e_ultima"] = s2[-1], e[-1]
+        sigma = np.sqrt(s2)
+        n = p["n"]
+        if not np.isnan(self.sigma_media[i]):
+            self.sigma_media[i] = (self.sigma_media[i] * n + sigma.sum()) / (n + len(r))
+        p["n"] = n + len(r)
+        return sigma
+
+    def _extender(self, i, nuevos):
+        """Aplica los precios ``nuevos`` ({fecha: precio}) del activo ``i``
+        posteriores a su último precio; devuelve cuántos se aplicaron."""
+        import numpy as np
+        import pandas as pd
+
+        fecha_ultima, precio_ultimo = self.ultimo[i]
+        fechas = np.array(sorted(f for f in nuevos if f > fecha_ultima), dtype="datetime64[ns]")
+        if not len(fechas):
+            return 0
+        P = np.array([precio_ultimo] + [nuevos[f] for f in fechas])
+        r = np.log(P[1:] / P[:-1])
+        self._anexar(i, r)
+        sigma = self._sigma(i, r)
+        self.ultimo[i] = (fechas[-1], P[-1])
+        self.vivos.setdefault(self.claves[i], {}).update(zip(fechas, P[1:]))
+        if not self.tasa[i]:
+            self.filas.append(pd.DataFrame({
+                "Fecha": fechas, "Activo": self.claves[i], "Retorno": r, "sigma_t": sigma,
+            }))
+        return len(fechas)
+
+    def aplicar(self, lote):
+        """Procesa un lote de registros y publica una nueva Instantanea."""
+        import numpy as np
+        import pandas as pd
+
+        if any(_huella(self._path(f)) != h for f, h in self.huellas.items()):
+            # pipeline.py publicó otra corrida: se recarga y lo que haya
+            # llegado en vivo después de su último precio se reaplica
+            self._cargar()
+
+        descartados = 0
+        por_activo = {}
+        for reg in lote:
+            if reg is RECHAZADO:
+                descartados += 1
+                continue
+            try:
+                i = self.indice[reg["Activo"]]
+                fecha = np.datetime64(pd.Timestamp(reg["Fecha"]), "ns")
+                precio = float(reg["Precio"])
+            except (KeyError, ValueError, TypeError):
+                descartados += 1
+                continue
+            if not precio > 0:
+                descartados += 1
+                continue
+            por_activo.setdefault(i, {})[fecha] = precio
+
+        for i, nuevos in por_activo.items():
+            descartados += len(nuevos) - self._extender(i, nuevos)
+
+        previa = self.instantanea
+        cambio = len(lote) > descartados
+        self.instantanea = Instantanea(
+            version=previa.version + cambio,
+            cola=pd.concat(self.filas, ignore_index=True) if self.filas else None,
+            gammas=self._gammas() if cambio else previa.gammas,
+            gammas_base=previa.gammas_base,
+            registros=previa.registros + len(lote) - descartados,
+            descartados=previa.descartados + descartados,
+            actualizado=time.time() if cambio else previa.actualizado,
+        )
+        return self.instantanea
+
+
+# ============================================================
+# FUENTES
+# ============================================================
+
+# Marca en la cola de un archivo de la entrega que no se pudo leer: el
+# consumidor la cuenta como descartada
+RECHAZADO = object()
+
+
+def _registros(nombre, contenido):
+    """Registros (dicts con Fecha, Activo, Precio) de un archivo de la entrega."""
+    texto = contenido.decode("utf-8-sig")
+    if nombre.endswith(".csv"):
+        return list(csv.DictReader(io.StringIO(texto)))
+    if nombre.endswith(".jsonl"):
+        return [json.loads(linea) for linea in texto.splitlines() if linea.strip()]
+    registros = json.loads(texto)
+    return registros.get("registros", []) if isinstance(registros, dict) else registros
+
+
+def _leer_archivo(path):
+    with open(path, "rb") as f:
+        return _registros(path, f.read())
+
+
+async def leer_directorio(directorio, cola):
+    """Encola los registros de cada archivo nuevo y lo mueve a procesados/
+    (o a rechazados/, con una marca RECHAZADO en la cola, si no se puede leer)."""
+    procesados = os.path.join(directorio, PROCESADOS)
+    rechazados = os.path.join(directorio, RECHAZADOS)
+    os.makedirs(procesados, exist_ok=True)
+    os.makedirs(rechazados, exist_ok=True)
+    while True:
+        with os.scandir(directorio) as it:
+            archivos = sorted(
+                (e.stat().st_mtime_ns, e.name) for e in it
+                if e.is_file() and not e.name.startswith(".") and e.name.endswith(EXTENSIONES)
+            )
+        for _, nombre in archivos:
+            path = os.path.join(directorio, nombre)
+            try:
+                registros = await asyncio.to_thread(_leer_archivo, path)
+            except (OSError, ValueError):
+                os.replace(path, os.path.join(rechazados, nombre))
+                await cola.put(RECHAZADO)
+                continue
+            for reg in registros:
+                await cola.put(reg)
+            os.replace(path, os.path.join(procesados, nombre))
+        if not archivos:
+            await asyncio.sleep(INTERVALO)
+
+
+def _pedir(url, cursor):
+    separador = "&" if urllib.parse.urlsplit(url).query else "?"
+    with urllib.request.urlopen(f"{url}{separador}desde={cursor}", timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+async def leer_http(url, cola):
+    """Pide al feed lo que haya después del cursor; sin novedades, espera INTERVALO."""
+    cursor = 0
+    while True:
+        try:
+            respuesta = await asyncio.to_thread(_pedir, url, cursor)
+        except (OSError, ValueError):
+            # Feed caído o respuesta inválida: se reintenta
+            await asyncio.sleep(INTERVALO)
+            continue
+        registros = respuesta.get("registros", [])
+        for reg in registros:
+            await cola.put(reg)
+        cursor = respuesta.get("cursor", cursor + len(registros))
+        if not registros:
+            await asyncio.sleep(INTERVALO)
+
+
+# ============================================================
+# BUCLE
+# ============================================================
+
+async def consumir(cola, aplicar):
+    """Agrupa lo que llegue en ESPERA_LOTE (hasta MAX_LOTE) y lo aplica junto."""
+    bucle = asyncio.get_running_loop()
+    while True:
+        lote = [await cola.get()]
+        limite = bucle.time() + ESPERA_LOTE
+        while len(lote) < MAX_LOTE:
+            if not cola.empty():
+                lote.append(cola.get_nowait())
+                continue
+            restante = limite - bucle.time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        await asyncio.to_thread(aplicar, lote)
+
+
+class Flujo:
+    """Hilo con el bucle asyncio que lee la fuente y mantiene el Estado."""
+
+    def __init__(self, fuente, directorio=None):
+        self.fuente = fuente
+        self.directorio = directorio
+        self.estado = None
+        self.error = None
+        self._hilo = threading.Thread(target=self._correr, name="en_vivo", daemon=True)
+
+    def iniciar(self):
+        # Streamlit pone la carpeta del script en sys.path solo mientras corre
+        # el script: los módulos del hilo se importan aquí
+        import aversion
+        import modelos
+
+        self._hilo.start()
+        return self
+
+    def instantanea(self):
+        """Instantanea vigente, o None mientras se carga la historia."""
+        return None if self.estado is None else self.estado.instantanea
+
+    def _correr(self):
+        try:
+            self.estado = Estado(self.directorio)
+            asyncio.run(self._principal())
+        except Exception as exc:  # el tablero sigue sin modo en vivo
+            self.error = exc
+
+    async def _principal(self):
+        cola = asyncio.Queue(maxsize=MAX_COLA)
+        es_http = self.fuente.startswith(("http://", "https://"))
+        lector = leer_http if es_http else leer_directorio
+        await asyncio.gather(lector(self.fuente, cola), consumir(cola, self.estado.aplicar))
+
+
+_flujo = None
+_lock = threading.Lock()
+
+
+def flujo():
+    """Flujo del proceso si TABLERO_EN_VIVO está definida (se inicia la primera vez)."""
+    global _flujo
+    fuente = os.environ.get(ENTORNO)
+    if not fuente:
+        return None
+    with _lock:
+        if _flujo is None:
+            _flujo = Flujo(fuente).iniciar()
+    return _flujo
+
+
+# ============================================================
+# FEED DE PRUEBA
+# ============================================================
+
+def feed(registros, puerto=8765, ritmo=50.0):
+    """Sirve ``registros`` por HTTP como si llegaran ``ritmo`` por segundo."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    inicio = time.time()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            consulta = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            desde = int(consulta.get("desde", ["0"])[0])
+            disponibles = min(len(registros), int((time.time() - inicio) * ritmo))
+            hasta = min(disponibles, desde + MAX_LOTE)
+            cuerpo = json.dumps({"registros": registros[desde:hasta], "cursor": max(hasta, desde)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    print(f"Feed en http://127.0.0.1:{puerto}/ ({len(registros)} registros, {ritmo:g} por segundo)")
+    servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modo en vivo del tablero")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    escuchar = sub.add_parser("escuchar", help="aplica la fuente sin el tablero y muestra cada versión")
+    escuchar.add_argument("fuente", help="directorio de entrega o URL del feed")
+    escuchar.add_argument("--directorio", default=datos.DATA_DIR)
+    servir = sub.add_parser("feed", help="feed HTTP de prueba a partir de un CSV (Fecha, Activo, Precio)")
+    servir.add_argument("archivo")
+    servir.add_argument("--puerto", type=int, default=8765)
+    servir.add_argument("--ritmo", type=float, default=50.0, help="registros por segundo")
+    args = parser.parse_args(argv)
+
+    if args.comando == "feed":
+        feed(_leer_archivo(args.archivo), args.puerto, args.ritmo)
+        return
+
+    f = Flujo(args.fuente, args.directorio).iniciar()
+    version = None
+    while f.error is None:
+        vivo = f.instantanea()
+        if vivo is not None and vivo.version != version:
+            version = vivo.version
+            gammas = "  ".join(f"{m} {vivo.gammas[m]:.4f}" for m in METODOS)
+            print(f"v{vivo.version}: {vivo.registros} registros ({vivo.descartados} descartados)  {gammas}")
+        time.sleep(REFRESCO)
+    raise f.error
+
+
+if __name__ == "__main__":
+    main()
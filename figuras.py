@@ -0,0 +1,141 @@
+"""
+Caché de figuras compartida entre sesiones.
+
+Las figuras del tablero dependen solo de los archivos de ``data/`` y de la
+selección de la página, así que dos usuarios con la misma selección reciben
+la misma figura. Aquí se guarda cada figura construida junto con su JSON
+(plotly.io.to_json, serializado una vez al construirla), con la llave
+(página, selección, versión de las fuentes): si un archivo cambia en disco
+cambia su versión (datos.version) y la figura se vuelve a construir.
+
+Las entradas se descartan por LRU cuando el total supera el presupuesto de
+memoria (TABLERO_FIGURAS_MB, 256 MB por defecto). El tamaño de cada entrada
+es el largo del JSON más los datos de sus trazas (bytes de los arreglos,
+largo de los textos). Una figura que por sí sola supera el presupuesto se
+entrega sin guardarla.
+
+figura_json entrega el JSON guardado a quien acepte la especificación ya
+serializada. st.plotly_chart no la acepta: recibe la figura y la serializa
+de nuevo en cada render (1-6 ms por gráfico con los datos actuales).
+
+Las figuras guardadas se comparten: quien las reciba no debe modificarlas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import datos
+
+PRESUPUESTO_MB = float(os.environ.get("TABLERO_FIGURAS_MB") or 256)
+
+
+@dataclass
+class Entrada:
+    figura: object
+    json: str
+    tamano: int
+
+
+def _tamano(valor):
+    """Bytes aproximados de un valor de una traza (arreglos, listas, textos)."""
+    import numpy as np
+
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes if valor.dtype != object else sum(_tamano(v) for v in valor.ravel())
+    if isinstance(valor, dict):
+        return sum(_tamano(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(_tamano(v) for v in valor)
+    if isinstance(valor, str):
+        return len(valor)
+    return 8
+
+
+class CacheFiguras:
+    """LRU de figuras con presupuesto en bytes y contadores de aciertos."""
+
+    def __init__(self, presupuesto_mb=PRESUPUESTO_MB):
+        self.presupuesto = int(presupuesto_mb * 2 ** 20)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.ocupado = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, llave, construir):
+        """Entrada de ``llave``; si no está, la construye con ``construir()``."""
+        with self._lock:
+            entrada = self._entradas.get(llave)
+            if entrada is not None:
+                self._entradas.move_to_end(llave)
+                self.aciertos += 1
+                return entrada
+            self.fallos += 1
+
+        import plotly.io
+
+        # Se construye fuera del candado: otras sesiones siguen atendiéndose
+        figura = construir()
+        spec = plotly.io.to_json(figura, validate=False)
+        datos_trazas = sum(_tamano(traza.to_plotly_json()) for traza in figura.data)
+        entrada = Entrada(figura, spec, len(spec) + datos_trazas)
+        if entrada.tamano > self.presupuesto:
+            return entrada
+
+        with self._lock:
+            previa = self._entradas.pop(llave, None)
+            if previa is not None:
+                self.ocupado -= previa.tamano
+            self._entradas[llave] = entrada
+            self.ocupado += entrada.tamano
+            while self.ocupado > self.presupuesto:
+                _, vieja = self._entradas.popitem(last=False)
+                self.ocupado -= vieja.tamano
+                self.desalojos += 1
+        return entrada
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "ocupado_mb": self.ocupado / 2 ** 20,
+                "presupuesto_mb": self.presupuesto / 2 ** 20,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else None,
+                "desalojos": self.desalojos,
+            }
+
+    def vaciar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.ocupado = 0
+
+
+cache = CacheFiguras()
+
+
+def _entrada(pagina, seleccion, fuentes, construir):
+    versiones = tuple(datos.version(f) for f in fuentes)
+    return cache.obtener((pagina, seleccion, tuple(fuentes), versiones), construir)
+
+
+def figura(pagina, seleccion, fuentes, construir):
+    """Figura de ``pagina`` para ``seleccion`` (hashable), construida con
+    ``construir()`` solo si no está guardada para la versión vigente de
+    ``fuentes``."""
+    return _entrada(pagina, seleccion, fuentes, construir).figura
+
+
+def figura_json(pagina, seleccion, fuentes, construir):
+    """Como ``figura``, pero devuelve el JSON ya serializado."""
+    return _entrada(pagina, seleccion, fuentes, construir).json
+
+
+def estadisticas():
+    """Aciertos, fallos, desalojos y memoria ocupada de la caché."""
+    return cache.estadisticas()
@@ -0,0 +1,87 @@
+"""
+Aversión al riesgo en ventanas móviles (gamma como serie de tiempo).
+
+Para cada ventana de w observaciones se usa la forma cerrada del estimador
+CRRA de aversion.py bajo rendimientos log-normales,
+
+    log CE = mu + (1 - gamma) * s2 / 2 = rf   =>   gamma = 1 + 2 (mu - rf) / s2
+
+con la varianza histórica de la ventana (gamma_CRRA) o el promedio de la
+varianza condicional sigma_t^2 en la ventana (gamma_GARCH). Las medias y
+varianzas móviles salen de sumas acumuladas calculadas una sola vez: cada
+ventana adicional es una resta de dos cortes de la misma matriz, así que el
+costo es lineal en el largo de las series y no depende de w. Todo opera
+sobre la matriz activos x observaciones, sin bucles por activo.
+"""
+
+import numpy as np
+import pandas as pd
+
+import aversion
+import datos
+
+VENTANAS = (60, 120, 250)
+
+
+def _acumulada(M):
+    return np.concatenate([np.zeros((M.shape[0], 1)), np.cumsum(M, axis=1)], axis=1)
+
+
+def momentos_moviles(X, ventanas=VENTANAS):
+    """Media y varianza muestral móviles para varias ventanas a la vez.
+
+    Devuelve dos arreglos (ventanas x activos x obs) con NaN donde la
+    ventana no está completa. Las sumas se toman sobre los datos centrados
+    en la media de cada activo, lo que evita la cancelación numérica de
+    sum(x^2) - (sum x)^2 / w cuando la media es grande frente a la dispersión.
+    """
+    validos = ~np.isnan(X)
+    centro = np.nanmean(X, axis=1, keepdims=True)
+    Y = np.where(validos, X - centro, 0.0)
+    c1, c2, cn = _acumulada(Y), _acumulada(Y * Y), _acumulada(validos.astype(float))
+
+    N, T = X.shape
+    media = np.full((len(ventanas), N, T), np.nan)
+    varianza = np.full((len(ventanas), N, T), np.nan)
+    for k, w in enumerate(ventanas):
+        if w > T:
+            continue
+        s1 = c1[:, w:] - c1[:, :-w]
+        s2 = c2[:, w:] - c2[:, :-w]
+        completa = (cn[:, w:] - cn[:, :-w]) == w
+        media[k, :, w - 1:] = np.where(completa, s1 / w + centro, np.nan)
+        varianza[k, :, w - 1:] = np.where(completa, np.maximum(s2 - s1 * s1 / w, 0) / (w - 1), np.nan)
+    return media, varianza
+
+
+def media_movil(X, ventanas=VENTANAS):
+    return momentos_moviles(X, ventanas)[0]
+
+
+def gamma_cerrada(mu, s2, rf=0.0, cotas=aversion.COTAS):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = 1 + 2 * (mu - rf) / s2
+    return np.clip(gamma, *cotas)
+
+
+def gamma_movil(df_ts, ventanas=VENTANAS, rf=0.0):
+    """Gammas móviles a partir de garch_timeseries.csv.
+
+    Devuelve un DataFrame largo con Fecha, Activo, ventana, gamma_CRRA y
+    gamma_GARCH (una fila por activo, fecha y ventana completa).
+    """
+    activos, fechas, M = datos.apilar_largo(df_ts, ["Retorno", "sigma_t"])
+    mu, s2 = momentos_moviles(M["Retorno"], ventanas)
+    s2_garch = media_movil(M["sigma_t"] ** 2, ventanas)
+
+    g_crra = gamma_cerrada(mu, s2, rf)
+    g_garch = gamma_cerrada(mu, s2_garch, rf)
+
+    k, i, t = np.nonzero(~np.isnan(mu))
+    return pd.DataFrame({
+        "Fecha": fechas[i, t],
+        "Activo": np.asarray(activos, dtype=object)[i],
+        "ventana": np.asarray(ventanas)[k],
+        "gamma_CRRA": g_crra[k, i, t],
+        "gamma_GARCH": g_garch[k, i, t],
+    })
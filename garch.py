@@ -0,0 +1,319 @@
+"""
+Estimación GARCH(1,1) por máxima verosimilitud para todos los activos.
+
+Modelo por activo, con media constante e innovaciones normales:
+
+    r_t = mu + e_t,    s2_t = omega + alpha * e_{t-1}^2 + beta * s2_{t-1}
+
+La recursión de la varianza es un filtro lineal de primer orden y se evalúa
+con ``scipy.signal.lfilter``, así cada evaluación de la verosimilitud es una
+pasada vectorizada sobre la serie, sin bucles de Python por observación. Los
+activos se ajustan en paralelo en un pool de procesos.
+
+Produce los mismos archivos que lee el tablero: garch_timeseries.csv,
+vol_hist_vs_garch.csv, resultados_GARCH.csv y la columna ``alpha+beta`` de
+garch_supuestos.csv; además guarda los parámetros y el último estado del
+filtro en garch_parametros.csv para las actualizaciones diarias.
+
+Uso:
+    python garch.py [--procesos N] [--directorio data]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+
+import datos
+
+MODELO = "GARCH(1,1)"
+
+# Ventana (días) de la volatilidad histórica de vol_hist_vs_garch.csv
+VENTANA_VOL_HIST = 252
+
+_LOG_2PI = np.log(2 * np.pi)
+
+
+@dataclass
+class Ajuste:
+    activo: str
+    mu: float
+    omega: float
+    alpha: float
+    beta: float
+    loglik: float
+    n: int
+    convergio: bool
+    mensaje: str
+    s2_0: float
+    sigma: np.ndarray
+    # Especificación (modelos.py); GARCH(1,1) no usa asimetria ni nu
+    modelo: str = MODELO
+    asimetria: float = 0.0
+    nu: float = np.nan
+
+    @property
+    def persistencia(self):
+        if self.modelo == MODELO:
+            return self.alpha + self.beta
+        import modelos  # modelos importa este módulo
+
+        return modelos.persistencia(self.modelo, self.alpha, self.beta, self.asimetria)
+
+
+# ============================================================
+# VEROSIMILITUD
+# ============================================================
+
+def backcast(e, tau=75):
+    """Varianza inicial: promedio exponencial de los primeros e_t^2."""
+    tau = min(tau, len(e))
+    w = 0.94 ** np.arange(tau)
+    return float(np.sum(w * e[:tau] ** 2) / np.sum(w))
+
+
+def varianza_condicional(e, omega, alpha, beta, s2_0):
+    """Serie s2_t completa en una sola llamada a lfilter."""
+    x = np.empty_like(e)
+    x[0] = s2_0
+    x[1:] = omega + alpha * e[:-1] ** 2
+    return lfilter([1.0], [1.0, -beta], x)
+
+
+def extender(e_nuevos, omega, alpha, beta, s2_ultima, e_ultima):
+    """Continúa la recursión desde el último estado (s2_T, e_T).
+
+    Devuelve s2 para las nuevas observaciones; el costo solo depende de
+    cuántas son, no del largo de la historia.
+    """
+    x = omega + alpha * np.concatenate(([e_ultima], e_nuevos[:-1])) ** 2
+    return lfilter([1.0], [1.0, -beta], x, zi=[beta * s2_ultima])[0]
+
+
+def neg_loglik(params, y, s2_0):
+    mu, omega, alpha, beta = params
+    e = y - mu
+    s2 = varianza_condicional(e, omega, alpha, beta, s2_0)
+    if not np.all(s2 > 0):
+        return np.inf
+    return 0.5 * np.sum(_LOG_2PI + np.log(s2) + e ** 2 / s2)
+
+
+def _valores_iniciales(y, s2_0, k=5):
+    """Los ``k`` mejores puntos de una grilla de (alpha, persistencia)."""
+    var = np.var(y)
+    grilla = [
+        np.array([y.mean(), var * (1 - persistencia), alpha, persistencia - alpha])
+        for alpha in (0.03, 0.1, 0.3)
+        for persistencia in (0.35, 0.7, 0.9, 0.98, 0.999)
+        if persistencia > alpha
+    ]
+    return sorted(grilla, key=lambda p: neg_loglik(p, y, s2_0))[:k]
+
+
+# ============================================================
+# AJUSTE POR ACTIVO
+# ============================================================
+
+def ajustar(activo, r):
+    """Ajusta GARCH(1,1) a los rendimientos ``r`` (array 1-D sin NaN)."""
+    r = np.asarray(r, dtype=float)
+    escala = r.std()
+    if len(r) < 10 or not escala > 0:
+        return Ajuste(activo, np.nan, np.nan, np.nan, np.nan, np.nan, len(r),
+                      False, "serie constante o demasiado corta", np.nan,
+                      np.full(len(r), np.nan))
+
+    # Se estima sobre la serie estandarizada para que el optimizador trabaje
+    # con parámetros de orden 1; al final se devuelve a la escala original.
+    y = r / escala
+    s2_0 = backcast(y - y.mean())
+    # La verosimilitud GARCH tiene óptimos locales (sobre todo en series de
+    # tasas); se optimiza desde los mejores puntos de partida de la grilla.
+    res = min(
+        (
+            minimize(
+                neg_loglik,
+                inicio,
+                args=(y, s2_0),
+                method="SLSQP",
+                bounds=[(-10, 10), (1e-8, 10), (0, 1), (0, 1)],
+                constraints=[{"type": "ineq", "fun": lambda p: 1 - p[2] - p[3]}],
+                options={"maxiter": 500, "ftol": 1e-10},
+            )
+            for inicio in _valores_iniciales(y, s2_0)
+        ),
+        key=lambda res: res.fun,
+    )
+    mu, omega, alpha, beta = res.x
+    s2 = varianza_condicional(y - mu, omega, alpha, beta, s2_0)
+    return Ajuste(
+        activo=activo,
+        mu=mu * escala,
+        omega=omega * escala ** 2,
+        alpha=alpha,
+        beta=beta,
+        loglik=-res.fun - len(r) * np.log(escala),
+        n=len(r),
+        convergio=bool(res.success),
+        mensaje=str(res.message),
+        s2_0=s2_0 * escala ** 2,
+        sigma=np.sqrt(s2) * escala,
+    )
+
+
+def _ajustar(item):
+    return ajustar(*item)
+
+
+def estimar(panel, procesos=None):
+    """Ajusta todos los activos del panel; devuelve dict nombre -> Ajuste.
+
+    ``procesos=1`` ajusta en serie (útil para depurar); None usa todos los
+    núcleos disponibles.
+    """
+    items = [(nombre, serie.to_numpy()) for nombre, serie in panel.items()]
+    if procesos == 1:
+        return {a.activo: a for a in map(_ajustar, items)}
+    procesos = procesos or os.cpu_count() or 1
+    lote = max(1, len(items) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return {a.activo: a for a in pool.map(_ajustar, items, chunksize=lote)}
+
+
+# ============================================================
+# ARCHIVOS DE SALIDA
+# ============================================================
+
+def _es_tasa(nombre):
+    return datos.clean_name(nombre) in datos.SERIES_TASA
+
+
+def tabla_timeseries(panel, ajustes):
+    partes = [
+        pd.DataFrame({
+            "Fecha": serie.index.strftime("%Y-%m-%d"),
+            "Activo": datos.nombre_serie(nombre),
+            "Retorno": serie.to_numpy(),
+            "sigma_t": ajustes[nombre].sigma,
+        })
+        for nombre, serie in panel.items() if not _es_tasa(nombre)
+    ]
+    return pd.concat(partes, ignore_index=True)
+
+
+def tabla_vol_hist(panel, ajustes, ventana=VENTANA_VOL_HIST):
+    partes = [
+        pd.DataFrame({
+            "Fecha": serie.index.strftime("%Y-%m-%d"),
+            "Activo": datos.nombre_serie(nombre),
+            "vol_hist": serie.rolling(ventana).std().to_numpy(),
+            "sigma_t": ajustes[nombre].sigma,
+        })
+        for nombre, serie in panel.items() if not _es_tasa(nombre)
+    ]
+    return pd.concat(partes, ignore_index=True)
+
+
+def tabla_resultados(ajustes, previo=None):
+    """resultados_GARCH.csv; gamma_GARCH se conserva del archivo previo."""
+    df = pd.DataFrame({
+        "Activo": list(ajustes),
+        "sigma_last": [a.sigma[-1] for a in ajustes.values()],
+        "sigma_mean": [np.mean(a.sigma) for a in ajustes.values()],
+    })
+    gamma = np.nan
+    if previo is not None and "gamma_GARCH" in previo.columns:
+        gamma = df["Activo"].map(datos.clean_name).map(
+            dict(zip(previo["Activo"].map(datos.clean_name), previo["gamma_GARCH"]))
+        )
+    df.insert(1, "gamma_GARCH", gamma)
+    return df
+
+
+def tabla_supuestos(panel, ajustes):
+    """garch_supuestos.csv: pruebas sobre los residuos de los ajustes nuevos."""
+    import diagnosticos  # diagnosticos importa este módulo
+
+    return diagnosticos.diagnosticar(panel, diagnosticos.parametros_de_ajustes(ajustes))
+
+
+def tabla_parametros(panel, ajustes):
+    """garch_parametros.csv: parámetros y último estado del filtro por activo.
+
+    Es lo que necesita actualizacion.py para extender sigma_t sin reajustar.
+    ``n_ajuste`` y ``suma_z2`` sirven para decidir cuándo reestimar.
+    """
+    filas = []
+    for nombre, a in ajustes.items():
+        serie = panel[nombre]
+        filas.append({
+            "Activo": nombre,
+            "modelo": a.modelo,
+            "mu": a.mu,
+            "omega": a.omega,
+            "alpha": a.alpha,
+            "beta": a.beta,
+            "asimetria": a.asimetria,
+            "nu": a.nu,
+            "s2_0": a.s2_0,
+            "s2_ultima": a.sigma[-1] ** 2,
+            "e_ultima": serie.iloc[-1] - a.mu,
+            "n": a.n,
+            "n_ajuste": a.n,
+            "suma_z2": 0.0,
+            "fecha_ultima": serie.index[-1].strftime("%Y-%m-%d"),
+            "loglik": a.loglik,
+            "convergio": a.convergio,
+        })
+    return pd.DataFrame(filas)
+
+
+def _leer_previo(directorio, nombre):
+    path = os.path.join(directorio, nombre)
+    return pd.read_csv(path, float_precision="round_trip") if os.path.exists(path) else None
+
+
+def tablas(panel, ajustes, directorio=None):
+    """Los archivos GARCH (nombre -> DataFrame) sin escribirlos."""
+    previo_res = _leer_previo(directorio or datos.DATA_DIR, "resultados_GARCH.csv")
+    return {
+        "garch_timeseries.csv": tabla_timeseries(panel, ajustes),
+        "vol_hist_vs_garch.csv": tabla_vol_hist(panel, ajustes),
+        "resultados_GARCH.csv": tabla_resultados(ajustes, previo_res),
+        "garch_supuestos.csv": tabla_supuestos(panel, ajustes),
+        "garch_parametros.csv": tabla_parametros(panel, ajustes),
+    }
+
+
+def escribir(panel, ajustes, directorio=None):
+    directorio = directorio or datos.DATA_DIR
+    for nombre, df in tablas(panel, ajustes, directorio).items():
+        datos.escribir_csv(df, nombre, directorio)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimación GARCH(1,1) de todos los activos")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    panel = datos.leer_rendimientos(
+        os.path.join(args.directorio, "rendimientos.csv"),
+        datos.leer_precios(os.path.join(args.directorio, "precios.csv")),
+    )
+    ajustes = estimar(panel, args.procesos)
+    escribir(panel, ajustes, args.directorio)
+
+    for a in ajustes.values():
+        estado = "ok" if a.convergio else f"NO CONVERGIÓ ({a.mensaje})"
+        print(f"{a.activo[:45]:<45} alpha+beta={a.persistencia:.4f}  {estado}")
+
+
+if __name__ == "__main__":
+    main()
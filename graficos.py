@@ -0,0 +1,111 @@
+"""
+Submuestreo de series para gráficos con muchos puntos.
+
+Largest-Triangle-Three-Buckets (LTTB, Steinarsson 2013): divide cada serie en
+tantos baldes como puntos caben en el presupuesto y de cada balde conserva el
+punto que forma el triángulo de mayor área con el punto elegido en el balde
+anterior y el promedio del siguiente. A diferencia de tomar uno de cada k,
+conserva los picos de volatilidad.
+
+El recorrido por baldes es secuencial, pero cada paso procesa todas las
+series a la vez (matriz activos x observaciones), así que el costo en Python
+depende del presupuesto de puntos y no del número de activos.
+"""
+
+import numpy as np
+
+import datos
+
+# Puntos por serie enviados al navegador (del orden del ancho en píxeles)
+PRESUPUESTO = 1200
+
+
+def _acumulada(M):
+    return np.concatenate([np.zeros((M.shape[0], 1)), np.cumsum(M, axis=1)], axis=1)
+
+
+def lttb_indices(X, Y, largos, umbral=PRESUPUESTO):
+    """Índices elegidos por LTTB para cada fila de (X, Y).
+
+    X e Y son matrices series x observaciones alineadas a la izquierda;
+    ``largos`` tiene el número de observaciones de cada fila. Las filas con
+    menos puntos que ``umbral`` se devuelven completas. Los NaN de Y no se
+    eligen salvo que todo el balde sea NaN (así se conservan los huecos).
+    """
+    largos = np.asarray(largos)
+    res = [np.arange(n) for n in largos]
+    grandes = np.flatnonzero(largos > max(umbral, 3))
+    if len(grandes) == 0:
+        return res
+
+    X, Y, n = X[grandes], Y[grandes], largos[grandes]
+    S, B = len(grandes), umbral - 2
+    fila = np.arange(S)
+
+    # Baldes de los puntos interiores 1 .. n-2
+    bordes = (np.arange(B + 1)[None, :] * (n[:, None] - 2)) // B + 1
+
+    # Promedio de cada balde con sumas acumuladas; el "siguiente" del último
+    # balde es el último punto de la serie
+    validos = ~np.isnan(Y)
+    cx = _acumulada(np.where(validos, X, 0.0))
+    cy = _acumulada(np.where(validos, Y, 0.0))
+    cn = _acumulada(validos.astype(float))
+    cuenta = cn[fila[:, None], bordes[:, 1:]] - cn[fila[:, None], bordes[:, :-1]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prom_x = (cx[fila[:, None], bordes[:, 1:]] - cx[fila[:, None], bordes[:, :-1]]) / cuenta
+        prom_y = (cy[fila[:, None], bordes[:, 1:]] - cy[fila[:, None], bordes[:, :-1]]) / cuenta
+    sig_x = np.concatenate([prom_x[:, 1:], X[fila, n - 1][:, None]], axis=1)
+    sig_y = np.concatenate([prom_y[:, 1:], Y[fila, n - 1][:, None]], axis=1)
+
+    desplazamiento = np.arange(int((bordes[:, 1:] - bordes[:, :-1]).max()))
+    elegidos = np.empty((S, B + 2), dtype=int)
+    elegidos[:, 0] = 0
+    elegidos[:, -1] = n - 1
+    a = np.zeros(S, dtype=int)
+    for j in range(B):
+        pos = bordes[:, j, None] + desplazamiento
+        dentro = pos < bordes[:, j + 1, None]
+        pos = np.minimum(pos, n[:, None] - 1)
+        px, py = X[fila[:, None], pos], Y[fila[:, None], pos]
+        ax, ay = X[fila, a][:, None], Y[fila, a][:, None]
+        area = np.abs(
+            (ax - sig_x[:, j, None]) * (py - ay) - (ax - px) * (sig_y[:, j, None] - ay)
+        )
+        area = np.where(dentro & np.isfinite(area), area, -1.0)
+        a = pos[fila, np.argmax(area, axis=1)]
+        elegidos[:, j + 1] = a
+
+    for k, i in enumerate(grandes):
+        res[i] = elegidos[k]
+    return res
+
+
+def submuestrear(df, columnas, umbral=PRESUPUESTO):
+    """Reduce un archivo largo (Fecha, Activo, columnas...) a ``umbral``
+    puntos por activo y columna.
+
+    Con varias columnas se conserva la unión de los puntos elegidos para
+    cada una, así ningún trazo pierde sus picos.
+    """
+    import pandas as pd
+
+    if df.empty:
+        return df
+    activos, fechas, M = datos.apilar_largo(df, columnas)
+    largos = (~np.isnat(fechas)).sum(axis=1)
+    X = fechas.astype("datetime64[ns]").astype("int64").astype(float)
+
+    por_columna = [lttb_indices(X, M[col], largos, umbral) for col in columnas]
+    partes = []
+    for i, activo in enumerate(activos):
+        idx = np.unique(np.concatenate([elegidos[i] for elegidos in por_columna]))
+        parte = {"Fecha": fechas[i, idx], "Activo": activo}
+        parte.update({col: M[col][i, idx] for col in columnas})
+        partes.append(pd.DataFrame(parte))
+    return pd.concat(partes, ignore_index=True)
+
+
+def trazo(go, optimizado):
+    """Clase de trazo: WebGL cuando el gráfico está optimizado, SVG si no."""
+    return go.Scattergl if optimizado else go.Scatter
@@ -0,0 +1,144 @@
+"""
+Ingesta de precios.csv y rendimientos.csv a un panel largo en Arrow IPC.
+
+Los archivos crudos son anchos: precios.csv tiene un par de columnas
+Fecha/Valor por activo bajo un encabezado de dos filas y nombres largos
+("Datos históricos de … (TICKER)"), y rendimientos.csv se alinea por número
+de fila. Este comando los convierte una sola vez a ``data/panel.arrow``:
+
+    Fecha (timestamp) | Ticker (diccionario) | fila | observado | precio | rendimiento
+
+ordenado por (Ticker, Fecha), así cada activo es un tramo contiguo. Cada
+activo se alinea al calendario común (la unión de las fechas de todos los
+activos) entre su primera y su última observación; los días sin dato quedan
+como filas con ``observado = False`` y precio NaN, o con el último precio si
+``--faltantes arrastrar``. El rendimiento de esos días es siempre NaN.
+
+El archivo va sin compresión para que se pueda abrir con memory-map: las
+columnas numéricas se leen sin copiar y sin parsear texto. Los metadatos
+guardan el nombre original de cada ticker y el hash de los CSV de origen;
+datos.leer_precios y datos.leer_rendimientos usan el panel solo mientras
+esos hashes coincidan, y si no, vuelven a leer los CSV.
+
+Uso:
+    python ingesta.py [--precision float64] [--faltantes nan] [--directorio data]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+
+PRECISIONES = ("float64", "float32")
+FALTANTES = ("nan", "arrastrar")
+
+
+def _sha1(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def panel_largo(precios, rendimientos, precision="float64", faltantes="nan"):
+    """DataFrame largo con calendario alineado a partir de los dicts por activo.
+
+    ``precios`` y ``rendimientos`` son los de datos.leer_precios y
+    datos.leer_rendimientos (nombre original -> Serie).
+    """
+    if faltantes not in FALTANTES:
+        raise ValueError(f"Tratamiento de faltantes desconocido: {faltantes}")
+    calendario = pd.DatetimeIndex(
+        np.unique(np.concatenate([s.index.to_numpy() for s in precios.values()])),
+        name="Fecha",
+    )
+    tickers = [datos.ticker(n) for n in precios]
+    if len(set(tickers)) != len(tickers):
+        raise ValueError("Hay tickers repetidos en precios.csv")
+    partes = []
+    for codigo, (nombre, serie) in enumerate(precios.items()):
+        dias = calendario[calendario.searchsorted(serie.index[0]):
+                          calendario.searchsorted(serie.index[-1], side="right")]
+        pos = dias.get_indexer(serie.index)
+        observado = np.zeros(len(dias), dtype=bool)
+        observado[pos] = True
+        fila = np.full(len(dias), -1, dtype=np.int32)
+        fila[pos] = serie.attrs["filas"]
+        precio = np.full(len(dias), np.nan)
+        precio[pos] = serie.to_numpy()
+        if faltantes == "arrastrar":
+            precio = pd.Series(precio).ffill().to_numpy()
+        rend = np.full(len(dias), np.nan)
+        r = rendimientos.get(nombre)
+        if r is not None and len(r):
+            rend[dias.get_indexer(r.index)] = r.to_numpy()
+        partes.append(pd.DataFrame({
+            "Fecha": dias,
+            "Ticker": codigo,
+            "fila": fila,
+            "observado": observado,
+            "precio": precio.astype(precision),
+            "rendimiento": rend.astype(precision),
+        }))
+    df = pd.concat(partes, ignore_index=True)
+    df["Ticker"] = pd.Categorical.from_codes(df["Ticker"], categories=tickers)
+    return df
+
+
+def escribir(df, nombres, fuentes, directorio=None, precision="float64", faltantes="nan"):
+    """Escribe el panel en Arrow IPC (sin compresión) de forma atómica."""
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = {
+        b"activos": json.dumps(dict(zip(df["Ticker"].cat.categories, nombres)), ensure_ascii=False),
+        b"fuentes": json.dumps(fuentes),
+        b"precision": precision,
+        b"faltantes": faltantes,
+    }
+    tabla = tabla.replace_schema_metadata(metadatos)
+
+    destino = os.path.join(directorio or datos.DATA_DIR, datos.PANEL)
+    temporal = destino + ".tmp"
+    with pa.OSFile(temporal, "wb") as f, pa.ipc.new_file(f, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, destino)
+    return destino
+
+
+def ingerir(directorio=None, precision="float64", faltantes="nan"):
+    """Lee los CSV anchos de ``directorio`` y escribe panel.arrow."""
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión desconocida: {precision}")
+    directorio = directorio or datos.DATA_DIR
+    path_precios = os.path.join(directorio, "precios.csv")
+    path_rend = os.path.join(directorio, "rendimientos.csv")
+
+    # Siempre desde los CSV: un panel vigente no se reconstruye a sí mismo
+    precios = datos.leer_precios(path_precios, usar_panel=False)
+    rendimientos = datos.leer_rendimientos(path_rend, precios, usar_panel=False)
+    df = panel_largo(precios, rendimientos, precision, faltantes)
+    fuentes = {"precios.csv": _sha1(path_precios), "rendimientos.csv": _sha1(path_rend)}
+    return escribir(df, list(precios), fuentes, directorio, precision, faltantes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte precios y rendimientos a un panel Arrow")
+    parser.add_argument("--precision", choices=PRECISIONES, default="float64",
+                        help="tipo de las columnas precio y rendimiento")
+    parser.add_argument("--faltantes", choices=FALTANTES, default="nan",
+                        help="precio de los días del calendario sin dato")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    destino = ingerir(args.directorio, args.precision, args.faltantes)
+    print(f"Panel escrito en {destino} ({os.path.getsize(destino) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
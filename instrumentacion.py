@@ -0,0 +1,231 @@
+"""
+Instrumentación opcional de las etapas costosas del tablero.
+
+Se activa para todas las sesiones con la variable de entorno
+TABLERO_INSTRUMENTAR=1, o para una sola sesión abriendo el tablero con
+``?instrumentar=1``. Con el valor ``memoria`` (en cualquiera de los dos) se
+miden además los bytes asignados por etapa con tracemalloc; tracemalloc es
+global al proceso y hace más lento todo el intérprete, por eso va aparte.
+
+app.py abre un medidor por ejecución del script (iniciar / terminar) y
+marca sus etapas con ``etapa(nombre)``; datos.py marca las suyas (lectura
+del CSV, clean_name, índice por activo) con la misma función. Las etapas se
+anidan: cada una se registra con su ruta completa ("preparar/cargar
+garch_timeseries.csv/read_csv"). Al terminar, la ejecución se agrega como
+una línea JSON al registro (TABLERO_REGISTRO, por defecto
+instrumentacion.jsonl junto a este archivo) y app.py muestra el desglose en
+la barra lateral.
+
+Desactivada, ``etapa`` solo consulta una variable local del hilo y devuelve
+un contexto vacío.
+
+Para resumir el registro:
+    python instrumentacion.py [--registro instrumentacion.jsonl] [--pagina NOMBRE]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+ENTORNO = "TABLERO_INSTRUMENTAR"
+PARAMETRO = "instrumentar"
+REGISTRO = os.environ.get("TABLERO_REGISTRO") or os.path.join(RAIZ, "instrumentacion.jsonl")
+
+# Valores que activan la instrumentación; "memoria" activa además tracemalloc
+ACTIVOS = {"1", "true", "si", "sí", "memoria"}
+
+_actual = threading.local()
+_NULO = nullcontext()
+_escritura = threading.Lock()
+
+# Sesiones que usan tracemalloc (se detiene cuando no queda ninguna)
+_trazando = 0
+_trazando_lock = threading.Lock()
+
+
+def _modo(parametro=None):
+    """None (desactivada), "tiempo" o "memoria" según el parámetro y el entorno."""
+    valores = {str(v).strip().lower() for v in (parametro, os.environ.get(ENTORNO)) if v}
+    if not valores & ACTIVOS:
+        return None
+    return "memoria" if "memoria" in valores else "tiempo"
+
+
+def _tracemalloc(encender):
+    global _trazando
+    import tracemalloc
+
+    with _trazando_lock:
+        _trazando += 1 if encender else -1
+        if encender and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not encender and _trazando == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class Medidor:
+    """Tiempos (y memoria, si se pide) de las etapas de una ejecución."""
+
+    def __init__(self, pagina, sesion=None, memoria=False):
+        self.pagina = pagina
+        self.sesion = sesion
+        self.memoria = memoria
+        self.etapas = []
+        self._ruta = []
+        # Pico de memoria visto por cada etapa abierta antes de abrir una hija
+        self._picos = []
+        if memoria:
+            _tracemalloc(True)
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        ruta = "/".join(self._ruta + [nombre])
+        registro = {"ruta": ruta, "nivel": len(self._ruta)}
+        self.etapas.append(registro)
+        self._ruta.append(nombre)
+        if self.memoria:
+            import tracemalloc
+
+            actual, pico = tracemalloc.get_traced_memory()
+            if self._picos:
+                self._picos[-1] = max(self._picos[-1], pico)
+            tracemalloc.reset_peak()
+            self._picos.append(actual)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            registro["ms"] = (time.perf_counter() - inicio) * 1000
+            self._ruta.pop()
+            if self.memoria:
+                fin, pico = tracemalloc.get_traced_memory()
+                pico = max(self._picos.pop(), pico)
+                if self._picos:
+                    self._picos[-1] = max(self._picos[-1], pico)
+                registro["kb"] = (fin - actual) / 1024
+                registro["pico_kb"] = (pico - actual) / 1024
+
+    def cerrar(self):
+        """Registro de la ejecución (dict serializable en JSON)."""
+        total = (time.perf_counter() - self._inicio) * 1000
+        if self.memoria:
+            _tracemalloc(False)
+        registro = {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sesion": self.sesion,
+            "pagina": self.pagina,
+            "total_ms": total,
+            "etapas": self.etapas,
+        }
+        try:
+            import resource
+
+            registro["rss_max_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except ImportError:
+            pass
+        return registro
+
+
+def _sesion():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        return None if ctx is None else ctx.session_id
+    except ImportError:
+        return None
+
+
+def iniciar(pagina, parametro=None):
+    """Abre el medidor de esta ejecución si la instrumentación está activa.
+
+    Una ejecución anterior que no llegó a terminar (st.stop o un rerun que
+    la interrumpió) se descarta sin registrarse.
+    """
+    previo = getattr(_actual, "medidor", None)
+    if previo is not None and previo.memoria:
+        _tracemalloc(False)
+    modo = _modo(parametro)
+    _actual.medidor = None if modo is None else Medidor(pagina, _sesion(), modo == "memoria")
+    return _actual.medidor
+
+
+def etapa(nombre):
+    """Contexto que mide la etapa ``nombre`` (vacío si no hay medidor)."""
+    medidor = getattr(_actual, "medidor", None)
+    return _NULO if medidor is None else medidor.etapa(nombre)
+
+
+def terminar(registro=None, **extra):
+    """Cierra el medidor, agrega la ejecución al registro y la devuelve.
+
+    ``extra`` se guarda tal cual en el registro (p. ej. las estadísticas de
+    la caché de figuras).
+    """
+    medidor = getattr(_actual, "medidor", None)
+    if medidor is None:
+        return None
+    _actual.medidor = None
+    ejecucion = medidor.cerrar()
+    ejecucion.update(extra)
+    linea = json.dumps(ejecucion, ensure_ascii=False)
+    try:
+        with _escritura, open(registro or REGISTRO, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+    except OSError:
+        # Sin permiso de escritura (p. ej. en Streamlit Cloud) solo se muestra
+        pass
+    return ejecucion
+
+
+def tabla(registro):
+    """Filas (etapa indentada, ms, KB) para mostrar una ejecución."""
+    filas = [{"Etapa": "total", "ms": round(registro["total_ms"], 1)}]
+    for e in registro["etapas"]:
+        fila = {"Etapa": "  " * (e["nivel"] + 1) + e["ruta"].rsplit("/", 1)[-1],
+                "ms": round(e.get("ms", float("nan")), 1)}
+        if "kb" in e:
+            fila["KB"] = round(e["kb"], 1)
+            fila["pico KB"] = round(e["pico_kb"], 1)
+        filas.append(fila)
+    return filas
+
+
+# ============================================================
+# RESUMEN DEL REGISTRO
+# ============================================================
+
+def resumir(path=REGISTRO, pagina=None):
+    """Mediana y percentil 95 de cada etapa por página."""
+    import pandas as pd
+
+    with open(path, encoding="utf-8") as f:
+        ejecuciones = [json.loads(linea) for linea in f if linea.strip()]
+    filas = []
+    for e in ejecuciones:
+        if pagina and e["pagina"] != pagina:
+            continue
+        filas.append({"pagina": e["pagina"], "ruta": "total", "ms": e["total_ms"]})
+        filas.extend({"pagina": e["pagina"], "ruta": x["ruta"], "ms": x.get("ms")} for x in e["etapas"])
+    df = pd.DataFrame(filas, columns=["pagina", "ruta", "ms"])
+    return df.groupby(["pagina", "ruta"], sort=False)["ms"].agg(
+        n="count", mediana="median", p95=lambda s: s.quantile(0.95), total="sum"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen del registro de instrumentación del tablero")
+    parser.add_argument("--registro", default=REGISTRO)
+    parser.add_argument("--pagina", default=None)
+    args = parser.parse_args(argv)
+    print(resumir(args.registro, args.pagina).round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Varias especificaciones de volatilidad por activo y selección por AIC/BIC.
+
+garch.py ajusta solo GARCH(1,1) con innovaciones normales, y los
+diagnósticos muestran activos con colas pesadas (Jarque-Bera) o con una
+persistencia que delata un modelo mal especificado. Aquí se ajusta a cada
+activo una grilla de especificaciones:
+
+    GARCH      s2_t = omega + alpha e_{t-1}^2 + beta s2_{t-1}
+    GJR-GARCH  s2_t = omega + (alpha + asimetria 1[e_{t-1} < 0]) e_{t-1}^2 + beta s2_{t-1}
+    EGARCH     ln s2_t = omega + alpha (|z_{t-1}| - E|z|) + asimetria z_{t-1} + beta ln s2_{t-1}
+
+cada una con innovaciones normales o t de Student con varianza unitaria
+(sufijo ``-t``, ``nu`` grados de libertad), y se elige la de menor AIC o
+BIC.
+
+Primero se ajusta el GARCH(1,1) normal de cada activo (garch.estimar) y sus
+parámetros dan los puntos de partida de las demás especificaciones; así el
+optimizador arranca cerca del óptimo y no hace falta recorrer una grilla
+amplia. Todos los pares (activo, especificación) se reparten en un solo pool
+de procesos, los más costosos primero (EGARCH, cuya recursión no es lineal
+y se evalúa con un bucle).
+
+La especificación elegida sale en los mismos archivos que escribe garch.py
+(sigma_t, columnas modelo/asimetria/nu de garch_parametros.csv y columna
+Modelo de garch_supuestos.csv). Después se recalculan las gammas con
+aversion.escribir, de modo que gamma_GARCH de resultados_GARCH.csv
+corresponda a la sigma_mean del modelo elegido; los intervalos bootstrap y
+el tablero final se reconstruyen con pipeline.py. Las series de tasas se
+quedan con GARCH(1,1): no entran al tablero.
+
+En la comparación impresa los ajustes que no convergieron van al final,
+marcados con ``*``: solo se eligen si ninguno convergió.
+
+Uso:
+    python modelos.py [--modelos todos] [--criterio bic] [--procesos N]
+                      [--rf 0] [--kappa 1] [--horizonte 1] [--directorio data]
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+from scipy.special import gammaln
+
+import aversion
+import datos
+import garch
+
+# nombre -> (recursión, innovaciones t de Student)
+ESPECIFICACIONES = {
+    "GARCH(1,1)": ("garch", False),
+    "GARCH(1,1)-t": ("garch", True),
+    "GJR-GARCH(1,1)": ("gjr", False),
+    "GJR-GARCH(1,1)-t": ("gjr", True),
+    "EGARCH(1,1)": ("egarch", False),
+    "EGARCH(1,1)-t": ("egarch", True),
+}
+
+CRITERIOS = ("aic", "bic")
+CRITERIO = "bic"
+
+# Costo relativo de evaluar la verosimilitud, para repartir el pool
+_COSTO = {"garch": 1, "gjr": 1.5, "egarch": 10}
+
+_LOG_2PI = np.log(2 * np.pi)
+_E_ABS_Z = math.sqrt(2 / math.pi)
+
+# Límites de log s2 en la escala estandarizada (evitan desbordes de exp)
+_LOG_S2_MAX = 30.0
+
+# Con nu cerca de 2 la varianza de la t casi no existe: el optimizador lleva
+# ahí a las series con saltos y el BIC premia el ajuste degenerado. Un ajuste
+# que termina en la cota inferior se marca como no convergido
+NU_MIN, NU_MAX = 2.5, 200.0
+
+
+def especificacion(modelo):
+    """(recursión, t) de ``modelo``; un valor vacío es GARCH(1,1)."""
+    if not isinstance(modelo, str) or not modelo:
+        modelo = garch.MODELO
+    try:
+        return ESPECIFICACIONES[modelo]
+    except KeyError:
+        raise ValueError(f"Especificación desconocida: {modelo}") from None
+
+
+def n_parametros(modelo):
+    recursion, t = especificacion(modelo)
+    return 4 + (recursion != "garch") + t
+
+
+def persistencia(modelo, alpha, beta, asimetria=0.0):
+    """Persistencia de la varianza (alpha+beta en GARCH(1,1))."""
+    recursion, _ = especificacion(modelo)
+    if recursion == "egarch":
+        return beta
+    # Con innovaciones simétricas, e_{t-1} < 0 la mitad de las veces
+    return alpha + beta + (asimetria / 2 if recursion == "gjr" else 0.0)
+
+
+# ============================================================
+# RECURSIONES
+# ============================================================
+
+def _varianza_egarch(e, omega, alpha, beta, asimetria, s2_0):
+    # No es lineal en s2: bucle sobre floats de Python, más rápido que
+    # indexar arreglos de numpy elemento a elemento
+    c = omega - alpha * _E_ABS_Z
+    ln_s2 = math.log(s2_0)
+    salida = []
+    for x in e.tolist():
+        salida.append(ln_s2)
+        z = x * math.exp(-0.5 * ln_s2)
+        ln_s2 = c + alpha * abs(z) + asimetria * z + beta * ln_s2
+        ln_s2 = min(max(ln_s2, -_LOG_S2_MAX), _LOG_S2_MAX)
+    return np.exp(salida)
+
+
+def _varianza(recursion, e, omega, alpha, beta, asimetria, s2_0):
+    if recursion == "egarch":
+        return _varianza_egarch(e, omega, alpha, beta, asimetria, s2_0)
+    # GARCH y GJR son filtros lineales en s2: una sola llamada a lfilter
+    x = np.empty_like(e)
+    x[0] = s2_0
+    x[1:] = omega + (alpha + asimetria * (e[:-1] < 0)) * e[:-1] ** 2
+    return lfilter([1.0], [1.0, -beta], x)
+
+
+def varianza(modelo, e, omega, alpha, beta, asimetria, s2_0):
+    """Serie s2_t de ``modelo`` para los residuos ``e`` (s2_0 es la primera)."""
+    recursion, _ = especificacion(modelo)
+    return _varianza(recursion, np.asarray(e, dtype=float), omega, alpha, beta, asimetria, s2_0)
+
+
+def siguiente(modelo, omega, alpha, beta, asimetria, s2, e):
+    """s2_{t+1} a partir de (s2_t, e_t)."""
+    recursion, _ = especificacion(modelo)
+    if recursion == "egarch":
+        z = e / math.sqrt(s2)
+        return math.exp(omega + alpha * (abs(z) - _E_ABS_Z) + asimetria * z + beta * math.log(s2))
+    return omega + (alpha + asimetria * (e < 0)) * e ** 2 + beta * s2
+
+
+def extender(modelo, e_nuevos, omega, alpha, beta, asimetria, s2_ultima, e_ultima):
+    """Como garch.extender para cualquier especificación."""
+    s2_0 = siguiente(modelo, omega, alpha, beta, asimetria, s2_ultima, e_ultima)
+    return varianza(modelo, e_nuevos, omega, alpha, beta, asimetria, s2_0)
+
+
+# ============================================================
+# VEROSIMILITUD
+# ============================================================
+
+def _desempacar(params, recursion, t):
+    mu, omega, alpha, beta = params[:4]
+    asimetria = params[4] if recursion != "garch" else 0.0
+    nu = params[-1] if t else np.nan
+    return mu, omega, alpha, beta, asimetria, nu
+
+
+def neg_loglik(params, y, s2_0, recursion, t):
+    mu, omega, alpha, beta, asimetria, nu = _desempacar(params, recursion, t)
+    e = y - mu
+    s2 = _varianza(recursion, e, omega, alpha, beta, asimetria, s2_0)
+    if not np.all(np.isfinite(s2) & (s2 > 0)):
+        return np.inf
+    if not t:
+        return 0.5 * np.sum(_LOG_2PI + np.log(s2) + e ** 2 / s2)
+    # t de Student escalada para que la innovación tenga varianza 1
+    cte = gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2))
+    return -(len(e) * cte - 0.5 * np.sum(np.log(s2))
+             - 0.5 * (nu + 1) * np.sum(np.log1p(e ** 2 / (s2 * (nu - 2)))))
+
+
+def _limites(recursion, t):
+    if recursion == "egarch":
+        limites = [(-10, 10), (-10, 10), (0, 2), (0, 0.9999), (-1, 1)]
+        restricciones = []
+    else:
+        limites = [(-10, 10), (1e-8, 10), (0, 1), (0, 1)]
+        if recursion == "gjr":
+            limites.append((-1, 2))
+            restricciones = [
+                {"type": "ineq", "fun": lambda p: 1 - p[2] - p[3] - p[4] / 2},
+                {"type": "ineq", "fun": lambda p: p[2] + p[4]},
+            ]
+        else:
+            restricciones = [{"type": "ineq", "fun": lambda p: 1 - p[2] - p[3]}]
+    if t:
+        limites.append((NU_MIN, NU_MAX))
+    return limites, restricciones
+
+
+def _valores_iniciales(y, s2_0, recursion, t, base, k=2):
+    """Puntos de partida derivados del GARCH(1,1) ``base`` (escala estandarizada).
+
+    Se devuelven los ``k`` de menor -loglik.
+    """
+    mu, omega, alpha, beta = base
+    if recursion == "garch":
+        puntos = [[mu, omega, alpha, beta]]
+    elif recursion == "gjr":
+        puntos = [[mu, omega, alpha, beta, 0.0], [mu, omega, alpha / 2, beta, alpha]]
+    else:
+        # EGARCH: la persistencia pasa a beta y omega fija la varianza media
+        b = min(max(alpha + beta, 0.5), 0.99)
+        varianza_media = omega / (1 - alpha - beta) if alpha + beta < 1 else np.var(y)
+        w = (1 - b) * np.log(varianza_media)
+        puntos = [[mu, w, a, b, g] for a in (0.1, 0.2) for g in (0.0, -0.05)]
+    if t:
+        puntos = [p + [nu] for p in puntos for nu in (5.0, 12.0)]
+    puntos = [np.array(p, dtype=float) for p in puntos]
+    return sorted(puntos, key=lambda p: neg_loglik(p, y, s2_0, recursion, t))[:k]
+
+
+# ============================================================
+# AJUSTE
+# ============================================================
+
+def ajustar(activo, r, modelo, base):
+    """Ajusta ``modelo`` a ``r`` partiendo de ``base`` = (mu, omega, alpha, beta)
+    del GARCH(1,1) normal del mismo activo, en la escala original."""
+    recursion, t = especificacion(modelo)
+    r = np.asarray(r, dtype=float)
+    escala = r.std()
+    y = r / escala
+    s2_0 = garch.backcast(y - y.mean())
+    mu, omega, alpha, beta = base
+    inicial = (mu / escala, omega / escala ** 2, alpha, beta)
+
+    limites, restricciones = _limites(recursion, t)
+    res = min(
+        (
+            minimize(
+                neg_loglik,
+                inicio,
+                args=(y, s2_0, recursion, t),
+                method="SLSQP",
+                bounds=limites,
+                constraints=restricciones,
+                options={"maxiter": 500, "ftol": 1e-10},
+            )
+            for inicio in _valores_iniciales(y, s2_0, recursion, t, inicial)
+        ),
+        key=lambda res: res.fun,
+    )
+    mu, omega, alpha, beta, asimetria, nu = _desempacar(res.x, recursion, t)
+    s2 = _varianza(recursion, y - mu, omega, alpha, beta, asimetria, s2_0)
+    # De vuelta a la escala original: en EGARCH ln s2 se desplaza 2 ln(escala)
+    if recursion == "egarch":
+        omega = omega + (1 - beta) * 2 * np.log(escala)
+    else:
+        omega = omega * escala ** 2
+    convergio = bool(res.success) and np.isfinite(res.fun)
+    mensaje = str(res.message)
+    if t and nu < NU_MIN + 0.01:
+        convergio, mensaje = False, f"nu en la cota inferior ({NU_MIN})"
+    return garch.Ajuste(
+        activo=activo,
+        mu=mu * escala,
+        omega=omega,
+        alpha=alpha,
+        beta=beta,
+        loglik=-res.fun - len(r) * np.log(escala),
+        n=len(r),
+        convergio=convergio,
+        mensaje=mensaje,
+        s2_0=s2_0 * escala ** 2,
+        sigma=np.sqrt(s2) * escala,
+        modelo=modelo,
+        asimetria=asimetria,
+        nu=nu,
+    )
+
+
+def _ajustar(item):
+    return ajustar(*item)
+
+
+def filtrar(activo, r, p, mensaje="parámetros vigentes"):
+    """Ajuste con los parámetros ``p`` (fila de garch_parametros.csv), sin optimizar."""
+    r = np.asarray(r, dtype=float)
+    modelo = p.get("modelo", garch.MODELO)
+    if not isinstance(modelo, str):
+        modelo = garch.MODELO
+    asimetria = p.get("asimetria", 0.0)
+    asimetria = 0.0 if pd.isna(asimetria) else asimetria
+    s2 = varianza(modelo, r - p["mu"], p["omega"], p["alpha"], p["beta"], asimetria, p["s2_0"])
+    return garch.Ajuste(
+        activo, p["mu"], p["omega"], p["alpha"], p["beta"], p["loglik"], len(r),
+        bool(p["convergio"]), mensaje, p["s2_0"], np.sqrt(s2),
+        modelo=modelo, asimetria=asimetria, nu=p.get("nu", np.nan),
+    )
+
+
+def criterios(a):
+    """(AIC, BIC) de un ajuste."""
+    k = n_parametros(a.modelo)
+    return 2 * k - 2 * a.loglik, k * np.log(a.n) - 2 * a.loglik
+
+
+# ============================================================
+# GRILLA POR ACTIVO
+# ============================================================
+
+def _grillas(panel, especificaciones):
+    """dict nombre -> lista de especificaciones de ese activo."""
+    por_activo = isinstance(especificaciones, dict)
+    grillas = {}
+    for nombre in panel:
+        grilla = especificaciones.get(nombre, (garch.MODELO,)) if por_activo else especificaciones
+        grilla = [m if isinstance(m, str) and m else garch.MODELO for m in grilla]
+        for m in grilla:
+            especificacion(m)
+        if datos.clean_name(nombre) in datos.SERIES_TASA or not grilla:
+            grilla = [garch.MODELO]
+        grillas[nombre] = list(dict.fromkeys(grilla))
+    return grillas
+
+
+def estimar(panel, especificaciones=tuple(ESPECIFICACIONES), criterio=CRITERIO, procesos=None):
+    """Ajusta las especificaciones a cada activo y elige la mejor por ``criterio``.
+
+    ``especificaciones`` es una lista común a todos los activos o un dict
+    nombre -> lista. Devuelve (dict nombre -> Ajuste elegido, tabla con el
+    loglik, AIC y BIC de cada par activo x especificación).
+    """
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Criterio desconocido: {criterio}")
+    grillas = _grillas(panel, especificaciones)
+    base = garch.estimar(panel, procesos)
+
+    trabajos = [
+        (nombre, panel[nombre].to_numpy(), modelo,
+         (base[nombre].mu, base[nombre].omega, base[nombre].alpha, base[nombre].beta))
+        for nombre, grilla in grillas.items() if np.isfinite(base[nombre].loglik)
+        for modelo in grilla if modelo != garch.MODELO
+    ]
+    trabajos.sort(key=lambda item: -_COSTO[especificacion(item[2])[0]] * len(item[1]))
+    if procesos == 1 or len(trabajos) <= 1:
+        ajustados = list(map(_ajustar, trabajos))
+    elif trabajos:
+        # Trabajos de costo muy distinto: de a uno, para repartir bien la carga
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count() or 1) as pool:
+            ajustados = list(pool.map(_ajustar, trabajos))
+    else:
+        ajustados = []
+
+    candidatos = {nombre: [] for nombre in panel}
+    for nombre, grilla in grillas.items():
+        if garch.MODELO in grilla or not np.isfinite(base[nombre].loglik):
+            candidatos[nombre].append(base[nombre])
+    for a in ajustados:
+        candidatos[a.activo].append(a)
+
+    elegidos, filas = {}, []
+    i = CRITERIOS.index(criterio)
+    for nombre, lista in candidatos.items():
+        validos = [a for a in lista if a.convergio and np.isfinite(a.loglik)]
+        validos = validos or [a for a in lista if np.isfinite(a.loglik)] or lista
+        elegido = min(validos, key=lambda a: criterios(a)[i] if np.isfinite(a.loglik) else np.inf)
+        elegidos[nombre] = elegido
+        for a in lista:
+            aic, bic = criterios(a)
+            filas.append({
+                "Activo": nombre, "Modelo": a.modelo, "loglik": a.loglik,
+                "k": n_parametros(a.modelo), "AIC": aic, "BIC": bic,
+                "persistencia": a.persistencia, "nu": a.nu,
+                "convergio": a.convergio, "elegido": a is elegido,
+            })
+    return elegidos, pd.DataFrame(filas)
+
+
+def _especificaciones(valores):
+    """Nombres de la línea de comandos ("todos" = toda la grilla)."""
+    if not valores or "todos" in valores:
+        return list(ESPECIFICACIONES)
+    return list(dict.fromkeys(valores))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Selección de especificación de volatilidad por activo")
+    parser.add_argument("--modelos", nargs="+", default=["todos"],
+                        choices=["todos", *ESPECIFICACIONES], metavar="MODELO",
+                        help=f"especificaciones a comparar: todos o {', '.join(ESPECIFICACIONES)}")
+    parser.add_argument("--criterio", choices=CRITERIOS, default=CRITERIO)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--rf", type=float, default=0.0, help="tasa libre de riesgo diaria (log)")
+    parser.add_argument("--kappa", type=float, default=aversion.KAPPA, help="parámetro de forma FTP")
+    parser.add_argument("--horizonte", type=int, default=1, help="horizonte en días")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    precios = datos.leer_precios(os.path.join(args.directorio, "precios.csv"))
+    panel = datos.leer_rendimientos(os.path.join(args.directorio, "rendimientos.csv"), precios)
+    ajustes, comparacion = estimar(panel, _especificaciones(args.modelos), args.criterio, args.procesos)
+    garch.escribir(panel, ajustes, args.directorio)
+    # gamma_GARCH depende de sigma_mean: se recalcula con la especificación elegida
+    aversion.escribir(
+        panel, precios, args.directorio, rf=args.rf, horizonte=args.horizonte, kappa=args.kappa
+    )
+
+    columna = args.criterio.upper()
+    for nombre, a in ajustes.items():
+        otras = comparacion[comparacion["Activo"] == nombre]
+        otras = otras.assign(_orden=~otras["convergio"]).sort_values(["_orden", columna])
+        resumen = "  ".join(
+            f"{m}={v:.1f}{'' if ok else '*'}"
+            for m, v, ok in zip(otras["Modelo"], otras[columna], otras["convergio"])
+        )
+        print(f"{nombre[:45]:<45} {a.modelo:<17} {resumen}")
+    print("* no convergió (solo se elige si ningún ajuste convergió)")
+
+
+if __name__ == "__main__":
+    main()
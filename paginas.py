@@ -0,0 +1,76 @@
+"""
+Registro de páginas del tablero.
+
+Cada página declara los archivos de ``data/`` y las librerías pesadas que
+necesita; app.py solo carga eso, y solo cuando la página se abre. El mismo
+registro lo usan perfil_arranque.py y perfil_paginas.py para medir el costo
+de cada página.
+"""
+
+import importlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Pagina:
+    datos: tuple = ()
+    librerias: tuple = ()
+
+
+PAGINAS = {
+    "Contexto": Pagina(
+        datos=("resultados_completos_tablero.csv",),
+        librerias=("plotly.express", "plotly.graph_objects", "agregados"),
+    ),
+    "Aversión al riesgo": Pagina(
+        datos=("resultados_completos_tablero.csv",),
+        librerias=("plotly.graph_objects", "agregados"),
+    ),
+    "Volatilidad dinámica": Pagina(
+        datos=("garch_timeseries.csv",),
+        librerias=("plotly.graph_objects", "graficos", "agregados"),
+    ),
+    "Aversión dinámica": Pagina(
+        datos=("garch_timeseries.csv",),
+        librerias=("plotly.graph_objects", "gamma_movil"),
+    ),
+    "Volatilidad histórica vs dinámica": Pagina(
+        datos=("vol_hist_vs_garch.csv", "volatilidad.arrow"),
+        librerias=("plotly.graph_objects", "graficos", "volatilidad"),
+    ),
+    "Diagnósticos GARCH": Pagina(
+        datos=("garch_supuestos.csv", "garch_parametros.csv", "precios.csv", "rendimientos.csv"),
+        librerias=("diagnosticos",),
+    ),
+    "Pronóstico de volatilidad": Pagina(
+        datos=("garch_parametros.csv",),
+        librerias=("plotly.graph_objects", "pronostico"),
+    ),
+    "Correlaciones": Pagina(
+        datos=("correlacion.npz",),
+        librerias=("numpy", "plotly.graph_objects", "correlacion"),
+    ),
+    "Sensibilidad de gamma": Pagina(
+        datos=("sensibilidad_gamma.npz",),
+        librerias=("numpy", "plotly.graph_objects", "sensibilidad"),
+    ),
+}
+
+# Lo que app.py cargaba antes en cada rerun, sin importar la página
+CARGA_COMPLETA = Pagina(
+    datos=(
+        "resultados_CRRA.csv",
+        "resultados_FTP.csv",
+        "resultados_GARCH.csv",
+        "resultados_completos_tablero.csv",
+        "garch_supuestos.csv",
+        "garch_timeseries.csv",
+        "vol_hist_vs_garch.csv",
+    ),
+    librerias=("pandas", "plotly.express", "plotly.graph_objects"),
+)
+
+
+def importar(librerias):
+    """Importa (o recupera de sys.modules) las librerías en el orden dado."""
+    return [importlib.import_module(nombre) for nombre in librerias]
@@ -0,0 +1,68 @@
+"""
+Reporte de tiempo de arranque por página.
+
+Para cada página del tablero mide, en un intérprete nuevo (arranque en frío),
+cuánto tarda en importar sus librerías y cargar sus archivos según lo que
+declara en paginas.py, y lo compara con la carga completa que app.py hacía
+antes en cada rerun (todas las librerías y los siete CSV).
+
+Uso:
+    python perfil_arranque.py [--repeticiones N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import paginas
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+# Se ejecuta en un proceso hijo: streamlit ya está importado cuando app.py
+# llega a las páginas, así que se excluye de la medición.
+_MEDIR = """
+import json, sys, time
+import streamlit
+import datos, paginas
+libs, archivos = json.loads(sys.argv[1])
+t0 = time.perf_counter()
+paginas.importar(libs)
+for nombre in archivos:
+    datos.cargar(nombre)
+print(time.perf_counter() - t0)
+"""
+
+
+def medir(pagina, repeticiones):
+    """Mediana en ms de importar y cargar lo declarado por ``pagina``."""
+    args = json.dumps([list(pagina.librerias), list(pagina.datos)])
+    tiempos = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, "-c", _MEDIR, args],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        )
+        tiempos.append(float(salida.stdout.strip()) * 1000)
+    return statistics.median(tiempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    completa = medir(paginas.CARGA_COMPLETA, args.repeticiones)
+
+    ancho = max(len(nombre) for nombre in paginas.PAGINAS)
+    print(f"{'Página':<{ancho}}  {'antes (ms)':>10}  {'ahora (ms)':>10}  {'ahorro':>7}")
+    for nombre, pagina in paginas.PAGINAS.items():
+        ms = medir(pagina, args.repeticiones)
+        ahorro = 1 - ms / completa
+        print(f"{nombre:<{ancho}}  {completa:>10.1f}  {ms:>10.1f}  {ahorro:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Banco de pruebas del tablero: tiempo, memoria y peso de cada página.
+
+Cada página de paginas.PAGINAS se ejecuta con el arnés de pruebas de
+Streamlit (AppTest, sin navegador) en un intérprete nuevo:
+
+    frío     primera ejecución de la página (importa librerías, lee y
+             prepara los archivos)
+    tibio    mediana de las ejecuciones siguientes en el mismo proceso
+             (cachés de datos.py y de Streamlit ya cargadas)
+    memoria  pico de memoria residente del proceso
+    figuras  bytes de las figuras Plotly que se enviarían al navegador
+
+Sin ``--escenarios`` se mide sobre ``data/``; cada escenario NxT genera con
+sintetico.py N activos x T días (el directorio se reutiliza entre corridas
+y pipeline.py no reconstruye nada si los datos ya están).
+
+Con ``--guardar-base`` los resultados quedan como línea base; en las
+corridas siguientes se comparan con ella y el comando termina con error si
+alguna métrica empeora más que ``--tolerancia`` (los tiempos, además, con
+un margen absoluto de ``--margen-ms`` para no fallar por ruido).
+
+Uso:
+    python perfil_paginas.py [--escenarios 20x1250 100x2500] [--repeticiones 3]
+                             [--base perfil_base.json] [--guardar-base]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import paginas
+import sintetico
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(RAIZ, "app.py")
+BASE = os.path.join(RAIZ, "perfil_base.json")
+
+TOLERANCIA = 0.25
+MARGEN_MS = 50.0
+
+# Métricas comparadas con la línea base y si llevan margen absoluto
+METRICAS = {"frio_ms": True, "tibio_ms": True, "memoria_mb": False, "figuras_kb": False}
+
+# Se ejecuta en un proceso hijo con TABLERO_DATOS apuntando a los datos
+_MEDIR = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app, pagina, repeticiones = json.loads(sys.argv[1])
+at = AppTest.from_file(app, default_timeout=600)
+at.session_state["pagina"] = pagina
+
+def correr():
+    t0 = time.perf_counter()
+    at.run()
+    if at.exception:
+        sys.exit(at.exception[0].value)
+    return (time.perf_counter() - t0) * 1000
+
+frio = correr()
+tibios = [correr() for _ in range(repeticiones)]
+figuras = sum(el.proto.ByteSize() for el in at.get("plotly_chart"))
+# ru_maxrss se hereda del padre a través de fork/exec; VmHWM es del proceso
+memoria = None
+try:
+    with open("/proc/self/status") as f:
+        memoria = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 2 ** 10
+except (OSError, StopIteration):
+    if sys.platform == "darwin":
+        import resource
+        memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 20
+print(json.dumps({"frio": frio, "tibios": tibios, "memoria": memoria, "figuras": figuras}))
+"""
+
+
+def medir(pagina, directorio, repeticiones):
+    """Métricas de una página sobre los datos de ``directorio``."""
+    entorno = {**os.environ, "TABLERO_DATOS": directorio}
+    salida = subprocess.run(
+        [sys.executable, "-c", _MEDIR, json.dumps([APP, pagina, repeticiones])],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True,
+    )
+    if salida.returncode != 0:
+        raise RuntimeError(f"La página {pagina} falló:\n{salida.stderr.strip()[-2000:]}")
+    r = json.loads(salida.stdout.strip().splitlines()[-1])
+    return {
+        "frio_ms": r["frio"],
+        "tibio_ms": statistics.median(r["tibios"]) if r["tibios"] else None,
+        "memoria_mb": r["memoria"],
+        "figuras_kb": r["figuras"] / 1024,
+    }
+
+
+def _escenario(texto):
+    try:
+        activos, dias = (int(x) for x in texto.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Escenario inválido: {texto} (formato NxT, p. ej. 50x2500)")
+    return activos, dias
+
+
+def directorio_escenario(activos, dias, semilla=sintetico.SEMILLA, procesos=None):
+    """Genera (o reutiliza) los datos sintéticos de un escenario."""
+    directorio = os.path.join(tempfile.gettempdir(), "tablero_sintetico", f"{activos}x{dias}_{semilla}")
+    return sintetico.generar(directorio, activos, dias, semilla, procesos)
+
+
+def comparar(resultados, base, tolerancia=TOLERANCIA, margen_ms=MARGEN_MS):
+    """Lista de regresiones (escenario, página, métrica, base, actual)."""
+    regresiones = []
+    for escenario, por_pagina in resultados.items():
+        for pagina, metricas in por_pagina.items():
+            previo = base.get(escenario, {}).get(pagina)
+            if previo is None:
+                continue
+            for metrica, con_margen in METRICAS.items():
+                antes, ahora = previo.get(metrica), metricas.get(metrica)
+                if antes is None or ahora is None:
+                    continue
+                limite = antes * (1 + tolerancia) + (margen_ms if con_margen else 0)
+                if ahora > limite:
+                    regresiones.append((escenario, pagina, metrica, antes, ahora))
+    return regresiones
+
+
+def _imprimir(escenario, por_pagina):
+    ancho = max(len(nombre) for nombre in por_pagina)
+    print(f"\n[{escenario}]")
+    print(f"{'Página':<{ancho}}  {'frío (ms)':>10}  {'tibio (ms)':>10}  {'memoria (MB)':>12}  {'figuras (KB)':>12}")
+    for nombre, m in por_pagina.items():
+        memoria = "-" if m["memoria_mb"] is None else f"{m['memoria_mb']:.0f}"
+        print(f"{nombre:<{ancho}}  {m['frio_ms']:>10.0f}  {m['tibio_ms']:>10.0f}  "
+              f"{memoria:>12}  {m['figuras_kb']:>12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo, memoria y peso de cada página del tablero")
+    parser.add_argument("--escenarios", nargs="*", type=_escenario, default=[],
+                        help="universos sintéticos NxT (activos x días); sin escenarios, data/")
+    parser.add_argument("--paginas", nargs="*", default=list(paginas.PAGINAS))
+    parser.add_argument("--repeticiones", type=int, default=3, help="ejecuciones tibias por página")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos para generar los datos")
+    parser.add_argument("--base", default=BASE, help="archivo JSON de la línea base")
+    parser.add_argument("--guardar-base", action="store_true",
+                        help="guarda los resultados como línea base en lugar de comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--margen-ms", type=float, default=MARGEN_MS)
+    parser.add_argument("--json", help="escribe también los resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    if args.repeticiones < 1:
+        parser.error("--repeticiones debe ser al menos 1")
+    desconocidas = set(args.paginas) - set(paginas.PAGINAS)
+    if desconocidas:
+        parser.error(f"Páginas desconocidas: {', '.join(sorted(desconocidas))}")
+
+    escenarios = {"data": os.environ.get("TABLERO_DATOS") or os.path.join(RAIZ, "data")}
+    if args.escenarios:
+        escenarios = {
+            f"{a}x{t}": directorio_escenario(a, t, procesos=args.procesos) for a, t in args.escenarios
+        }
+
+    resultados = {}
+    for escenario, directorio in escenarios.items():
+        resultados[escenario] = {p: medir(p, directorio, args.repeticiones) for p in args.paginas}
+        _imprimir(escenario, resultados[escenario])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=1, ensure_ascii=False)
+
+    if args.guardar_base:
+        base = {}
+        if os.path.exists(args.base):
+            with open(args.base, encoding="utf-8") as f:
+                base = json.load(f)
+        for escenario, por_pagina in resultados.items():
+            base.setdefault(escenario, {}).update(por_pagina)
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(base, f, indent=1, ensure_ascii=False, sort_keys=True)
+        print(f"\nLínea base guardada en {args.base}")
+        return
+
+    if not os.path.exists(args.base):
+        print(f"\nSin línea base ({args.base}); use --guardar-base para crearla")
+        return
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    regresiones = comparar(resultados, base, args.tolerancia, args.margen_ms)
+    if not regresiones:
+        print("\nSin regresiones frente a la línea base")
+        return
+    print("\nRegresiones frente a la línea base:")
+    for escenario, pagina, metrica, antes, ahora in regresiones:
+        cambio = f" ({ahora / antes - 1:+.0%})" if antes else ""
+        print(f"  [{escenario}] {pagina}: {metrica} {antes:.1f} -> {ahora:.1f}{cambio}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
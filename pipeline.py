@@ -0,0 +1,595 @@
+"""
+Reconstrucción incremental de todos los archivos de ``data/``.
+
+Los archivos forman un grafo de dependencias:
+
+    precios.csv -> rendimientos.csv -> garch (garch_timeseries, vol_hist_vs_garch,
+    garch_supuestos, garch_parametros, resultados_GARCH) -> aversion
+    (resultados_CRRA, resultados_FTP, resultados_completos_tablero) -> bootstrap
+    -> tablero_final (tablero_final_completo, volatilidad_GARCH)
+
+    garch_parametros -> pronostico (pronostico_GARCH)
+    garch_timeseries -> correlacion (correlacion.npz)
+    precios, rendimientos, garch_timeseries -> sensibilidad (sensibilidad_gamma.npz)
+    garch_timeseries -> bootstrap (sigma_t de cada réplica)
+
+y panel.arrow (ingesta.py) y volatilidad.arrow (volatilidad.py) a partir de
+precios y rendimientos. Cada nodo declara sus entradas, sus salidas, los
+archivos que modifica en el lugar y sus parámetros. En
+``data/.pipeline.json`` se guarda, por nodo, el hash de las entradas y los
+parámetros con que corrió, y el hash vigente de cada archivo. Un nodo se
+ejecuta solo si cambió alguna entrada o parámetro, o si falta o fue editada
+a mano alguna salida; si al reejecutarlo sus salidas quedan idénticas, los
+nodos siguientes no se tocan.
+
+El nodo garch trabaja por activo: los activos con historia nueva al final
+solo se filtran con sus parámetros vigentes (como actualizacion.py) y se
+reestiman si acumulan ``--reestimar-cada`` observaciones o hay deriva; los
+activos nuevos o con historia revisada se reestiman. Con ``--modelos`` cada
+activo reestimado elige su especificación entre las indicadas (modelos.py);
+si cambian las especificaciones o el criterio se reestiman todos. Los nodos
+independientes corren en paralelo (hilos) y dentro de cada nodo los activos
+se reparten en pools de procesos.
+
+Todo se construye en una copia de trabajo (``data/.pipeline/``) y al final
+las salidas de los nodos ejecutados que cambiaron se publican juntas con el
+bloqueo exclusivo de datos.bloqueo: el tablero ve la corrida anterior
+completa o la nueva completa, nunca una mezcla. Solo se publican salidas
+declaradas de los nodos: las entradas de la copia no vuelven a ``data/``, y
+una salida que alguien reemplazó durante la corrida (p. ej. rendimientos.csv
+con actualizacion.py) se conserva; la corrida siguiente la procesa.
+
+Uso:
+    python pipeline.py [--plan] [--forzar NODO ...] [--adoptar] [--procesos N]
+                       [--modelos todos] [--criterio bic] [--rf 0] [--kappa 1]
+                       [--horizonte 1] [--replicas 1000] ...
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import actualizacion
+import aversion
+import bootstrap
+import correlacion
+import datos
+import garch
+import ingesta
+import modelos
+import pronostico
+import sensibilidad
+import volatilidad
+
+ESTADO = ".pipeline.json"
+TRABAJO = ".pipeline"
+
+# Diferencia a partir de la cual un rendimiento ya guardado se considera revisado
+TOL_RENDIMIENTO = 1e-12
+
+
+@dataclass
+class Nodo:
+    nombre: str
+    entradas: tuple
+    salidas: tuple
+    ejecutar: object
+    modifica: tuple = ()
+    parametros: tuple = ()
+
+
+@dataclass
+class Corrida:
+    directorio: str
+    parametros: dict
+    previo: dict = field(default_factory=dict)
+
+
+def _sha1(path):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _huella_serie(r):
+    return hashlib.sha1(np.ascontiguousarray(r, dtype=float).tobytes()).hexdigest()
+
+
+# ============================================================
+# NODOS
+# ============================================================
+
+def _rendimientos(c):
+    """rendimientos.csv desde precios.csv, conservando las filas ya guardadas.
+
+    Los rendimientos guardados no siempre coinciden bit a bit con los que se
+    obtienen de precios.csv (el CSV redondea los precios), así que solo se
+    escriben las filas nuevas y las que cambiaron más que TOL_RENDIMIENTO.
+    """
+    precios = datos.leer_precios(os.path.join(c.directorio, "precios.csv"), usar_panel=False)
+    path = os.path.join(c.directorio, "rendimientos.csv")
+    columnas = {}
+    for nombre, serie in precios.items():
+        valores = serie.to_numpy()
+        filas = serie.attrs["filas"]
+        columnas[nombre] = pd.Series(np.log(valores[1:] / valores[:-1]), index=filas[1:])
+    nuevo = pd.DataFrame(columnas)
+
+    if os.path.exists(path):
+        previo = pd.read_csv(path, index_col=0, float_precision="round_trip")
+        previo = previo.reindex(index=previo.index.union(nuevo.index), columns=nuevo.columns)
+        nuevo = nuevo.reindex(previo.index)
+        viejo, fresco = previo.to_numpy(), nuevo.to_numpy()
+        igual = np.isclose(viejo, fresco, rtol=TOL_RENDIMIENTO, atol=TOL_RENDIMIENTO, equal_nan=True)
+        nuevo = pd.DataFrame(np.where(igual, viejo, fresco), index=previo.index, columns=previo.columns)
+    datos.escribir_csv(nuevo, "rendimientos.csv", c.directorio, index=True)
+    return {}
+
+
+def _panel(c):
+    ingesta.ingerir(c.directorio, c.parametros["precision"], c.parametros["faltantes"])
+    return {}
+
+
+def _volatilidad(c):
+    volatilidad.construir(c.directorio)
+    return {}
+
+
+def _garch(c):
+    """Filtra, extiende o reestima cada activo según qué cambió en su serie."""
+    panel = datos.leer_rendimientos(
+        os.path.join(c.directorio, "rendimientos.csv"),
+        datos.leer_precios(os.path.join(c.directorio, "precios.csv")),
+    )
+    huellas = {n: {"n": len(s), "hash": _huella_serie(s.to_numpy())} for n, s in panel.items()}
+    path_param = os.path.join(c.directorio, "garch_parametros.csv")
+    procesos = c.parametros["procesos"]
+    especificaciones, criterio = c.parametros["modelos"], c.parametros["criterio"]
+    previos = c.previo.get("parametros", {})
+    misma_grilla = (previos.get("modelos", [garch.MODELO]) == list(especificaciones)
+                    and previos.get("criterio", modelos.CRITERIO) == criterio)
+    if not os.path.exists(path_param) or not misma_grilla:
+        ajustes, _ = modelos.estimar(panel, especificaciones, criterio, procesos)
+        garch.escribir(panel, ajustes, c.directorio)
+        return {"por_activo": huellas, "reestimados": list(panel)}
+
+    params = pd.read_csv(path_param, float_precision="round_trip").set_index("Activo")
+    anteriores = c.previo.get("por_activo", {})
+    reestimar = []
+    for nombre, serie in panel.items():
+        r = serie.to_numpy()
+        if nombre not in params.index:
+            reestimar.append(nombre)
+            continue
+        p = params.loc[nombre]
+        ant = anteriores.get(nombre)
+        n = int(p["n"]) if ant is None else ant["n"]
+        if n > len(r):
+            reestimar.append(nombre)
+            continue
+        # La historia ya procesada debe seguir igual; si no hay registro
+        # previo se compara el último residuo guardado en los parámetros
+        if ant is not None:
+            misma = _huella_serie(r[:n]) == ant["hash"]
+        else:
+            misma = np.isclose(r[n - 1] - p["mu"], p["e_ultima"], rtol=1e-12, atol=1e-15)
+        if not misma:
+            reestimar.append(nombre)
+            continue
+        if n == len(r):
+            continue
+        e = r - p["mu"]
+        s2 = modelos.varianza(p.get("modelo"), e, p["omega"], p["alpha"], p["beta"],
+                              actualizacion._asimetria(p), p["s2_0"])
+        n_ajuste = int(p["n_ajuste"])
+        m = len(r) - n_ajuste
+        suma_z2 = float(np.sum(e[n_ajuste:] ** 2 / s2[n_ajuste:]))
+        if (m >= c.parametros["reestimar_cada"]
+                or actualizacion._prob_deriva(suma_z2, m) < c.parametros["umbral_deriva"]):
+            reestimar.append(nombre)
+
+    actualizacion.publicar(
+        c.directorio,
+        actualizacion.reestimar_parcial(c.directorio, params, reestimar, procesos, especificaciones, criterio),
+    )
+    return {"por_activo": huellas, "reestimados": reestimar}
+
+
+def _pronostico(c):
+    pronostico.escribir(
+        c.directorio, horizonte=c.parametros["horizonte_pronostico"], nivel=c.parametros["nivel_var"],
+        simular_t=c.parametros["simular"], trayectorias=c.parametros["trayectorias"],
+    )
+    return {}
+
+
+def _correlacion(c):
+    correlacion.construir(c.directorio, c.parametros["dcc_a"], c.parametros["dcc_b"])
+    return {}
+
+
+def _sensibilidad(c):
+    sensibilidad.construir(c.directorio, c.parametros["kappa"])
+    return {}
+
+
+def _aversion(c):
+    precios = datos.leer_precios(os.path.join(c.directorio, "precios.csv"))
+    panel = datos.leer_rendimientos(os.path.join(c.directorio, "rendimientos.csv"), precios)
+    aversion.escribir(
+        panel, precios, c.directorio,
+        rf=c.parametros["rf"], horizonte=c.parametros["horizonte"], kappa=c.parametros["kappa"],
+    )
+    return {}
+
+
+def _bootstrap(c):
+    bootstrap.calcular(
+        c.directorio, semilla=c.parametros["semilla"], procesos=c.parametros["procesos"],
+        replicas=c.parametros["replicas"], bloque=c.parametros["bloque"],
+        esquema=c.parametros["esquema"], nivel=c.parametros["nivel"],
+        horizonte=c.parametros["horizonte"], rf=c.parametros["rf"], kappa=c.parametros["kappa"],
+    )
+    return {}
+
+
+def _tablero_final(c):
+    """tablero_final_completo.csv y volatilidad_GARCH.csv desde los resultados."""
+    leer = lambda nombre: pd.read_csv(os.path.join(c.directorio, nombre), float_precision="round_trip")
+    completo = leer("resultados_completos_tablero.csv")
+    res_garch = leer("resultados_GARCH.csv")
+    supuestos = leer("garch_supuestos.csv")
+
+    clave = completo["Activo"].map(datos.clean_name)
+    por_clave = lambda df, col: clave.map(dict(zip(df["Activo"].map(datos.clean_name), df[col])))
+    columna = lambda col: completo[col] if col in completo.columns else np.nan
+    final = pd.DataFrame({
+        "Activo": completo["Activo"],
+        "gamma_CRRA": columna("gamma_CRRA"),
+        "CE_CRRA": columna("CE_CRRA"),
+        "vol_hist": columna("vol_hist"),
+        "gamma_FTP": columna("gamma_FTP"),
+        "CE_FTP": columna("CE_FTP"),
+        "gamma_GARCH": columna("gamma_GARCH"),
+        "vol_garch_last": por_clave(res_garch, "sigma_last"),
+        "vol_garch_mean": por_clave(res_garch, "sigma_mean"),
+    })
+    for col in ["ADF_p", "ARCH_LM_p", "Ljung_resid_p", "Ljung_resid2_p", "JarqueBera_p"]:
+        final[col] = por_clave(supuestos, col)
+    final["alpha_plus_beta"] = por_clave(supuestos, "alpha+beta")
+    datos.escribir_csv(final, "tablero_final_completo.csv", c.directorio)
+
+    ancho = res_garch.set_index("Activo")[["sigma_last", "sigma_mean"]].T
+    ancho.index = ["vol_garch_last", "vol_garch_mean"]
+    datos.escribir_csv(ancho, "volatilidad_GARCH.csv", c.directorio, index=True)
+    return {}
+
+
+ARCHIVOS_GARCH = (
+    "garch_timeseries.csv", "vol_hist_vs_garch.csv", "garch_supuestos.csv",
+    "garch_parametros.csv", "resultados_GARCH.csv",
+)
+
+NODOS = [
+    Nodo("rendimientos", ("precios.csv",), ("rendimientos.csv",), _rendimientos),
+    Nodo("panel", ("precios.csv", "rendimientos.csv"), (datos.PANEL,), _panel,
+         parametros=("precision", "faltantes")),
+    Nodo("volatilidad", ("precios.csv", "rendimientos.csv"), (volatilidad.ARCHIVO,), _volatilidad),
+    Nodo("garch", ("precios.csv", "rendimientos.csv"), ARCHIVOS_GARCH, _garch,
+         parametros=("reestimar_cada", "umbral_deriva", "modelos", "criterio")),
+    Nodo("pronostico", ("garch_parametros.csv",), ("pronostico_GARCH.csv",), _pronostico,
+         parametros=("horizonte_pronostico", "nivel_var", "simular", "trayectorias")),
+    Nodo("correlacion", ("garch_timeseries.csv",), (correlacion.ARCHIVO,), _correlacion,
+         parametros=("dcc_a", "dcc_b")),
+    Nodo("sensibilidad", ("precios.csv", "rendimientos.csv", "garch_timeseries.csv"),
+         (sensibilidad.ARCHIVO,), _sensibilidad, parametros=("kappa",)),
+    Nodo("aversion", ("precios.csv", "rendimientos.csv", "resultados_GARCH.csv"),
+         ("resultados_CRRA.csv", "resultados_FTP.csv", "resultados_completos_tablero.csv"),
+         _aversion, modifica=("resultados_GARCH.csv",), parametros=("rf", "kappa", "horizonte")),
+    Nodo("bootstrap",
+         ("precios.csv", "rendimientos.csv", "garch_timeseries.csv", "resultados_completos_tablero.csv"),
+         (), _bootstrap, modifica=("resultados_completos_tablero.csv",),
+         parametros=("replicas", "bloque", "esquema", "nivel", "semilla", "rf", "kappa", "horizonte")),
+    Nodo("tablero_final",
+         ("resultados_completos_tablero.csv", "resultados_GARCH.csv", "garch_supuestos.csv"),
+         ("tablero_final_completo.csv", "volatilidad_GARCH.csv"), _tablero_final),
+]
+
+
+# ============================================================
+# GRAFO Y ESTADO
+# ============================================================
+
+def dependencias(nodos=NODOS):
+    """dict nodo -> nodos que deben terminar antes (productores y modificadores
+    de sus entradas)."""
+    escritores = {}
+    for nodo in nodos:
+        for archivo in nodo.salidas + nodo.modifica:
+            escritores.setdefault(archivo, []).append(nodo.nombre)
+    return {
+        nodo.nombre: {
+            otro for archivo in nodo.entradas for otro in escritores.get(archivo, ())
+            if otro != nodo.nombre
+        }
+        for nodo in nodos
+    }
+
+
+def leer_estado(directorio):
+    path = os.path.join(directorio, ESTADO)
+    if not os.path.exists(path):
+        return {"artefactos": {}, "nodos": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _escribir_estado(estado, directorio):
+    path = os.path.join(directorio, ESTADO)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _parametros_nodo(nodo, parametros):
+    # Ida y vuelta por JSON para comparar igual que lo guardado (tuplas -> listas)
+    return json.loads(json.dumps({k: parametros[k] for k in nodo.parametros}))
+
+
+def motivo(nodo, estado, directorio, parametros):
+    """Por qué hay que ejecutar el nodo, o None si está al día."""
+    registro = estado["nodos"].get(nodo.nombre)
+    if registro is None:
+        return "sin ejecución previa"
+    if registro["parametros"] != _parametros_nodo(nodo, parametros):
+        return "cambiaron los parámetros"
+    for archivo in nodo.entradas:
+        if _sha1(os.path.join(directorio, archivo)) != registro["entradas"].get(archivo):
+            return f"cambió {archivo}"
+    for archivo in nodo.salidas + nodo.modifica:
+        actual = _sha1(os.path.join(directorio, archivo))
+        if actual is None:
+            return f"falta {archivo}"
+        if actual != estado["artefactos"].get(archivo):
+            return f"{archivo} se modificó fuera del pipeline"
+    return None
+
+
+def _registrar(nodo, estado, directorio, parametros, extra):
+    """Guarda los hashes tras ejecutar el nodo (los archivos que modifica en
+    el lugar se registran con su contenido final)."""
+    hashes = {a: _sha1(os.path.join(directorio, a)) for a in nodo.entradas + nodo.salidas + nodo.modifica}
+    for archivo in nodo.salidas + nodo.modifica:
+        estado["artefactos"][archivo] = hashes[archivo]
+    estado["nodos"][nodo.nombre] = {
+        "entradas": {a: hashes[a] for a in nodo.entradas},
+        "parametros": _parametros_nodo(nodo, parametros),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **extra,
+    }
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+def _preparar_trabajo(directorio):
+    """Copia de trabajo y hash de cada archivo copiado."""
+    trabajo = os.path.join(directorio, TRABAJO)
+    shutil.rmtree(trabajo, ignore_errors=True)
+    os.makedirs(trabajo)
+    originales = {}
+    for nombre in os.listdir(directorio):
+        origen = os.path.join(directorio, nombre)
+        if not nombre.startswith(".") and os.path.isfile(origen):
+            # Copia, no enlace: algunos pasos anexan en el lugar
+            shutil.copy2(origen, os.path.join(trabajo, nombre))
+            originales[nombre] = _sha1(os.path.join(trabajo, nombre))
+    return trabajo, originales
+
+
+def _publicar(trabajo, directorio, estado, nodos, originales):
+    """Mueve a ``directorio`` las salidas de ``nodos`` que cambiaron, todas
+    bajo el bloqueo.
+
+    Las entradas no se publican, y una salida que cambió en ``directorio``
+    desde que se copió (``originales``) tampoco: no se pisa lo que otro
+    proceso publicó mientras corría el pipeline.
+    """
+    declarados = {archivo for nodo in nodos for archivo in nodo.salidas + nodo.modifica}
+    cambiados = [
+        nombre for nombre in sorted(declarados)
+        if os.path.isfile(os.path.join(trabajo, nombre))
+        and _sha1(os.path.join(trabajo, nombre)) != _sha1(os.path.join(directorio, nombre))
+    ]
+    with datos.bloqueo(directorio, exclusivo=True):
+        cambiados = [
+            nombre for nombre in cambiados
+            if _sha1(os.path.join(directorio, nombre)) == originales.get(nombre)
+        ]
+        for nombre in cambiados:
+            os.replace(os.path.join(trabajo, nombre), os.path.join(directorio, nombre))
+        _escribir_estado(estado, directorio)
+    shutil.rmtree(trabajo, ignore_errors=True)
+    return cambiados
+
+
+def ejecutar(directorio=None, parametros=None, forzar=(), hilos=None, nodos=NODOS, registro=print):
+    """Ejecuta los nodos desactualizados y publica el resultado.
+
+    Devuelve (nodos ejecutados, archivos publicados).
+    """
+    directorio = directorio or datos.DATA_DIR
+    parametros = {**PARAMETROS, **(parametros or {})}
+    estado = leer_estado(directorio)
+    trabajo, originales = _preparar_trabajo(directorio)
+    deps = dependencias(nodos)
+    por_nombre = {n.nombre: n for n in nodos}
+
+    pendientes, terminados, ejecutados = set(por_nombre), set(), []
+    en_curso = {}
+
+    def correr(nodo, razon):
+        inicio = time.perf_counter()
+        extra = nodo.ejecutar(Corrida(trabajo, parametros, estado["nodos"].get(nodo.nombre, {}))) or {}
+        return razon, extra, time.perf_counter() - inicio
+
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            while pendientes or en_curso:
+                listos = [n for n in pendientes if deps[n] <= terminados]
+                for nombre in sorted(listos):
+                    pendientes.discard(nombre)
+                    nodo = por_nombre[nombre]
+                    razon = "forzado" if nombre in forzar else motivo(nodo, estado, trabajo, parametros)
+                    if razon is None:
+                        terminados.add(nombre)
+                        continue
+                    en_curso[pool.submit(correr, nodo, razon)] = nodo
+                if not en_curso:
+                    if pendientes and not [n for n in pendientes if deps[n] <= terminados]:
+                        raise RuntimeError(f"Dependencias circulares entre {sorted(pendientes)}")
+                    continue
+                hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    nodo = en_curso.pop(futuro)
+                    razon, extra, segundos = futuro.result()
+                    _registrar(nodo, estado, trabajo, parametros, extra)
+                    terminados.add(nodo.nombre)
+                    ejecutados.append(nodo.nombre)
+                    registro(f"{nodo.nombre:<14} {segundos:7.2f}s  ({razon})")
+    except BaseException:
+        shutil.rmtree(trabajo, ignore_errors=True)
+        raise
+
+    publicados = _publicar(trabajo, directorio, estado, [por_nombre[n] for n in ejecutados], originales)
+    return ejecutados, publicados
+
+
+def plan(directorio=None, parametros=None, nodos=NODOS):
+    """Nodos desactualizados respecto del estado guardado (sin propagar)."""
+    directorio = directorio or datos.DATA_DIR
+    parametros = {**PARAMETROS, **(parametros or {})}
+    estado = leer_estado(directorio)
+    return {n.nombre: motivo(n, estado, directorio, parametros) for n in nodos}
+
+
+def adoptar(directorio=None, parametros=None, nodos=NODOS):
+    """Registra los archivos actuales como al día, sin ejecutar nada.
+
+    Sirve para empezar a usar el pipeline sobre archivos generados a mano.
+    """
+    directorio = directorio or datos.DATA_DIR
+    parametros = {**PARAMETROS, **(parametros or {})}
+    estado = leer_estado(directorio)
+    for nodo in nodos:
+        extra = {}
+        if nodo.nombre == "garch":
+            panel = datos.leer_rendimientos(
+                os.path.join(directorio, "rendimientos.csv"),
+                datos.leer_precios(os.path.join(directorio, "precios.csv")),
+            )
+            extra["por_activo"] = {
+                n: {"n": len(s), "hash": _huella_serie(s.to_numpy())} for n, s in panel.items()
+            }
+        _registrar(nodo, estado, directorio, parametros, extra)
+    _escribir_estado(estado, directorio)
+
+
+PARAMETROS = {
+    "procesos": None,
+    "precision": "float64",
+    "faltantes": "nan",
+    "reestimar_cada": actualizacion.REESTIMAR_CADA,
+    "umbral_deriva": actualizacion.UMBRAL_DERIVA,
+    "modelos": [garch.MODELO],
+    "criterio": modelos.CRITERIO,
+    "horizonte_pronostico": pronostico.HORIZONTE,
+    "nivel_var": pronostico.NIVEL,
+    "simular": False,
+    "trayectorias": pronostico.TRAYECTORIAS,
+    "dcc_a": correlacion.DCC_A,
+    "dcc_b": correlacion.DCC_B,
+    "rf": 0.0,
+    "kappa": aversion.KAPPA,
+    "horizonte": 1,
+    "replicas": bootstrap.REPLICAS,
+    "bloque": bootstrap.BLOQUE,
+    "esquema": "estacionario",
+    "nivel": bootstrap.NIVEL,
+    "semilla": bootstrap.SEMILLA,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstrucción incremental de data/")
+    parser.add_argument("--plan", action="store_true", help="solo muestra qué nodos están desactualizados")
+    parser.add_argument("--adoptar", action="store_true",
+                        help="registra los archivos actuales como al día, sin ejecutar")
+    parser.add_argument("--forzar", nargs="*", default=None, metavar="NODO",
+                        help="nodos a ejecutar aunque estén al día (sin nombres: todos)")
+    parser.add_argument("--hilos", type=int, default=None, help="nodos en paralelo")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--precision", choices=ingesta.PRECISIONES, default="float64")
+    parser.add_argument("--faltantes", choices=ingesta.FALTANTES, default="nan")
+    parser.add_argument("--reestimar-cada", type=int, default=actualizacion.REESTIMAR_CADA)
+    parser.add_argument("--umbral-deriva", type=float, default=actualizacion.UMBRAL_DERIVA)
+    parser.add_argument("--modelos", nargs="+", default=[garch.MODELO],
+                        choices=["todos", *modelos.ESPECIFICACIONES], metavar="MODELO",
+                        help="especificaciones de volatilidad a comparar por activo (todos: la grilla completa)")
+    parser.add_argument("--criterio", choices=modelos.CRITERIOS, default=modelos.CRITERIO)
+    parser.add_argument("--horizonte-pronostico", type=int, default=pronostico.HORIZONTE,
+                        help="días del pronóstico de volatilidad")
+    parser.add_argument("--nivel-var", type=float, default=pronostico.NIVEL, help="nivel del VaR y el ES")
+    parser.add_argument("--simular", action="store_true",
+                        help="VaR y ES por simulación para los activos con innovaciones t")
+    parser.add_argument("--trayectorias", type=int, default=pronostico.TRAYECTORIAS)
+    parser.add_argument("--dcc-a", type=float, default=correlacion.DCC_A, help="peso de z z' en el DCC")
+    parser.add_argument("--dcc-b", type=float, default=correlacion.DCC_B, help="persistencia del DCC")
+    parser.add_argument("--rf", type=float, default=0.0)
+    parser.add_argument("--kappa", type=float, default=aversion.KAPPA)
+    parser.add_argument("--horizonte", type=int, default=1)
+    parser.add_argument("--replicas", type=int, default=bootstrap.REPLICAS)
+    parser.add_argument("--bloque", type=float, default=bootstrap.BLOQUE)
+    parser.add_argument("--esquema", choices=bootstrap.ESQUEMAS, default="estacionario")
+    parser.add_argument("--nivel", type=float, default=bootstrap.NIVEL)
+    parser.add_argument("--semilla", type=int, default=bootstrap.SEMILLA)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    parametros = {k: getattr(args, k) for k in PARAMETROS}
+    parametros["modelos"] = modelos._especificaciones(args.modelos)
+    if args.adoptar:
+        adoptar(args.directorio, parametros)
+        print("Archivos actuales registrados como al día")
+        return
+    if args.plan:
+        for nombre, razon in plan(args.directorio, parametros).items():
+            print(f"{nombre:<14} {razon or 'al día'}")
+        return
+
+    forzar = set()
+    if args.forzar is not None:
+        forzar = set(args.forzar) or {n.nombre for n in NODOS}
+    ejecutados, publicados = ejecutar(args.directorio, parametros, forzar, args.hilos)
+    if not ejecutados:
+        print("Todo al día")
+    elif publicados:
+        print("Publicados:", ", ".join(publicados))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Pronóstico de la volatilidad condicional de 1 a 250 días, con VaR y ES.
+
+Parte de los parámetros y del último estado del filtro que guarda
+garch_parametros.csv (s2_T, e_T). Para GARCH y GJR-GARCH la varianza
+esperada h días adelante tiene forma cerrada,
+
+    s2_{T+1} = omega + (alpha + asimetria 1[e_T < 0]) e_T^2 + beta s2_T
+    s2_{T+h} = omega (1 - p^{h-1}) / (1 - p) + p^{h-1} s2_{T+1}
+
+con p la persistencia (alpha + beta + asimetria/2; con p = 1 el primer
+término es (h - 1) omega). Se evalúa como una sola operación sobre la
+matriz activos x horizontes, sin simular.
+
+De la varianza acumulada, sigma_acum_h = sqrt(s2_{T+1} + ... + s2_{T+h}),
+salen el VaR y el ES paramétricos del rendimiento log acumulado a h días,
+como pérdidas positivas al nivel ``nivel``:
+
+    VaR_h = -(h mu + q sigma_acum_h)      ES_h = -(h mu - c sigma_acum_h)
+
+con q el cuantil 1 - nivel de la innovación (normal o t de Student de
+varianza 1, según la especificación) y c la media de la cola. Con
+innovaciones t es una aproximación (la suma de h innovaciones t no es t);
+con ``simular`` esos activos se simulan, y los EGARCH, que no tienen forma
+cerrada, se simulan siempre. La simulación avanza todas las trayectorias
+de todos los activos a la vez, un horizonte por paso; sigma y sigma_acum
+salen de la media de s2 entre trayectorias, igual que en la forma cerrada,
+y las trayectorias dan solo los cuantiles del VaR y el ES. Los EGARCH-t con
+nu < NU_EGARCH_T se simulan con innovaciones normales (con colas t, E[s2]
+del EGARCH no existe); con nu por debajo de modelos.NU_MIN quedan en NaN.
+
+Escribe pronostico_GARCH.csv (Activo, Modelo, h, sigma, sigma_acum, VaR,
+ES, metodo); la página "Pronóstico de volatilidad" lo calcula en el momento
+desde garch_parametros.csv para el nivel que se elija.
+
+Uso:
+    python pronostico.py [--horizonte 250] [--nivel 0.99] [--simular]
+                         [--trayectorias 10000] [--directorio data]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import datos
+import garch
+import modelos
+
+HORIZONTE = 250
+NIVEL = 0.99
+TRAYECTORIAS = 10000
+SEMILLA = 2024
+
+# EGARCH-t con menos grados de libertad se simula con innovaciones normales
+NU_EGARCH_T = 4.0
+
+# Valores simulados por paso (activos x trayectorias) en cada lote
+LOTE = 2_000_000
+
+COLUMNAS = ["Activo", "Modelo", "h", "sigma", "sigma_acum", "VaR", "ES", "metodo"]
+
+
+def _parametros(df):
+    """Columnas de garch_parametros.csv como arreglos, sin las series de tasas."""
+    df = df[~df["Activo"].map(datos.clean_name).isin(datos.SERIES_TASA)]
+    modelo = df["modelo"] if "modelo" in df.columns else pd.Series(garch.MODELO, index=df.index)
+    modelo = modelo.where(modelo.notna(), garch.MODELO).astype(str)
+    columna = lambda c, defecto: (df[c].fillna(defecto) if c in df.columns
+                                  else pd.Series(defecto, index=df.index)).to_numpy(dtype=float)
+    return {
+        "Activo": df["Activo"].to_numpy(),
+        "Modelo": modelo.to_numpy(),
+        "mu": df["mu"].to_numpy(dtype=float),
+        "omega": df["omega"].to_numpy(dtype=float),
+        "alpha": df["alpha"].to_numpy(dtype=float),
+        "beta": df["beta"].to_numpy(dtype=float),
+        "asimetria": columna("asimetria", 0.0),
+        "nu": columna("nu", np.nan),
+        "s2": df["s2_ultima"].to_numpy(dtype=float),
+        "e": df["e_ultima"].to_numpy(dtype=float),
+    }
+
+
+# ============================================================
+# FORMA CERRADA
+# ============================================================
+
+def varianzas(omega, alpha, beta, asimetria, s2, e, horizonte=HORIZONTE):
+    """Matriz (activos x horizonte) de E[s2_{T+h}] para GARCH y GJR-GARCH."""
+    omega, alpha, beta, asimetria, s2, e = (
+        np.asarray(x, dtype=float)[:, None] for x in (omega, alpha, beta, asimetria, s2, e)
+    )
+    siguiente = omega + (alpha + asimetria * (e < 0)) * e ** 2 + beta * s2
+    p = alpha + beta + asimetria / 2
+    k = np.arange(horizonte)[None, :]
+    pk = p ** k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        geometrica = np.where(np.isclose(p, 1.0), k, (1 - pk) / (1 - p))
+    return omega * geometrica + pk * siguiente
+
+
+def factores(nu, nivel=NIVEL):
+    """(q, c) por activo: cuantil 1 - nivel y media de la cola de la innovación.
+
+    Con ``nu`` NaN la innovación es normal; si no, t de Student escalada a
+    varianza 1.
+    """
+    nu = np.asarray(nu, dtype=float)
+    a = 1 - nivel
+    q = np.full(nu.shape, stats.norm.ppf(a))
+    c = np.full(nu.shape, stats.norm.pdf(stats.norm.ppf(a)) / a)
+    t = np.isfinite(nu) & (nu > 2)
+    if t.any():
+        v = nu[t]
+        x = stats.t.ppf(a, v)
+        escala = np.sqrt((v - 2) / v)
+        q[t] = x * escala
+        c[t] = escala * stats.t.pdf(x, v) / a * (v + x ** 2) / (v - 1)
+    return q, c
+
+
+def _riesgo(mu, S2, q, c):
+    """sigma, sigma_acum, VaR y ES a partir de la matriz de varianzas."""
+    h = np.arange(1, S2.shape[1] + 1)[None, :]
+    acum = np.sqrt(np.cumsum(S2, axis=1))
+    media = mu[:, None] * h
+    return np.sqrt(S2), acum, -(media + q[:, None] * acum), -(media - c[:, None] * acum)
+
+
+# ============================================================
+# SIMULACIÓN
+# ============================================================
+
+def simular(p, horizonte=HORIZONTE, nivel=NIVEL, trayectorias=TRAYECTORIAS, semilla=SEMILLA):
+    """sigma, sigma_acum, VaR y ES por simulación (activos x horizonte).
+
+    ``p`` es el dict de arreglos de _parametros (ya filtrado a los activos a
+    simular). Las trayectorias de todos los activos avanzan juntas: cada
+    paso es una operación sobre la matriz activos x trayectorias.
+    """
+    rng = np.random.default_rng(semilla)
+    n = len(p["mu"])
+    col = lambda x: np.asarray(x, dtype=float)[:, None]
+    mu, omega, alpha, beta, asimetria = (col(p[k]) for k in ("mu", "omega", "alpha", "beta", "asimetria"))
+    nu = col(p["nu"])
+    egarch = col([modelos.especificacion(m)[0] == "egarch" for m in p["Modelo"]]).astype(bool)
+    t = np.isfinite(nu) & (nu > 2)
+    nu_t = np.where(t, nu, 30.0)
+
+    # Primer paso (determinista) desde el último estado filtrado
+    s2 = np.array([
+        modelos.siguiente(m, w, a, b, g, s, e)
+        for m, w, a, b, g, s, e in zip(p["Modelo"], p["omega"], p["alpha"], p["beta"],
+                                       p["asimetria"], p["s2"], p["e"])
+    ], dtype=float)[:, None] * np.ones((1, trayectorias))
+    acumulado = np.zeros((n, trayectorias))
+    S2, var, es = (np.empty((n, horizonte)) for _ in range(3))
+    a = 1 - nivel
+    for h in range(horizonte):
+        z = np.where(t, rng.standard_t(nu_t, size=(n, trayectorias)) * np.sqrt((nu_t - 2) / nu_t),
+                     rng.standard_normal((n, trayectorias)))
+        e = np.sqrt(s2) * z
+        acumulado += mu + e
+        S2[:, h] = s2.mean(axis=1)
+        corte = np.quantile(acumulado, a, axis=1)
+        var[:, h] = -corte
+        es[:, h] = -np.where(acumulado <= corte[:, None], acumulado, 0).sum(axis=1) / np.maximum(
+            (acumulado <= corte[:, None]).sum(axis=1), 1)
+        with np.errstate(over="ignore"):
+            lineal = omega + (alpha + asimetria * (e < 0)) * e ** 2 + beta * s2
+            log_s2 = (omega + alpha * (np.abs(z) - np.sqrt(2 / np.pi)) + asimetria * z
+                      + beta * np.log(s2))
+            s2 = np.where(egarch, np.exp(np.minimum(log_s2, 50.0)), lineal)
+    # sigma y sigma_acum salen de E[s2_{T+h}] como en la forma cerrada; las
+    # trayectorias solo dan los cuantiles del VaR y el ES
+    return np.sqrt(S2), np.sqrt(np.cumsum(S2, axis=1)), var, es
+
+
+# ============================================================
+# TODOS LOS ACTIVOS
+# ============================================================
+
+def calcular(parametros, horizonte=HORIZONTE, nivel=NIVEL, simular_t=False,
+             trayectorias=TRAYECTORIAS, semilla=SEMILLA):
+    """Tabla larga del pronóstico a partir de garch_parametros.csv (DataFrame)."""
+    p = _parametros(parametros)
+    n = len(p["mu"])
+    if n == 0:
+        return pd.DataFrame(columns=COLUMNAS)
+    recursion = np.array([modelos.especificacion(m)[0] for m in p["Modelo"]])
+    por_simular = (recursion == "egarch") | (simular_t & np.isfinite(p["nu"]))
+    # En EGARCH-t E[exp(alpha |z|)] no existe: con colas pesadas la media de
+    # s2 simulada no se estabiliza. Con nu < NU_EGARCH_T se simula con
+    # innovaciones normales; por debajo de modelos.NU_MIN el ajuste es
+    # degenerado (archivos anteriores a esa cota) y no se pronostica
+    egarch_t = (recursion == "egarch") & np.isfinite(p["nu"])
+    degenerado = egarch_t & (p["nu"] < modelos.NU_MIN)
+    a_normal = egarch_t & ~degenerado & (p["nu"] < NU_EGARCH_T)
+    p["nu"] = np.where(a_normal, np.nan, p["nu"])
+    por_simular &= ~degenerado
+
+    q, c = factores(p["nu"], nivel)
+    S2 = varianzas(p["omega"], p["alpha"], p["beta"], p["asimetria"], p["s2"], p["e"], horizonte)
+    # En las filas EGARCH la forma cerrada no tiene sentido (omega puede ser
+    # negativo); se descartan y se reemplazan por la simulación
+    S2[recursion == "egarch"] = np.nan
+    with np.errstate(invalid="ignore"):
+        sigma, acum, var, es = _riesgo(p["mu"], S2, q, c)
+    # Por lotes de activos: la simulación guarda activos x trayectorias por paso
+    simulados = np.flatnonzero(por_simular)
+    lote = max(1, LOTE // trayectorias)
+    for i in range(0, len(simulados), lote):
+        idx = simulados[i:i + lote]
+        resultado = simular({k: v[idx] for k, v in p.items()}, horizonte, nivel, trayectorias, [semilla, i])
+        for destino, origen in zip((sigma, acum, var, es), resultado):
+            destino[idx] = origen
+
+    return pd.DataFrame({
+        "Activo": np.repeat(p["Activo"], horizonte),
+        "Modelo": np.repeat(p["Modelo"], horizonte),
+        "h": np.tile(np.arange(1, horizonte + 1), n),
+        "sigma": sigma.ravel(),
+        "sigma_acum": acum.ravel(),
+        "VaR": var.ravel(),
+        "ES": es.ravel(),
+        "metodo": np.repeat(np.select([degenerado, a_normal, por_simular],
+                                      ["sin pronóstico", "simulación normal", "simulación"], "cerrada"),
+                            horizonte),
+    })
+
+
+def escribir(directorio=None, **opciones):
+    directorio = directorio or datos.DATA_DIR
+    parametros = pd.read_csv(os.path.join(directorio, "garch_parametros.csv"), float_precision="round_trip")
+    parametros["Activo"] = parametros["Activo"].map(datos.nombre_serie)
+    tabla = calcular(parametros, **opciones)
+    datos.escribir_csv(tabla, "pronostico_GARCH.csv", directorio)
+    return tabla
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pronóstico de volatilidad GARCH con VaR y ES")
+    parser.add_argument("--horizonte", type=int, default=HORIZONTE, help="días hacia adelante")
+    parser.add_argument("--nivel", type=float, default=NIVEL, help="nivel de confianza del VaR y el ES")
+    parser.add_argument("--simular", action="store_true",
+                        help="simula también los activos con innovaciones t de Student")
+    parser.add_argument("--trayectorias", type=int, default=TRAYECTORIAS)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    tabla = escribir(args.directorio, horizonte=args.horizonte, nivel=args.nivel, simular_t=args.simular,
+                     trayectorias=args.trayectorias, semilla=args.semilla)
+    resumen = tabla[tabla["h"].isin([1, 10, args.horizonte])].pivot(index="Activo", columns="h", values="VaR")
+    print(f"VaR {args.nivel:.1%} del rendimiento acumulado (h = días)")
+    print(resumen.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
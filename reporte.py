@@ -0,0 +1,321 @@
+"""
+Reporte estático del tablero: figuras y tablas de todas las páginas.
+
+Ejecuta app.py con el arnés de pruebas de Streamlit (AppTest, como
+perfil_paginas.py), sin servidor ni navegador, así que las figuras son las
+mismas que construye el tablero. Se exporta
+
+    cada página de paginas.PAGINAS       sus figuras, sus tablas y sus KPIs
+    "Volatilidad histórica vs dinámica"  una figura por activo
+
+a ``<salida>/<página>/``: las figuras en HTML (plotly.js se escribe una sola
+vez por carpeta), PNG o PDF, y las tablas en CSV. Las tareas se reparten
+entre procesos; cada proceso conserva su AppTest, de modo que los archivos
+se leen y las cachés de datos.py se llenan una vez por proceso, y la figura
+de cada activo es una ejecución tibia de la página.
+
+Cada tarea tiene una huella: SHA-1 de los archivos de ``data/`` que declara
+la página (el mismo hash de datos.version), del código de app.py y de los
+módulos de la página, de la selección y de los formatos. Se guarda en
+``<salida>/manifiesto.json``; en la corrida siguiente las tareas con la
+misma huella cuyos archivos siguen ahí no se vuelven a exportar.
+
+PNG y PDF necesitan kaleido (``pip install kaleido``).
+
+Uso:
+    python reporte.py [--salida reporte] [--formatos html csv png pdf]
+                      [--paginas ...] [--sin-activos] [--procesos 8]
+                      [--completo] [--directorio data]
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import datos
+import paginas
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(RAIZ, "app.py")
+
+SALIDA = "reporte"
+MANIFIESTO = "manifiesto.json"
+
+FORMATOS = ("html", "png", "pdf", "csv")
+FORMATOS_PREDETERMINADOS = ("html", "csv")
+
+# Página con una figura por activo y el selector que la controla
+PAGINA_ACTIVOS = "Volatilidad histórica vs dinámica"
+SELECTOR_ACTIVO = "Seleccione una acción:"
+
+# Figuras por activo en cada tarea enviada a un proceso
+LOTE = 25
+
+ANCHO = 1400
+ALTO = 650
+
+
+def carpeta(texto):
+    """Nombre de archivo seguro (sin tildes ni espacios) para una página o activo."""
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", texto.lower()).strip("_") or "sin_nombre"
+
+
+# ============================================================
+# HUELLAS
+# ============================================================
+
+def _sha1(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def versiones(directorio, pagina):
+    """Hash del contenido de cada archivo de la página (None si falta)."""
+    return {n: _sha1(os.path.join(directorio, n)) for n in paginas.PAGINAS[pagina].datos}
+
+
+def codigo(pagina):
+    """Hash de app.py y de los módulos del repositorio que importa la página."""
+    archivos = [APP, os.path.join(RAIZ, "figuras.py"), os.path.join(RAIZ, "datos.py")]
+    archivos += [os.path.join(RAIZ, f"{lib}.py") for lib in paginas.PAGINAS[pagina].librerias]
+    return {os.path.basename(a): _sha1(a) for a in archivos if os.path.exists(a)}
+
+
+def huella(pagina, activo, formatos, versiones_pagina, codigo_pagina):
+    contenido = json.dumps([pagina, activo, sorted(formatos), versiones_pagina, codigo_pagina], sort_keys=True)
+    return hashlib.sha1(contenido.encode()).hexdigest()
+
+
+def leer_manifiesto(salida):
+    path = os.path.join(salida, MANIFIESTO)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def escribir_manifiesto(manifiesto, salida):
+    destino = os.path.join(salida, MANIFIESTO)
+    with open(destino + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(destino + ".tmp", destino)
+
+
+def vigente(manifiesto, salida, clave, h):
+    """La tarea ya se exportó con la misma huella y sus archivos siguen ahí."""
+    previa = manifiesto.get(clave)
+    return (
+        previa is not None and previa["huella"] == h
+        and all(os.path.exists(os.path.join(salida, a)) for a in previa["archivos"])
+    )
+
+
+# ============================================================
+# TAREAS
+# ============================================================
+
+def activos(directorio):
+    """Activos de la página por activo, en el orden de datos.por_activo."""
+    import pandas as pd
+
+    path = os.path.join(directorio, "vol_hist_vs_garch.csv")
+    if not os.path.exists(path):
+        return []
+    nombres = datos.limpiar_activos(pd.read_csv(path, usecols=["Activo"])["Activo"])
+    return sorted(set(nombres.dropna()) - set(datos.EXCLUIR_MACRO))
+
+
+def tareas(directorio, lista_paginas, formatos, por_activo=True):
+    """dict clave -> (página, activo o None, huella)."""
+    salida = {}
+    for pagina in lista_paginas:
+        v, c = versiones(directorio, pagina), codigo(pagina)
+        salida[pagina] = (pagina, None, huella(pagina, None, formatos, v, c))
+        if por_activo and pagina == PAGINA_ACTIVOS:
+            for activo in activos(directorio):
+                salida[f"{pagina}/{activo}"] = (pagina, activo, huella(pagina, activo, formatos, v, c))
+    return salida
+
+
+def lotes(pendientes, lote=LOTE):
+    """Agrupa las tareas por página; las figuras por activo, de a ``lote``."""
+    por_pagina = {}
+    for clave, (pagina, activo, _) in pendientes.items():
+        por_pagina.setdefault((pagina, activo is not None), []).append((clave, activo))
+    salida = []
+    for grupo in por_pagina.values():
+        salida += [grupo[i:i + lote] for i in range(0, len(grupo), lote)]
+    return salida
+
+
+# ============================================================
+# EXPORTACIÓN (en cada proceso)
+# ============================================================
+
+# AppTest por página, reutilizado entre tareas del mismo proceso
+_apps = {}
+
+
+def _app(pagina):
+    from streamlit.testing.v1 import AppTest
+
+    if pagina not in _apps:
+        at = AppTest.from_file(APP, default_timeout=600)
+        at.session_state["pagina"] = pagina
+        at.run()
+        _apps[pagina] = at
+    return _apps[pagina]
+
+
+def _figuras(at, carpeta_destino, base, formatos):
+    import plotly.io as pio
+
+    archivos = []
+    for k, grafico in enumerate(at.get("plotly_chart"), start=1):
+        fig = pio.from_json(grafico.proto.spec, skip_invalid=True)
+        nombre = os.path.join(carpeta_destino, f"{base}_{k}" if base else f"figura_{k}")
+        if "html" in formatos:
+            fig.write_html(nombre + ".html", include_plotlyjs="directory", full_html=True)
+            archivos.append(nombre + ".html")
+        for formato in ("png", "pdf"):
+            if formato in formatos:
+                fig.write_image(f"{nombre}.{formato}", format=formato, width=ANCHO, height=ALTO)
+                archivos.append(f"{nombre}.{formato}")
+    return archivos
+
+
+def _tablas(at, carpeta_destino):
+    import pandas as pd
+
+    archivos = []
+    for k, tabla in enumerate([*at.dataframe, *at.table], start=1):
+        nombre = os.path.join(carpeta_destino, f"tabla_{k}.csv")
+        tabla.value.to_csv(nombre, index=not isinstance(tabla.value.index, pd.RangeIndex))
+        archivos.append(nombre)
+    if len(at.metric):
+        nombre = os.path.join(carpeta_destino, "indicadores.csv")
+        pd.DataFrame(
+            [{"Indicador": m.label, "Valor": m.value, "Cambio": m.delta} for m in at.metric]
+        ).to_csv(nombre, index=False)
+        archivos.append(nombre)
+    return archivos
+
+
+def _error(at):
+    if at.exception:
+        return at.exception[0].value
+    if at.error:
+        return at.error[0].value
+    return None
+
+
+def exportar(lote, salida, formatos):
+    """Exporta un lote de tareas de una página; devuelve {clave: (archivos, error)}."""
+    resultados = {}
+    for clave, activo in lote:
+        pagina = clave.split("/")[0]
+        try:
+            destino = os.path.join(salida, carpeta(pagina))
+            if activo is None:
+                # La página tal como se abre: sin selecciones de tareas anteriores
+                _apps.pop(pagina, None)
+            at = _app(pagina)
+            if activo is not None:
+                selector = next(s for s in at.selectbox if s.label == SELECTOR_ACTIVO)
+                selector.set_value(activo).run()
+                destino = os.path.join(destino, "activos")
+            error = _error(at)
+            if error is not None:
+                resultados[clave] = ([], error)
+                continue
+            os.makedirs(destino, exist_ok=True)
+            archivos = _figuras(at, destino, carpeta(activo) if activo else None, formatos)
+            if activo is None and "csv" in formatos:
+                archivos += _tablas(at, destino)
+            resultados[clave] = ([os.path.relpath(a, salida) for a in archivos], None)
+        except Exception as exc:
+            resultados[clave] = ([], f"{type(exc).__name__}: {exc}")
+    return resultados
+
+
+# ============================================================
+# REPORTE COMPLETO
+# ============================================================
+
+def generar(directorio=None, salida=SALIDA, formatos=FORMATOS_PREDETERMINADOS, lista_paginas=None,
+            por_activo=True, procesos=None, completo=False):
+    """Exporta lo que cambió; devuelve (exportadas, vigentes, errores)."""
+    directorio = os.path.abspath(directorio or datos.DATA_DIR)
+    salida = os.path.abspath(salida)
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = {} if completo else leer_manifiesto(salida)
+    todas = tareas(directorio, lista_paginas or list(paginas.PAGINAS), formatos, por_activo)
+    pendientes = {k: t for k, t in todas.items() if not vigente(manifiesto, salida, k, t[2])}
+    grupos = lotes(pendientes)
+
+    exportadas, errores = [], {}
+    if grupos:
+        # Los procesos leen los datos de ``directorio`` (datos.DATA_DIR se
+        # fija al importar datos.py); spawn para no heredar el estado del padre
+        os.environ["TABLERO_DATOS"] = directorio
+        procesos = min(procesos or os.cpu_count() or 1, len(grupos))
+        # AppTest ejecuta app.py como __main__ dentro de cada proceso: la
+        # función se envía por el nombre del módulo, no como __main__.exportar
+        import reporte
+
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = [pool.submit(reporte.exportar, g, salida, tuple(formatos)) for g in grupos]
+            for futuro in as_completed(futuros):
+                for clave, (archivos, error) in futuro.result().items():
+                    if error is not None:
+                        errores[clave] = error
+                        manifiesto.pop(clave, None)
+                        continue
+                    manifiesto[clave] = {"huella": pendientes[clave][2], "archivos": archivos}
+                    exportadas.append(clave)
+    escribir_manifiesto(manifiesto, salida)
+    return exportadas, len(todas) - len(pendientes), errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta las figuras y tablas del tablero sin servidor")
+    parser.add_argument("--salida", default=SALIDA, help="carpeta del reporte")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=list(FORMATOS_PREDETERMINADOS))
+    parser.add_argument("--paginas", nargs="*", default=list(paginas.PAGINAS))
+    parser.add_argument("--sin-activos", action="store_true",
+                        help=f"no exporta la figura de cada activo de \"{PAGINA_ACTIVOS}\"")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--completo", action="store_true", help="exporta todo aunque no haya cambiado")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    desconocidas = set(args.paginas) - set(paginas.PAGINAS)
+    if desconocidas:
+        parser.error(f"Páginas desconocidas: {', '.join(sorted(desconocidas))}")
+    if {"png", "pdf"} & set(args.formatos) and importlib.util.find_spec("kaleido") is None:
+        parser.error("PNG y PDF necesitan kaleido (pip install kaleido)")
+
+    t0 = time.perf_counter()
+    exportadas, vigentes, errores = generar(
+        args.directorio, args.salida, args.formatos, args.paginas, not args.sin_activos,
+        args.procesos, args.completo,
+    )
+    print(f"{len(exportadas)} exportadas, {vigentes} sin cambios, {len(errores)} con error "
+          f"en {time.perf_counter() - t0:.1f} s -> {os.path.abspath(args.salida)}")
+    for clave, error in sorted(errores.items()):
+        print(f"  {clave}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Superficie de sensibilidad de los gammas a los supuestos del cálculo.
+
+gamma_CRRA, gamma_FTP y gamma_GARCH (aversion.py) dependen de la tasa libre
+de riesgo, del horizonte y de la muestra. Aquí se evalúan sobre una grilla
+
+    metodo x tasa x ventana x horizonte x activo
+
+en una sola llamada a aversion.gammas: la tasa, la ventana y el horizonte
+son dimensiones iniciales de la matriz de rendimientos y la búsqueda de la
+raíz avanza todas las combinaciones a la vez (por lotes de activos, para
+acotar la memoria).
+
+    tasa       "Cero" o una de las series de tasas de precios.csv (TPM, IBR,
+               DTB3, en % anual), como tasa diaria log(1 + x/100) / 252
+               promediada en las fechas de la ventana de cada activo
+    ventana    últimas w observaciones de cada activo (todas, si tiene menos)
+    horizonte  días, con la regla de raíz de h de aversion.py
+
+gamma_GARCH usa el promedio de sigma_t (garch_timeseries.csv) en la misma
+ventana. El resultado (``data/sensibilidad_gamma.npz``) guarda el gamma en
+float32 y el estado de aversion.py en int8, con los ejes; la página
+"Sensibilidad de gamma" responde a cada cambio indexando el arreglo e
+interpolando entre los puntos de la grilla (lineal en la ventana y en
+log h), sin volver a estimar; no se interpola a través de puntos con
+estado distinto de 0.
+
+Uso:
+    python sensibilidad.py [--kappa 1] [--directorio data]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import aversion
+import datos
+
+ARCHIVO = "sensibilidad_gamma.npz"
+
+METODOS = ("CRRA", "FTP", "GARCH")
+TASAS = ("Cero", *datos.SERIES_TASA)
+VENTANAS = (250, 500, 750, 1000, 1250)
+HORIZONTES = (1, 2, 5, 10, 20, 60, 120, 250)
+
+# Días hábiles por año para pasar las tasas anuales a diarias
+DIAS_ANO = 252
+
+# Elementos (tasas x ventanas x horizontes x activos x observaciones) por lote
+LOTE = 4_000_000
+
+
+# ============================================================
+# ENTRADAS
+# ============================================================
+
+def _a_la_derecha(series, largo):
+    """Últimas ``largo`` observaciones de cada serie, alineadas a la derecha.
+
+    Devuelve (X, F): valores y fechas (activos x largo), NaN / NaT al inicio
+    de las series más cortas.
+    """
+    X = np.full((len(series), largo), np.nan)
+    F = np.full((len(series), largo), np.datetime64("NaT"), dtype="datetime64[ns]")
+    for i, s in enumerate(series):
+        if s is None:
+            continue
+        cola = s.iloc[-largo:]
+        X[i, largo - len(cola):] = cola.to_numpy(dtype=float)
+        F[i, largo - len(cola):] = cola.index.to_numpy(dtype="datetime64[ns]")
+    return X, F
+
+
+def _tasa_media(serie, desde, hasta):
+    """Promedio de la tasa diaria en [desde, hasta] (arreglos de fechas)."""
+    fechas = serie.index.to_numpy(dtype="datetime64[ns]")
+    diaria = np.log1p(serie.to_numpy(dtype=float) / 100) / DIAS_ANO
+    acumulada = np.concatenate(([0.0], np.cumsum(diaria)))
+    i = np.searchsorted(fechas, desde, side="left")
+    j = np.searchsorted(fechas, hasta, side="right")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = (acumulada[j] - acumulada[i]) / (j - i)
+    return np.where(j > i, media, np.nan)
+
+
+def tasas(precios, F, ventanas=VENTANAS, nombres_tasa=TASAS):
+    """rf diario (tasas x ventanas x activos) en la ventana de cada activo."""
+    largo = F.shape[1]
+    por_nombre = {datos.clean_name(n): s.dropna() for n, s in precios.items()}
+    hasta = F[:, -1]
+    rf = np.zeros((len(nombres_tasa), len(ventanas), F.shape[0]))
+    for k, w in enumerate(ventanas):
+        # Primera fecha de la ventana: la más antigua que existe entre las w últimas
+        desde = np.nanmin(np.where(np.arange(largo) >= largo - w, F, np.datetime64("NaT")), axis=1)
+        for p, nombre in enumerate(nombres_tasa):
+            if nombre == "Cero":
+                continue
+            serie = por_nombre.get(nombre)
+            rf[p, k] = np.nan if serie is None else _tasa_media(serie, desde, hasta)
+    return rf
+
+
+# ============================================================
+# GRILLA
+# ============================================================
+
+def _estado(g, e, invalidos, codigo):
+    return np.where(invalidos, np.nan, g), np.where(invalidos, codigo, e)
+
+
+def calcular(panel, precios, sigmas=None, kappa=aversion.KAPPA, ventanas=VENTANAS,
+             horizontes=HORIZONTES, nombres_tasa=TASAS):
+    """Arreglos de la superficie para los activos del panel (sin series de tasas).
+
+    ``sigmas`` es un dict nombre limpio -> Serie de sigma_t alineada con los
+    rendimientos del activo (garch_timeseries.csv); sin él no hay GARCH.
+    Devuelve un dict con gamma y estado (metodos x tasas x ventanas x
+    horizontes x activos) y los ejes.
+    """
+    nombres = [n for n in panel if datos.clean_name(n) not in datos.SERIES_TASA]
+    largo = max(ventanas)
+    X, F = _a_la_derecha([panel[n] for n in nombres], largo)
+    S = np.full_like(X, np.nan)
+    if sigmas is not None:
+        series = [sigmas.get(datos.clean_name(n)) for n in nombres]
+        series = [s if s is not None and len(s) == len(panel[n]) else None for s, n in zip(series, nombres)]
+        S, _ = _a_la_derecha(series, largo)
+
+    P, V, H, N = len(nombres_tasa), len(ventanas), len(horizontes), len(nombres)
+    rf = tasas(precios, F, ventanas, nombres_tasa)
+    en_ventana = np.arange(largo)[None, :] >= largo - np.asarray(ventanas)[:, None]
+    gamma = np.full((len(METODOS), P, V, H, N), np.nan, dtype=np.float32)
+    estado = np.zeros(gamma.shape, dtype=np.int8)
+
+    h = np.asarray(horizontes, dtype=float)[None, None, :, None]
+    lote = max(1, LOTE // (P * V * H * largo))
+    for i in range(0, N, lote):
+        idx = slice(i, i + lote)
+        # (ventanas x activos x obs) con NaN fuera de la ventana
+        Xv = np.where(en_ventana[:, None, :], X[None, idx], np.nan)
+        with np.errstate(invalid="ignore"):
+            sigma = np.nanmean(np.where(en_ventana[:, None, :], S[None, idx], np.nan), axis=-1)
+        n_obs = (~np.isnan(Xv)).sum(axis=-1)
+        # Dimensiones iniciales: tasa x ventana x horizonte
+        Xg = np.broadcast_to(Xv[None, :, None], (P, V, H) + Xv.shape[1:])
+        rf_g = rf[:, :, None, idx]
+        # Con h y gamma grandes exp((1 - gamma) r) desborda: esos puntos quedan en la cota
+        with np.errstate(over="ignore"):
+            res = aversion.gammas(Xg, sigma[None, :, None], np.nan_to_num(rf_g), h, kappa)
+        corta = np.broadcast_to((n_obs < aversion.MIN_OBS)[None, :, None], (P, V, H, n_obs.shape[1]))
+        sin_tasa = np.broadcast_to(np.isnan(rf_g), corta.shape)
+        for m, metodo in enumerate(METODOS):
+            g, e = res[metodo]
+            if metodo == "GARCH":
+                g, e = _estado(g, e, np.broadcast_to(np.isnan(sigma)[None, :, None], corta.shape),
+                               aversion.SIN_VOLATILIDAD)
+            g, e = _estado(g, e, sin_tasa, aversion.SIN_TASA)
+            g, e = _estado(g, e, corta, aversion.DATOS_INSUFICIENTES)
+            gamma[m, :, :, :, idx], estado[m, :, :, :, idx] = g, e
+
+    return {
+        "gamma": gamma,
+        "estado": estado,
+        "metodos": np.array(METODOS),
+        "tasas": np.array(nombres_tasa),
+        "ventanas": np.array(ventanas),
+        "horizontes": np.array(horizontes),
+        "activos": np.array([datos.clean_name(n) for n in nombres]),
+        "kappa": np.float64(kappa),
+    }
+
+
+# ============================================================
+# CONSULTA
+# ============================================================
+
+def _pesos(eje, valor):
+    """Índices vecinos y peso del superior para interpolar ``valor`` en ``eje``."""
+    eje = np.asarray(eje, dtype=float)
+    valor = float(np.clip(valor, eje[0], eje[-1]))
+    j = int(np.clip(np.searchsorted(eje, valor, side="right"), 1, len(eje) - 1))
+    i = j - 1
+    return i, j, (valor - eje[i]) / (eje[j] - eje[i])
+
+
+def consultar(sup, metodo, tasa, ventana, horizonte):
+    """Gamma por activo en (ventana, horizonte), interpolando en la grilla.
+
+    Lineal en la ventana y en log h entre los cuatro puntos vecinos; sin
+    estimar nada. Es NaN para los activos con estado distinto de 0 (gamma en
+    una cota de búsqueda, sin datos) en alguno de los vecinos con peso.
+    """
+    m, p = list(sup["metodos"]).index(metodo), list(sup["tasas"]).index(tasa)
+    v0, v1, pv = _pesos(sup["ventanas"], ventana)
+    h0, h1, ph = _pesos(np.log(sup["horizontes"]), np.log(horizonte))
+    g = sup["gamma"][m, p].astype(float)
+    gamma = ((1 - pv) * ((1 - ph) * g[v0, h0] + ph * g[v0, h1])
+             + pv * ((1 - ph) * g[v1, h0] + ph * g[v1, h1]))
+    estado = sup["estado"][m, p]
+    vecinos = [(v, h) for v, peso_v in ((v0, 1 - pv), (v1, pv)) if peso_v > 0
+               for h, peso_h in ((h0, 1 - ph), (h1, ph)) if peso_h > 0]
+    invalido = np.any([estado[v, h] != 0 for v, h in vecinos], axis=0)
+    return np.where(invalido, np.nan, gamma)
+
+
+def superficie(sup, metodo, tasa, activo):
+    """Matriz ventanas x horizontes de un activo (los puntos de la grilla)."""
+    m = list(sup["metodos"]).index(metodo)
+    return sup["gamma"][m, list(sup["tasas"]).index(tasa), :, :, list(sup["activos"]).index(activo)]
+
+
+# ============================================================
+# ARCHIVO
+# ============================================================
+
+def construir(directorio=None, kappa=aversion.KAPPA):
+    directorio = directorio or datos.DATA_DIR
+    precios = datos.leer_precios(os.path.join(directorio, "precios.csv"))
+    panel = datos.leer_rendimientos(os.path.join(directorio, "rendimientos.csv"), precios)
+    path_ts = os.path.join(directorio, "garch_timeseries.csv")
+    sigmas = None
+    if os.path.exists(path_ts):
+        ts = pd.read_csv(path_ts, usecols=["Fecha", "Activo", "sigma_t"])
+        ts["Fecha"] = pd.to_datetime(ts["Fecha"], format="%Y-%m-%d")
+        sigmas = {datos.clean_name(a): g.set_index("Fecha")["sigma_t"] for a, g in ts.groupby("Activo", sort=False)}
+    sup = calcular(panel, precios, sigmas, kappa)
+
+    destino = os.path.join(directorio, ARCHIVO)
+    with open(destino + ".tmp", "wb") as f:
+        np.savez(f, **sup)
+    os.replace(destino + ".tmp", destino)
+    return sup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Superficie de sensibilidad de los gammas")
+    parser.add_argument("--kappa", type=float, default=aversion.KAPPA, help="parámetro de forma FTP")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    sup = construir(args.directorio, args.kappa)
+    print(f"gamma {sup['gamma'].shape} = {' x '.join(['metodos', 'tasas', 'ventanas', 'horizontes', 'activos'])}")
+    base = consultar(sup, "CRRA", "Cero", VENTANAS[-1], 1)
+    print(pd.Series(base, index=sup["activos"], name="gamma_CRRA (rf 0, h 1)").round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Datos sintéticos con el mismo formato que ``data/``.
+
+Genera precios.csv para N activos x T días hábiles (más las cuatro series
+macro de EXCLUIR_MACRO) y construye el resto de archivos con pipeline.py,
+así los esquemas son exactamente los que produce la cadena real. Cada
+activo sigue un GARCH(1,1) con parámetros al azar, empieza en una fecha al
+azar y le faltan algunos días sueltos, como pasa con los calendarios de los
+activos reales.
+
+Sirve para medir el tablero con universos más grandes que el actual
+(perfil_paginas.py).
+
+Uso:
+    python sintetico.py --activos 50 --dias 2500 --directorio /tmp/sintetico
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+import pipeline
+
+SEMILLA = 2024
+FIN = "2025-10-21"
+
+# Fracción de días sin precio en cada activo
+FALTANTES = 0.02
+
+# Réplicas del bootstrap: basta con que los archivos tengan el formato
+REPLICAS = 100
+
+
+def _garch(rng, dias):
+    """Rendimientos log de un GARCH(1,1) con parámetros al azar."""
+    alpha = rng.uniform(0.03, 0.15)
+    beta = rng.uniform(0.80, 0.97 - alpha)
+    varianza = rng.uniform(1e-4, 6e-4)
+    omega = varianza * (1 - alpha - beta)
+    mu = rng.normal(3e-4, 3e-4)
+    z = rng.standard_normal(dias)
+    r = np.empty(dias)
+    s2 = varianza
+    for t in range(dias):
+        r[t] = mu + np.sqrt(s2) * z[t]
+        s2 = omega + alpha * (r[t] - mu) ** 2 + beta * s2
+    return r
+
+
+def _tasa(rng, dias, nivel):
+    """Tasa de interés en escalones (cambia pocas veces, como TPM e IBR)."""
+    saltos = rng.random(dias) < 0.01
+    return np.maximum(nivel + np.cumsum(np.where(saltos, rng.normal(0, 0.25, dias), 0.0)), 0.05)
+
+
+def precios(activos, dias, semilla=SEMILLA):
+    """dict nombre -> Serie de precios con el calendario propio del activo."""
+    rng = np.random.default_rng(semilla)
+    calendario = pd.bdate_range(end=FIN, periods=dias)
+    series = {
+        "TRM": pd.Series(np.round(4000 * np.exp(np.cumsum(rng.normal(0, 0.006, dias)))), calendario),
+        "TPM": pd.Series(np.round(_tasa(rng, dias, 9.0), 2), calendario),
+        "IBR": pd.Series(np.round(_tasa(rng, dias, 9.0), 3), calendario),
+        "DTB3": pd.Series(np.round(_tasa(rng, dias, 3.0), 2), calendario),
+    }
+    for i in range(activos):
+        # Algunos activos empiezan más tarde; ninguno con menos de 1/4 del período
+        inicio = int(rng.integers(0, dias // 4)) if rng.random() < 0.3 else 0
+        n = dias - inicio
+        valores = rng.uniform(1e3, 5e4) * np.exp(np.cumsum(_garch(rng, n)))
+        dias_activo = calendario[inicio:]
+        presentes = rng.random(n) >= FALTANTES
+        presentes[[0, -1]] = True
+        nombre = f"Datos históricos de Sintético {i + 1:04d} (S{i + 1:04d})"
+        series[nombre] = pd.Series(np.round(valores[presentes], 1), dias_activo[presentes])
+    return series
+
+
+def escribir_precios(series, directorio):
+    """precios.csv ancho: un par Fecha/Valor por activo, alineado por fila."""
+    columnas = {}
+    for nombre, serie in series.items():
+        columnas[(nombre, "Fecha")] = pd.Series(serie.index.strftime("%Y-%m-%d"))
+        columnas[(nombre, "Valor")] = pd.Series(serie.to_numpy())
+    df = pd.DataFrame(columnas)
+    os.makedirs(directorio, exist_ok=True)
+    datos.escribir_csv(df, "precios.csv", directorio, index=True)
+
+
+def generar(directorio, activos, dias, semilla=SEMILLA, procesos=None, replicas=REPLICAS):
+    """Escribe precios.csv y construye el resto de ``data/`` con pipeline.py."""
+    escribir_precios(precios(activos, dias, semilla), directorio)
+    pipeline.ejecutar(directorio, {"procesos": procesos, "replicas": replicas}, registro=lambda _: None)
+    return directorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con el formato de data/")
+    parser.add_argument("--activos", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=2500)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--replicas", type=int, default=REPLICAS)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--directorio", required=True)
+    args = parser.parse_args(argv)
+
+    generar(args.directorio, args.activos, args.dias, args.semilla, args.procesos, args.replicas)
+    print(f"{args.activos} activos x {args.dias} días en {args.directorio}")
+
+
+if __name__ == "__main__":
+    main()
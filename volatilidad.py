@@ -0,0 +1,200 @@
+"""
+Volatilidad histórica en varias ventanas y EWMA, a partir de sumas acumuladas.
+
+vol_hist_vs_garch.csv trae una sola ventana fija (252 días). Aquí se guarda,
+para cada activo, lo necesario para obtener la desviación estándar móvil de
+cualquier ventana sin volver a recorrer los rendimientos:
+
+    Fecha | Activo (diccionario) | s1 | s2 | ewma_94 | ewma_97
+
+s1 y s2 son las sumas acumuladas (hasta t, inclusive) de y_t = r_t - m y de
+y_t^2, con m la media del activo. La desviación de la ventana de w
+observaciones que termina en t sale de restar dos filas,
+
+    S1 = s1_t - s1_{t-w},   S2 = s2_t - s2_{t-w},   sd_w = sqrt((S2 - S1^2 / w) / (w - 1))
+
+Centrar en la media del activo evita la cancelación de sum(r^2) - (sum r)^2/w
+cuando la media es grande frente a la dispersión, y el resultado se acota en
+cero (el redondeo puede dejar S2 - S1^2/w levemente negativo en ventanas sin
+variación). El archivo ocupa lo mismo con cuatro ventanas que con cuarenta:
+agregar horizontes no agrega columnas ni cálculo al construirlo, y al leer
+cada ventana cuesta dos restas por fecha. Las columnas ewma_XX son la
+volatilidad EWMA (RiskMetrics) con lambda = 0.XX,
+
+    s2_t = lambda s2_{t-1} + (1 - lambda) r_{t-1}^2
+
+que depende de toda la historia y sí se guarda ya calculada (una columna
+por lambda, todas en una sola pasada de lfilter sobre la matriz activos x
+observaciones).
+
+El archivo (``data/volatilidad.arrow``) va en Arrow IPC sin compresión y lo
+construye pipeline.py; app.py lo carga por datos.py y calcula en el momento
+solo las ventanas del activo que se está mirando.
+
+Uso:
+    python volatilidad.py [--directorio data]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+import datos
+
+ARCHIVO = "volatilidad.arrow"
+
+# Ventanas (días hábiles) que ofrece el tablero; no afectan al archivo
+VENTANAS = (20, 60, 120, 250)
+
+LAMBDAS = (0.94, 0.97)
+
+# Observaciones con que se inicia la recursión EWMA (promedio ponderado)
+TAU_INICIAL = 75
+
+
+def columna_ewma(lam):
+    return f"ewma_{round(lam * 100):02d}"
+
+
+def columna_ventana(w):
+    return f"vol_{w}"
+
+
+def etiqueta(columna):
+    """Nombre legible de una medida (vol_20 -> "Histórica 20 días")."""
+    tipo, valor = columna.split("_")
+    if tipo == "vol":
+        return f"Histórica {valor} días"
+    return f"EWMA λ=0.{valor}"
+
+
+# ============================================================
+# CONSTRUCCIÓN
+# ============================================================
+
+def _ewma(R, validos, lambdas):
+    """Volatilidad EWMA para todas las filas de R a la vez (NaN fuera de ``validos``)."""
+    R2 = np.where(validos, R, 0.0) ** 2
+    tau = min(TAU_INICIAL, R.shape[1])
+    salida = {}
+    for lam in lambdas:
+        # Valor inicial: promedio exponencial de los primeros r_t^2, como
+        # garch.backcast, solo sobre las observaciones que existen
+        w = lam ** np.arange(tau) * validos[:, :tau]
+        inicial = (R2[:, :tau] * w).sum(axis=1) / np.maximum(w.sum(axis=1), 1e-300)
+        x = np.empty_like(R2)
+        x[:, 0] = inicial
+        x[:, 1:] = (1 - lam) * R2[:, :-1]
+        s2 = lfilter([1.0], [1.0, -lam], x, axis=1)
+        salida[columna_ewma(lam)] = np.where(validos, np.sqrt(s2), np.nan)
+    return salida
+
+
+def calcular(panel, lambdas=LAMBDAS):
+    """Tabla larga (Fecha, Activo, s1, s2, ewma_XX...) para los activos del panel.
+
+    ``panel`` es el dict nombre -> Serie de datos.leer_rendimientos; las
+    series de tasas quedan fuera, igual que en vol_hist_vs_garch.csv.
+    """
+    series = {n: s for n, s in panel.items() if datos.clean_name(n) not in datos.SERIES_TASA}
+    nombres, R = datos.apilar(series)
+    if R.size == 0:
+        return pd.DataFrame(columns=["Fecha", "Activo", "s1", "s2", *map(columna_ewma, lambdas)])
+    validos = ~np.isnan(R)
+    with np.errstate(invalid="ignore"):
+        centro = np.nanmean(np.where(validos, R, np.nan), axis=1, keepdims=True)
+    Y = np.where(validos, R - centro, 0.0)
+
+    ewma = _ewma(R, validos, lambdas)
+    s1, s2 = np.cumsum(Y, axis=1), np.cumsum(Y * Y, axis=1)
+    largos = validos.sum(axis=1)
+    activos = [datos.nombre_serie(n) for n in nombres]
+    df = pd.DataFrame({
+        "Fecha": np.concatenate([s.index.to_numpy() for s in series.values()]),
+        "Activo": pd.Categorical(np.repeat(np.asarray(activos, dtype=object), largos)),
+        "s1": s1[validos],
+        "s2": s2[validos],
+    })
+    for col, valores in ewma.items():
+        df[col] = valores[validos].astype(np.float32)
+    return df
+
+
+def escribir(df, directorio=None):
+    """Escribe la tabla en Arrow IPC (sin compresión) de forma atómica."""
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    destino = os.path.join(directorio or datos.DATA_DIR, ARCHIVO)
+    temporal = destino + ".tmp"
+    with pa.OSFile(temporal, "wb") as f, pa.ipc.new_file(f, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, destino)
+    return destino
+
+
+def construir(directorio=None, lambdas=LAMBDAS):
+    directorio = directorio or datos.DATA_DIR
+    panel = datos.leer_rendimientos(
+        os.path.join(directorio, "rendimientos.csv"),
+        datos.leer_precios(os.path.join(directorio, "precios.csv")),
+    )
+    return escribir(calcular(panel, lambdas), directorio)
+
+
+# ============================================================
+# LECTURA
+# ============================================================
+
+def desviacion_movil(s1, s2, w):
+    """Desviación estándar móvil de ``w`` observaciones desde las sumas acumuladas.
+
+    ``s1`` y ``s2`` son las de un solo activo; NaN donde la ventana no está
+    completa.
+    """
+    s1 = np.concatenate(([0.0], np.asarray(s1, dtype=float)))
+    s2 = np.concatenate(([0.0], np.asarray(s2, dtype=float)))
+    salida = np.full(len(s1) - 1, np.nan)
+    if w < 2 or w > len(salida):
+        return salida
+    S1 = s1[w:] - s1[:-w]
+    S2 = s2[w:] - s2[:-w]
+    salida[w - 1:] = np.sqrt(np.maximum(S2 - S1 * S1 / w, 0.0) / (w - 1))
+    return salida
+
+
+def medidas(df, columnas):
+    """Fecha y las medidas pedidas (vol_W o ewma_XX) para las filas de un activo.
+
+    ``df`` son todas las filas del activo en orden de fecha (las ventanas
+    necesitan la historia previa: se acota el rango después).
+    """
+    salida = pd.DataFrame({"Fecha": df["Fecha"].to_numpy()})
+    for col in columnas:
+        if col.startswith("vol_"):
+            salida[col] = desviacion_movil(df["s1"].to_numpy(), df["s2"].to_numpy(),
+                                           int(col.split("_")[1]))
+        else:
+            salida[col] = df[col].to_numpy(dtype=float)
+    return salida
+
+
+def disponibles(df, ventanas=VENTANAS):
+    """Columnas de medidas que se pueden pedir a ``medidas``."""
+    return [columna_ventana(w) for w in ventanas] + [c for c in df.columns if c.startswith("ewma_")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sumas acumuladas y EWMA para la volatilidad histórica")
+    parser.add_argument("--directorio", default=datos.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    destino = construir(args.directorio)
+    print(f"Volatilidad escrita en {destino} ({os.path.getsize(destino) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()